@@ -0,0 +1,257 @@
+"""
+Controle de admissão das requisições por classe de custo.
+
+As rotas são classificadas pelo custo (ex: "pesada" para as que podem abrir
+ou gravar planilhas do Excel) e cada classe tem seus limites:
+
+    - Limite por cliente (balde de tokens): cada cliente recebe uma rajada de
+      requisições e repõe tokens a uma taxa fixa por minuto
+    - Concorrência (classe pesada): no máximo N requisições em execução por
+      processo; as seguintes esperam em uma fila de tamanho limitado. Rotas de
+      outras classes que precisam ler uma planilha (cache vazio ou
+      desatualizado) ocupam uma dessas vagas durante a leitura
+
+Os limites valem por processo: com vários workers (servidor.py), cada um tem
+as suas vagas e os seus baldes.
+
+Quando o limite do cliente acaba, a fila está cheia ou a espera passa do
+máximo, a requisição é recusada (HTTP 429) com o tempo estimado para tentar
+novamente (Retry-After). Rotas leves (login, atividades, saúde) nunca esperam
+pelas pesadas.
+"""
+import math
+import threading
+import time
+
+# Clientes sem requisições há mais tempo que isso têm o balde descartado (segundos)
+TEMPO_INATIVIDADE = 600
+
+# Quantidade de clientes a partir da qual os baldes inativos são descartados
+LIMPEZA_A_PARTIR_DE = 1000
+
+
+class AdmissaoRecusada(Exception):
+    """A requisição excedeu um limite; tentar novamente após tentar_apos segundos"""
+
+    def __init__(self, mensagem, tentar_apos, motivo):
+        super().__init__(mensagem)
+        self.tentar_apos = max(1, math.ceil(tentar_apos))
+        self.motivo = motivo
+
+
+class BaldeTokens:
+    """Balde de tokens de um cliente: capacidade = rajada, reposição = taxa por segundo"""
+
+    __slots__ = ('tokens', 'atualizado')
+
+    def __init__(self, capacidade, agora):
+        self.tokens = float(capacidade)
+        self.atualizado = agora
+
+    def consumir(self, capacidade, taxa, agora):
+        """
+        Consome um token
+
+        Returns:
+            float: 0 se havia token; senão, segundos até o próximo token
+        """
+        self.tokens = min(capacidade, self.tokens + (agora - self.atualizado) * taxa)
+        self.atualizado = agora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / taxa
+
+
+class LimitePorCliente:
+    """
+    Baldes de tokens por cliente
+
+    Args:
+        por_minuto (float): Requisições repostas por minuto
+        rajada (int): Requisições seguidas permitidas (capacidade do balde)
+    """
+
+    def __init__(self, por_minuto, rajada):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = max(1, rajada)
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, cliente):
+        """Consome um token do cliente; retorna 0 ou os segundos até o próximo token"""
+        agora = time.monotonic()
+        with self._lock:
+            balde = self._baldes.get(cliente)
+            if balde is None:
+                if len(self._baldes) >= LIMPEZA_A_PARTIR_DE:
+                    self._descartar_inativos(agora)
+                balde = self._baldes[cliente] = BaldeTokens(self.capacidade, agora)
+            return balde.consumir(self.capacidade, self.taxa, agora)
+
+    def _descartar_inativos(self, agora):
+        """Descarta os baldes sem uso recente (voltariam cheios de qualquer forma); chamar com o lock"""
+        for cliente in [c for c, b in self._baldes.items() if agora - b.atualizado > TEMPO_INATIVIDADE]:
+            del self._baldes[cliente]
+
+    def clientes(self):
+        return len(self._baldes)
+
+
+class VagasLimitadas:
+    """
+    Semáforo com fila limitada e tempo máximo de espera
+
+    Args:
+        concorrencia (int): Requisições executando ao mesmo tempo
+        fila (int): Requisições que podem aguardar uma vaga
+        espera_maxima (float): Tempo máximo de espera na fila (segundos)
+    """
+
+    def __init__(self, concorrencia, fila, espera_maxima):
+        self.concorrencia = max(1, concorrencia)
+        self.fila = max(0, fila)
+        self.espera_maxima = espera_maxima
+        self.em_uso = 0
+        self.aguardando = 0
+        self._duracao_media = 1.0
+        self._condicao = threading.Condition()
+
+    def tempo_estimado(self):
+        """Segundos estimados até uma vaga para quem entrar agora na fila"""
+        return self._duracao_media * (self.aguardando + 1) / self.concorrencia
+
+    def entrar(self):
+        """
+        Ocupa uma vaga, aguardando na fila se necessário
+
+        Raises:
+            AdmissaoRecusada: Fila cheia ou espera maior que espera_maxima
+        """
+        with self._condicao:
+            if self.em_uso < self.concorrencia and not self.aguardando:
+                self.em_uso += 1
+                return
+            if self.aguardando >= self.fila:
+                raise AdmissaoRecusada('Servidor ocupado processando planilhas; tente novamente em instantes',
+                                       self.tempo_estimado(), 'fila_cheia')
+
+            self.aguardando += 1
+            try:
+                livre = self._condicao.wait_for(lambda: self.em_uso < self.concorrencia, self.espera_maxima)
+            finally:
+                self.aguardando -= 1
+            if not livre:
+                raise AdmissaoRecusada('Tempo de espera esgotado na fila de processamento; tente novamente',
+                                       self.tempo_estimado(), 'tempo_esgotado')
+            self.em_uso += 1
+
+    def sair(self, duracao):
+        """Libera a vaga e atualiza a duração média (usada no Retry-After)"""
+        with self._condicao:
+            self.em_uso -= 1
+            self._duracao_media = 0.8 * self._duracao_media + 0.2 * duracao
+            self._condicao.notify()
+
+
+class ControleAdmissao:
+    """
+    Limites de admissão do processo
+
+    Funcionalidade:
+        - configurar(): define os limites por classe e a concorrência da classe pesada
+        - admitir(): aplica o limite do cliente e, na classe pesada, ocupa uma vaga
+        - liberar(): devolve a vaga ao fim da requisição (inclusive respostas em partes)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configuracao = None
+        self._limites = {}
+        self.vagas = None
+
+    def configurar(self, limites, concorrencia, fila, espera_maxima):
+        """
+        Define os limites (recria os baldes e as vagas apenas se a configuração mudou)
+
+        Args:
+            limites (dict): {classe: {'por_minuto': n, 'rajada': n}}; classes ausentes não têm limite
+            concorrencia (int): Requisições pesadas executando ao mesmo tempo
+            fila (int): Requisições pesadas aguardando vaga
+            espera_maxima (float): Espera máxima na fila (segundos)
+        """
+        configuracao = (repr(sorted(limites.items())), concorrencia, fila, espera_maxima)
+        if configuracao == self._configuracao:
+            return
+        with self._lock:
+            if configuracao == self._configuracao:
+                return
+            self._limites = {
+                classe: LimitePorCliente(valores['por_minuto'], valores['rajada'])
+                for classe, valores in limites.items()
+            }
+            self.vagas = VagasLimitadas(concorrencia, fila, espera_maxima)
+            self._configuracao = configuracao
+
+    def admitir(self, classe, cliente):
+        """
+        Admite uma requisição
+
+        Args:
+            classe (str): Classe de custo da rota ('pesada', 'normal', 'leve')
+            cliente (str): Identificação do cliente (ex: endereço IP)
+
+        Returns:
+            VagasLimitadas: Vagas ocupadas (devolver com liberar), ou None
+
+        Raises:
+            AdmissaoRecusada: Limite do cliente esgotado, fila cheia ou espera esgotada
+        """
+        limite = self._limites.get(classe)
+        if limite is not None:
+            espera = limite.consumir(cliente)
+            if espera:
+                raise AdmissaoRecusada('Muitas requisições; aguarde para tentar novamente', espera, 'limite_cliente')
+
+        if classe != 'pesada':
+            return None
+        vagas = self.vagas
+        vagas.entrar()
+        return vagas
+
+    def ocupar_vaga(self):
+        """
+        Ocupa uma vaga da classe pesada sem o limite por cliente
+
+        Funcionalidade:
+            - Usado na leitura de planilhas com o cache vazio ou desatualizado pedida por
+              uma rota de outra classe (ex: /api/obras): a leitura disputa as mesmas vagas
+
+        Returns:
+            VagasLimitadas: Vagas ocupadas (devolver com liberar)
+
+        Raises:
+            AdmissaoRecusada: Fila cheia ou espera esgotada
+        """
+        vagas = self.vagas
+        vagas.entrar()
+        return vagas
+
+    @staticmethod
+    def liberar(vagas, duracao):
+        if vagas is not None:
+            vagas.sair(duracao)
+
+    def status(self):
+        """Ocupação das vagas pesadas e clientes acompanhados por classe"""
+        vagas = self.vagas
+        return {
+            'pesadasEmExecucao': vagas.em_uso if vagas else 0,
+            'pesadasAguardando': vagas.aguardando if vagas else 0,
+            'concorrencia': vagas.concorrencia if vagas else None,
+            'clientes': {classe: limite.clientes() for classe, limite in self._limites.items()},
+        }
+
+
+# Instância única do processo
+controle_admissao = ControleAdmissao()
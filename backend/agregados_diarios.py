@@ -0,0 +1,179 @@
+"""
+Agregados diários do MainBD usados pelos indicadores dos dashboards.
+
+Em vez de recalcular os KPIs sobre todas as linhas do MainBD a cada versão da
+planilha, a produção é somada uma vez por dia, equipe, supervisor e atividade
+(a base e as regras de poste/cava/retro/ligação são derivadas dessas chaves).
+Totais da semana e do mês, progresso das metas e variações somam esses
+agregados: o custo passa a depender do número de dias, não de linhas.
+
+Quando o MainBD muda apenas por linhas acrescentadas ao final (o caso comum:
+a produção do dia é lançada no fim da planilha), somente as linhas novas são
+normalizadas e somadas aos agregados existentes. Qualquer outra alteração
+(linhas editadas ou removidas) reconstrói os agregados do zero.
+"""
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+import indicadores
+from metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Chaves dos agregados diários (base e regras de atividade são derivadas delas)
+CHAVES_DIA = ['data', 'equipe', 'supervisor', 'atividade']
+
+# Colunas somadas por dia
+COLUNAS_SOMA = ['qtd', 'clientes', 'faturamento']
+
+# Colunas das obras distintas por dia (contagens de SS/OT únicos não são somáveis)
+COLUNAS_OBRAS = ['data', 'ssot', 'ar', 'energizada']
+
+
+def hash_linhas(df):
+    """Hash de cada linha do DataFrame (usado para detectar linhas acrescentadas)"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _somar_por_dia(normalizado, posicao_inicial):
+    """
+    Soma as linhas normalizadas por dia, equipe, supervisor e atividade
+
+    Args:
+        normalizado (DataFrame): Resultado de indicadores.normalizar
+        posicao_inicial (int): Posição da primeira linha no MainBD
+
+    Returns:
+        DataFrame: Um registro por chave, com as somas e a posição da primeira linha
+                   (preserva a ordem de aparecimento usada nos desempates dos gráficos)
+    """
+    linhas = normalizado[CHAVES_DIA[1:] + COLUNAS_SOMA].copy()
+    linhas['data'] = normalizado['data'].dt.normalize()
+    linhas['ordem'] = np.arange(posicao_inicial, posicao_inicial + len(linhas))
+    return _consolidar(linhas)
+
+
+def _consolidar(linhas):
+    """Agrupa registros com a mesma chave (somas e menor posição) em ordem de aparecimento"""
+    somas = {coluna: 'sum' for coluna in COLUNAS_SOMA}
+    somas['ordem'] = 'min'
+    agregados = linhas.groupby(CHAVES_DIA, sort=False, dropna=False).agg(somas).reset_index()
+    return agregados.sort_values('ordem', kind='stable').reset_index(drop=True)
+
+
+def _obras_por_dia(normalizado):
+    """Combinações distintas de dia, SS/OT, AR e energização, em ordem de aparecimento"""
+    obras = normalizado[COLUNAS_OBRAS[1:]].copy()
+    obras.insert(0, 'data', normalizado['data'].dt.normalize())
+    return obras.drop_duplicates(ignore_index=True)
+
+
+class AgregadosDiarios:
+    """
+    Agregados diários de uma versão do MainBD
+
+    Funcionalidade:
+        - atualizar() processa só as linhas novas quando o MainBD apenas cresceu
+        - periodo() devolve (agregados, obras) de um intervalo de datas, prontos para os indicadores
+        - O estado é trocado de uma vez: leituras concorrentes nunca veem uma atualização pela metade
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etag = None
+        self._hashes = None
+        self._somas = None
+        self._obras = None
+        self._base = None
+        self._obras_mes = None
+
+    def atualizar(self, entrada):
+        """
+        Atualiza os agregados para a versão do MainBD em cache
+
+        Args:
+            entrada (EntradaCache): Entrada do MainBD no cache de planilhas
+
+        Returns:
+            AgregadosDiarios: A própria instância
+        """
+        if entrada.etag == self._etag:
+            metricas.incrementar('cache_total', cache='agregados', resultado='acerto')
+            return self
+
+        with self._lock:
+            if entrada.etag == self._etag:
+                metricas.incrementar('cache_total', cache='agregados', resultado='acerto')
+                return self
+
+            with metricas.etapa('agregados_diarios'):
+                df = entrada.dados
+                hashes = hash_linhas(df)
+                anteriores = self._hashes
+                incremental = (
+                    anteriores is not None
+                    and len(anteriores) <= len(hashes)
+                    and np.array_equal(anteriores, hashes[:len(anteriores)])
+                )
+
+                if incremental:
+                    novos = indicadores.normalizar(df.iloc[len(anteriores):])
+                    somas = _consolidar(pd.concat([self._somas, _somar_por_dia(novos, len(anteriores))],
+                                                  ignore_index=True))
+                    obras = pd.concat([self._obras, _obras_por_dia(novos)],
+                                      ignore_index=True).drop_duplicates(ignore_index=True)
+                    resultado = 'incremental'
+                else:
+                    normalizado = indicadores.normalizar(df)
+                    somas = _somar_por_dia(normalizado, 0)
+                    obras = _obras_por_dia(normalizado)
+                    resultado = 'completo'
+
+                base = indicadores.classificar(somas)
+                obras_mes = obras.assign(mes=obras['data'].dt.to_period('M'))
+
+            novas_linhas = len(hashes) - (len(anteriores) if incremental else 0)
+            metricas.incrementar('cache_total', cache='agregados', resultado=resultado)
+            metricas.incrementar('linhas_processadas_total', novas_linhas, etapa='agregados_diarios')
+            logger.info(f"Agregados diários do MainBD ({resultado}): {novas_linhas} linhas processadas, "
+                        f"{len(base)} agregados, {len(obras_mes)} obras por dia")
+
+            self._hashes, self._somas, self._obras = hashes, somas, obras
+            self._base, self._obras_mes = base, obras_mes
+            self._etag = entrada.etag
+            return self
+
+    def periodo(self, inicio=None, fim=None):
+        """
+        Agregados e obras com data entre inicio e fim (inclusivos)
+
+        Args:
+            inicio (str): Data inicial YYYY-MM-DD (opcional)
+            fim (str): Data final YYYY-MM-DD (opcional)
+
+        Returns:
+            tuple: (agregados classificados, obras distintas por dia com o mês)
+        """
+        base, obras = self._base, self._obras_mes
+        if not inicio and not fim:
+            return base, obras
+
+        inicio = pd.Timestamp(inicio) if inicio else None
+        fim = pd.Timestamp(fim) if fim else None
+
+        def filtrar(df):
+            mascara = df['data'].notna()
+            if inicio is not None:
+                mascara &= df['data'] >= inicio
+            if fim is not None:
+                mascara &= df['data'] <= fim
+            return df.loc[mascara]
+
+        return filtrar(base), filtrar(obras)
+
+
+# Instância única usada pelos endpoints de indicadores
+agregados_mainbd = AgregadosDiarios()
@@ -1,15 +1,43 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, g, has_request_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import jwt
 import hashlib
 import pandas as pd
+import numpy as np
 import os
 from werkzeug.utils import secure_filename
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 import time
 import shutil
+import threading
+import json
+import io
+import logging
+from contextlib import contextmanager
+
+from cache_planilhas import cache_planilhas
+import indicadores
+import instantaneos
+import exportacao
+from agregados_diarios import agregados_mainbd
+from modelo_obras import obter_modelo, ConflitoVersao, ObraNaoEncontrada
+from banco_local import obter_banco
+from indice_obras import IndiceObras, CAMPOS_INDEXADOS, normalizar_chave, separar_valores
+from grade_geo import bbox_do_tile
+from busca import busca, BuscaMariua, termos_da_consulta, TAMANHO_MINIMO_TERMO
+from registro_obras import CHAVES_OBRA, CAMPOS_OBRA, ColunasObras
+from mesclagem_programacao import mesclar_programacao, APLICADA, SEM_ALTERACAO, NAO_ENCONTRADA, CONFLITO
+from arquivo_programacao import ArquivoProgramacao, CAMPOS_ARQUIVO, ordinal_dia, texto_dia
+from observador_arquivos import ObservadorArquivos, arquivos_da_pasta
+from estado_programacao import criar_estado, VersaoDesatualizada
+from executor_planilhas import executor_planilhas, TempoEsgotadoLeitura
+from admissao import controle_admissao, AdmissaoRecusada
+from metricas import metricas
+from transmissao import (
+    MIMETYPE_NDJSON, LINHAS_POR_BLOCO, TAMANHO_MINIMO_COMPRESSAO, negociar_codificacao, comprimir,
+    comprimir_stream, blocos_dataframe, ndjson_dataframes, array_json_dataframes, ndjson_registros,
+    array_json_registros
+)
 
 app = Flask(__name__)
 CORS(app)
@@ -20,6 +48,17 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls'}
 
+# Nível dos logs: DEBUG, INFO, WARNING ou ERROR (DEBUG mostra o detalhe de cada requisição)
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+
+def configurar_logs():
+    """Configura o logging do backend (horário, nível e módulo) no nível de LOG_LEVEL"""
+    logging.basicConfig(format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+    logging.getLogger().setLevel(str(app.config['LOG_LEVEL']).upper())
+
+configurar_logs()
+logger = logging.getLogger(__name__)
+
 # Criar pasta de uploads se não existir
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'])
@@ -29,8 +68,110 @@ PROGRAMACAO_DIA_FOLDER = os.path.join(app.config['UPLOAD_FOLDER'], 'ProgramacaoN
 if not os.path.exists(PROGRAMACAO_DIA_FOLDER):
     os.makedirs(PROGRAMACAO_DIA_FOLDER)
 
-# Variável global para armazenar a programação do dia atual
-programacao_dia_data = []
+# Banco SQLite local com as planilhas importadas (recriado automaticamente se apagado)
+app.config['BANCO_LOCAL'] = 'banco_local.sqlite3'
+
+# Instantâneos Arrow das planilhas processadas, gravados ao lado de cada planilha
+# (requer pyarrow): processos novos leem o instantâneo em vez de abrir o Excel
+app.config['INSTANTANEOS'] = os.environ.get('INSTANTANEOS', '1') != '0'
+
+def carregar_com_instantaneo(caminho, nome, carregar):
+    """Resultado de carregar() a partir do instantâneo Arrow da planilha, quando habilitado e válido"""
+    if not app.config['INSTANTANEOS']:
+        return carregar()
+    return instantaneos.obter(caminho, nome, carregar)
+
+# Pré-processar em segundo plano as planilhas alteradas em uploads/
+app.config['OBSERVAR_ARQUIVOS'] = True
+
+# Armazenamento da programação do dia atual: 'memoria' (um único processo) ou
+# 'sqlite' (arquivo compartilhado em uploads/, necessário com vários workers)
+app.config['ESTADO_PROGRAMACAO'] = os.environ.get('ESTADO_PROGRAMACAO', 'memoria')
+app.config['ESTADO_PROGRAMACAO_SQLITE'] = 'estado_programacao.sqlite3'
+
+_estados_programacao = {}
+_lock_estados_programacao = threading.Lock()
+
+def obter_estado_programacao():
+    """Armazenamento (versionado) da programação do dia, conforme ESTADO_PROGRAMACAO"""
+    tipo = app.config['ESTADO_PROGRAMACAO']
+    caminho = os.path.join(app.config['UPLOAD_FOLDER'], app.config['ESTADO_PROGRAMACAO_SQLITE'])
+    chave = (tipo, os.path.abspath(caminho) if tipo == 'sqlite' else None)
+    with _lock_estados_programacao:
+        estado = _estados_programacao.get(chave)
+        if estado is None:
+            estado = _estados_programacao[chave] = criar_estado(tipo, caminho)
+        return estado
+
+# Leitura das planilhas em processos auxiliares (0 = no próprio processo) e espera máxima (segundos)
+app.config['PROCESSOS_LEITURA'] = int(os.environ.get('PROCESSOS_LEITURA', 2))
+app.config['TEMPO_MAXIMO_LEITURA'] = 120
+
+def ler_excel(origem, **opcoes):
+    """
+    Lê uma planilha com pd.read_excel em um processo auxiliar (executor_planilhas)
+
+    Args:
+        origem: Caminho do arquivo ou arquivo em memória
+        **opcoes: Parâmetros do pd.read_excel
+
+    Funcionalidade:
+        - A leitura não ocupa o processo do servidor: endpoints leves continuam respondendo
+        - Leituras simultâneas do mesmo arquivo são feitas uma única vez
+        - Levanta TempoEsgotadoLeitura se passar de TEMPO_MAXIMO_LEITURA
+    """
+    executor_planilhas.configurar(app.config['PROCESSOS_LEITURA'], app.config['TEMPO_MAXIMO_LEITURA'])
+    with vaga_leitura(), metricas.etapa('leitura_excel'):
+        return executor_planilhas.ler_excel(origem, **opcoes)
+
+@contextmanager
+def vaga_leitura():
+    """
+    Ocupa uma vaga da classe pesada durante a leitura de uma planilha
+
+    Funcionalidade:
+        - Rotas normais (ex: /api/obras, /api/search, /api/dashboard/*) só leem planilhas
+          com o cache vazio ou desatualizado: a leitura disputa as vagas das rotas pesadas
+        - Rotas pesadas já ocupam a sua vaga; leituras fora de requisições (observador) não esperam
+        - Sem vaga (fila cheia ou espera esgotada): TempoEsgotadoLeitura (503 com Retry-After)
+    """
+    if (not app.config['ADMISSAO'] or not has_request_context()
+            or g.get('vagas_admissao') is not None or controle_admissao.vagas is None):
+        yield
+        return
+    try:
+        with metricas.etapa('espera_admissao'):
+            vagas = controle_admissao.ocupar_vaga()
+    except AdmissaoRecusada as e:
+        metricas.incrementar('admissao_total', classe='leitura', resultado=e.motivo)
+        raise TempoEsgotadoLeitura(str(e), e.tentar_apos) from e
+    metricas.incrementar('admissao_total', classe='leitura', resultado='admitida')
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        controle_admissao.liberar(vagas, time.perf_counter() - inicio)
+
+# Controle de admissão por classe de custo da rota (ADMISSAO=0 desativa)
+# Limites por processo: com vários workers, cada um aplica os seus (até workers x
+# CONCORRENCIA_PESADA leituras e rotas pesadas ao mesmo tempo no servidor).
+# Requisições pesadas na fila ocupam uma thread do worker: concorrência + fila
+# deve ficar abaixo do número de threads, para sobrar thread às rotas leves
+app.config['ADMISSAO'] = os.environ.get('ADMISSAO', '1') != '0'
+app.config['LIMITES_ADMISSAO'] = {
+    'pesada': {'por_minuto': 20, 'rajada': 5},
+    'normal': {'por_minuto': 240, 'rajada': 60},
+}
+app.config['CONCORRENCIA_PESADA'] = int(os.environ.get('CONCORRENCIA_PESADA', 1))
+app.config['FILA_PESADA'] = int(os.environ.get('FILA_PESADA', 1))
+app.config['ESPERA_PESADA'] = 10
+
+def resposta_tempo_esgotado(erro):
+    """Resposta 503 (com Retry-After) quando a leitura de uma planilha passa do tempo máximo"""
+    response = jsonify({'error': str(erro), 'success': False})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(erro.tentar_apos)
+    return response
 
 def allowed_file(filename):
     """
@@ -50,12 +191,15 @@ def allowed_file(filename):
     """
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def processar_programacao_dia(caminho_arquivo):
+# Colunas da programação diária, na ordem do Excel
+COLUNAS_PROGRAMACAO_DIA = ['data', 'projeto', 'supervisor', 'encarregado', 'titulo', 'municipio', 'atividadeProgramada', 'criterio']
+
+def processar_programacao_dia(arquivo):
     """
     Processa arquivo Excel da programação diária de obras e retorna estrutura organizada
 
     Args:
-        caminho_arquivo (str): Caminho completo do arquivo Excel a ser processado
+        arquivo: Caminho do arquivo Excel ou arquivo em memória (ex: io.BytesIO com o upload)
 
     Returns:
         list: Lista de dicionários com os dados da programação diária
@@ -71,47 +215,33 @@ def processar_programacao_dia(caminho_arquivo):
         - Coluna 7: Critério da obra (QLP, QLU, etc)
 
     Funcionalidade:
-        - Lê arquivo Excel e converte para DataFrame pandas
-        - Itera por cada linha verificando se há dados válidos
+        - Lê apenas as 8 colunas esperadas (openpyxl em modo somente leitura)
+        - Converte cada coluna para texto de uma vez (células vazias viram '')
         - Pula linhas vazias (onde projeto está vazio)
-        - Cria objeto JSON para cada linha com estrutura padronizada
-        - Retorna lista completa para ser utilizada pela API
+        - id = posição da linha na planilha (1 = primeira linha de dados)
         - Usado no endpoint /api/programacao-dia/upload
     """
     try:
-        # Ler Excel usando pandas
-        df = pd.read_excel(caminho_arquivo, header=0)
+        df = ler_excel(arquivo, header=0, usecols=list(range(len(COLUNAS_PROGRAMACAO_DIA))))
+        df.columns = COLUNAS_PROGRAMACAO_DIA
 
-        print(f"📊 Colunas encontradas: {df.columns.tolist()}")
-        print(f"📊 Total de linhas: {len(df)}")
+        logger.debug(f"📊 Total de linhas: {len(df)}")
 
-        programacao = []
+        with metricas.etapa('processamento_programacao_dia'):
+            programacao = pd.DataFrame({'id': np.arange(1, len(df) + 1)})
+            for coluna in COLUNAS_PROGRAMACAO_DIA:
+                programacao[coluna] = coluna_texto(df[coluna], '')
 
-        for idx, row in df.iterrows():
             # Verificar se a linha tem dados válidos (pelo menos projeto preenchido)
-            if pd.isna(row.iloc[1]) or str(row.iloc[1]).strip() == '':
-                continue  # Pular linhas vazias
-
-            # Estrutura: Data, Projeto, Supervisor, Encarregado, Título, Município, Atividade Programada, Critério
-            item = {
-                'id': idx + 1,
-                'data': str(row.iloc[0]) if pd.notna(row.iloc[0]) else '',
-                'projeto': str(row.iloc[1]) if pd.notna(row.iloc[1]) else '',
-                'supervisor': str(row.iloc[2]) if pd.notna(row.iloc[2]) else '',
-                'encarregado': str(row.iloc[3]) if pd.notna(row.iloc[3]) else '',
-                'titulo': str(row.iloc[4]) if pd.notna(row.iloc[4]) else '',
-                'municipio': str(row.iloc[5]) if pd.notna(row.iloc[5]) else '',
-                'atividadeProgramada': str(row.iloc[6]) if pd.notna(row.iloc[6]) else '',
-                'criterio': str(row.iloc[7]) if pd.notna(row.iloc[7]) else ''
-            }
-
-            programacao.append(item)
+            validas = df['projeto'].notna() & (programacao['projeto'].str.strip() != '')
+            programacao = programacao.loc[validas].to_dict('records')
+        metricas.incrementar('linhas_processadas_total', len(df), etapa='programacao_dia')
 
-        print(f"✅ Total de itens válidos processados: {len(programacao)}")
+        logger.info(f"✅ Total de itens válidos processados: {len(programacao)}")
         return programacao
 
     except Exception as e:
-        print(f"❌ Erro ao processar programação do dia: {str(e)}")
+        logger.error(f"❌ Erro ao processar programação do dia: {str(e)}")
         raise
 
 # Banco de dados simulado
@@ -153,6 +283,7 @@ ATIVIDADES_DISPONIVEIS = [
 def salvar_planilha_com_retry(wb, caminho, max_tentativas=3):
     """Tenta salvar a planilha com retry em caso de erro de permissão"""
     for tentativa in range(max_tentativas):
+        inicio = time.perf_counter()
         try:
             # Criar backup temporário
             backup_path = caminho + '.backup'
@@ -174,241 +305,267 @@ def salvar_planilha_com_retry(wb, caminho, max_tentativas=3):
             if os.path.exists(backup_path):
                 os.remove(backup_path)
             
-            print(f"✅ Planilha salva com sucesso!")
+            metricas.observar('etapa_segundos', time.perf_counter() - inicio, etapa='gravacao_planilha')
+            metricas.incrementar('gravacao_tentativas_total', resultado='sucesso')
+            logger.info(f"✅ Planilha salva com sucesso!")
             return True
             
         except PermissionError as e:
-            print(f"⚠️ Tentativa {tentativa + 1}/{max_tentativas} falhou: Arquivo pode estar aberto")
+            metricas.incrementar('gravacao_tentativas_total', resultado='arquivo_aberto')
+            logger.warning(f"⚠️ Tentativa {tentativa + 1}/{max_tentativas} falhou: Arquivo pode estar aberto")
             if tentativa < max_tentativas - 1:
                 time.sleep(1)  # Espera 1 segundo antes de tentar novamente
             else:
                 raise Exception(f"❌ Não foi possível salvar o arquivo após {max_tentativas} tentativas. "
                               f"FECHE O ARQUIVO EXCEL se estiver aberto e tente novamente!")
         except Exception as e:
-            print(f"❌ Erro ao salvar: {str(e)}")
+            metricas.incrementar('gravacao_tentativas_total', resultado='erro')
+            logger.error(f"❌ Erro ao salvar: {str(e)}")
             raise
 
     return False
 
-# Função auxiliar para processar planilha
-def processar_planilha(caminho_arquivo):
-    """Processa a planilha e retorna lista de obras"""
+# Colunas da planilha mensal (A..Z) na ordem do Excel: (chave JSON, valor padrão)
+# Colunas com padrão None são numéricas ou coordenadas e recebem tratamento próprio
+COLUNAS_PLANILHA_OBRAS = [
+    ('encarregado', 'N/A'),            # A - ENCARREGADO
+    ('supervisor', 'N/A'),             # B - SUPERVISOR
+    ('projeto', None),                 # C - PROJETO (padrão B-0001, B-0002...)
+    ('cliente', 'N/A'),                # D - TÍTULO (cliente)
+    ('localidade', 'N/A'),             # E - MUNICIPIO (localidade)
+    ('criterio', ''),                  # F - CRITÉRIO
+    ('anotacoes', ''),                 # G - ANOTAÇÕES
+    ('postesPrevistos', None),         # H - POSTES PREVISTOS
+    ('dataInicio', ''),                # I - DATA DE INÍCIO
+    ('prazo', ''),                     # J - DATA CONCLUSÃO (prazo)
+    ('obraSemana', ''),                # K - OBRA DA SEMANA
+    ('motivoAtraso', ''),              # L - MOTIVO DO ATRASO
+    ('atividadeDia', 'IMPLANTAÇÃO'),   # M - NECESSIDADE (ATIVIDADE DO DIA)
+    ('programacaoLv', ''),             # N - PROGRAMAÇÃO LV
+    ('cavasRealizadas', None),         # O - CAVAS REALIZADAS
+    ('postesImplantados', None),       # P - POSTES REALIZADOS
+    ('latitude', None),                # Q - LATITUDE
+    ('longitude', None),               # R - LONGITUDE
+    ('clientesPrevistos', None),       # S - CLIENTES PREVISTOS
+    ('projetoKit', ''),                # T - PROJETO KIT
+    ('projetoMedidor', ''),            # U - PROJETO MEDIDOR
+    ('arCoelba', 'N/A'),               # V - AR COELBA
+    ('dataVisitaPrevia', ''),          # W - VISITA PRÉVIA
+    ('observacaoVisita', ''),          # X - OBSERVAÇÃO DA VISITA
+    ('analisePreFechamento', ''),      # Y - ANÁLISE PRÉ FECH
+    ('dataSolicitacaoReserva', ''),    # Z - SOLICITAÇÃO DE RESERVA
+]
+
+# Letra da coluna no Excel de cada chave, na mesma disposição usada na leitura da planilha
+LETRAS_PLANILHA_OBRAS = {chave: chr(ord('A') + posicao) for posicao, (chave, _) in enumerate(COLUNAS_PLANILHA_OBRAS)}
+
+# Diferença entre o ordinal de datetime.date e os dias desde 1970-01-01
+_ORDINAL_EPOCH = 719163
+
+def coluna_texto(serie, padrao):
+    """Converte uma coluna para texto (como str(valor)), usando o padrão nas células vazias"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        texto = serie.map(str)
+    else:
+        texto = serie.astype(str)
+    return texto.where(serie.notna(), padrao)
+
+def coluna_numerica(serie):
+    """
+    Converte uma coluna numérica da planilha
+
+    Returns:
+        tuple: (valores float com 0 nas células vazias, máscara de células inválidas)
+
+    Funcionalidade:
+        - Células vazias valem 0
+        - Textos não numéricos, NaN e infinito invalidam a linha (como o float()/int() por linha fazia)
+    """
+    valores = pd.to_numeric(serie, errors='coerce')
+    invalidos = serie.notna() & ~np.isfinite(valores.astype(float))
+    return valores.fillna(0).astype(float), invalidos
+
+def coluna_coordenada(serie):
+    """Converte latitude/longitude aceitando vírgula decimal; valores inválidos viram NaN"""
+    texto = serie.astype(str).str.replace(',', '.', regex=False).str.strip()
+    return pd.to_numeric(texto.where(serie.notna()), errors='coerce').astype(float)
+
+def coluna_datas_ordinais(texto):
+    """
+    Converte datas em texto (dd/mm/aaaa ou aaaa-mm-dd) para ordinais de datetime.date
+
+    Args:
+        texto (Series): Coluna já convertida por coluna_texto
+
+    Returns:
+        Series: Ordinais (float) ou NaN quando a data é vazia ou inválida
+
+    Funcionalidade:
+        - Textos com "/" usam o formato %d/%m/%Y
+        - Textos com "-" usam o formato %Y-%m-%d (ignorando o horário)
+        - Conversão vetorizada com pd.to_datetime; datas fora do intervalo do pandas
+          (ex: ano com 2 dígitos) são refeitas com strptime apenas nessas células
+    """
+    limpo = texto.str.strip()
+    valido = (texto != 'nan') & (limpo != '')
+    barra = valido & limpo.str.contains('/', regex=False)
+    hifen = valido & ~barra & limpo.str.contains('-', regex=False)
+    primeira_parte = limpo.str.split().str[0]
+
+    datas = pd.to_datetime(limpo.where(barra), format='%d/%m/%Y', errors='coerce')
+    datas = datas.fillna(pd.to_datetime(primeira_parte.where(hifen), format='%Y-%m-%d', errors='coerce'))
+
+    dias = datas.to_numpy().astype('datetime64[D]').astype('int64').astype(float)
+    ordinais = pd.Series(np.where(datas.notna(), dias + _ORDINAL_EPOCH, np.nan), index=texto.index)
+
+    pendentes = (barra | hifen) & datas.isna()
+    for idx in pendentes[pendentes].index:
+        try:
+            if barra[idx]:
+                ordinais[idx] = datetime.strptime(limpo[idx], '%d/%m/%Y').date().toordinal()
+            else:
+                ordinais[idx] = datetime.strptime(primeira_parte[idx], '%Y-%m-%d').date().toordinal()
+        except ValueError:
+            pass
+
+    return ordinais
+
+# Colunas da obra que não dependem da data atual (tudo exceto o status)
+CHAVES_OBRA_NORMALIZADA = [chave for chave in CHAVES_OBRA if chave != 'status']
+
+def processar_dataframe_obras(df):
+    """
+    Converte o DataFrame bruto da planilha mensal na lista de obras
+
+    Args:
+        df (DataFrame): Planilha como retornada por pd.read_excel (não é modificado)
+
+    Returns:
+        list: Lista de dicionários (um por obra) no formato usado por /api/obras
+
+    Funcionalidade:
+        - Normaliza a planilha (normalizar_dataframe_obras) e calcula o status para hoje
+        - Mesmo resultado do processamento linha a linha original (tests/test_processar_planilha.py);
+          /api/obras usa as mesmas etapas com cache (obter_obras)
+    """
     try:
-        # Ler o Excel com pandas
-        df = pd.read_excel(caminho_arquivo, header=0)
-        
-        # Processar os dados
-        obras = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Extrair TODAS as colunas (baseado na ordem correta do Excel)
-                # A - ENCARREGADO
-                encarregado = str(row.iloc[0]) if pd.notna(row.iloc[0]) else 'N/A'
-                # B - SUPERVISOR
-                supervisor = str(row.iloc[1]) if pd.notna(row.iloc[1]) else 'N/A'
-                # C - PROJETO
-                projeto = str(row.iloc[2]) if pd.notna(row.iloc[2]) else f"B-{str(index+1).zfill(4)}"
-                # D - TÍTULO (cliente)
-                cliente = str(row.iloc[3]) if pd.notna(row.iloc[3]) else 'N/A'
-                # E - MUNICIPIO (localidade)
-                localidade = str(row.iloc[4]) if pd.notna(row.iloc[4]) else 'N/A'
-                # F - CRITÉRIO
-                criterio = str(row.iloc[5]) if pd.notna(row.iloc[5]) else ''
-                # G - ANOTAÇÕES
-                anotacoes = str(row.iloc[6]) if pd.notna(row.iloc[6]) else ''
-                # H - POSTES PREVISTOS
-                postes_previstos = float(row.iloc[7]) if pd.notna(row.iloc[7]) else 0
-                # I - DATA DE INÍCIO
-                data_inicio = str(row.iloc[8]) if pd.notna(row.iloc[8]) else ''
-                # J - DATA CONCLUSÃO (prazo)
-                prazo = str(row.iloc[9]) if pd.notna(row.iloc[9]) else ''
-                # K - OBRA DA SEMANA
-                obra_semana = str(row.iloc[10]) if pd.notna(row.iloc[10]) else ''
-                # L - MOTIVO DO ATRASO (NOVA COLUNA)
-                motivo_atraso = str(row.iloc[11]) if pd.notna(row.iloc[11]) else ''
-                # M - NECESSIDADE (ATIVIDADE DO DIA)
-                atividade_dia = str(row.iloc[12]) if pd.notna(row.iloc[12]) else 'IMPLANTAÇÃO'
-                # N - PROGRAMAÇÃO LV
-                programacao_lv = str(row.iloc[13]) if pd.notna(row.iloc[13]) else ''
-                # O - CAVAS REALIZADAS
-                cavas_realizadas = float(row.iloc[14]) if pd.notna(row.iloc[14]) else 0
-                # P - POSTES REALIZADOS
-                postes_implantados = float(row.iloc[15]) if pd.notna(row.iloc[15]) else 0
-                # Q - LATITUDE
-                latitude_raw = row.iloc[16] if pd.notna(row.iloc[16]) else None
-                latitude = None
-                if latitude_raw is not None:
-                    try:
-                        # Tentar converter para float
-                        lat_str = str(latitude_raw).replace(',', '.').strip()
-                        latitude = float(lat_str)
-                    except:
-                        latitude = None
-                
-                # R - LONGITUDE
-                longitude_raw = row.iloc[17] if pd.notna(row.iloc[17]) else None
-                longitude = None
-                if longitude_raw is not None:
-                    try:
-                        # Tentar converter para float
-                        lng_str = str(longitude_raw).replace(',', '.').strip()
-                        longitude = float(lng_str)
-                    except:
-                        longitude = None
-                # S - CLIENTES PREVISTOS
-                clientes_previstos = float(row.iloc[18]) if pd.notna(row.iloc[18]) else 0
-                # T - PROJETO KIT
-                projeto_kit = str(row.iloc[19]) if pd.notna(row.iloc[19]) else ''
-                # U - PROJETO MEDIDOR
-                projeto_medidor = str(row.iloc[20]) if pd.notna(row.iloc[20]) else ''
-                # V - AR COELBA
-                ar_coelba = str(row.iloc[21]) if pd.notna(row.iloc[21]) else 'N/A'
-                # W - VISITA PRÉVIA
-                data_visita_previa = str(row.iloc[22]) if pd.notna(row.iloc[22]) else ''
-                # X - OBSERVAÇÃO DA VISITA
-                observacao_visita = str(row.iloc[23]) if pd.notna(row.iloc[23]) else ''
-                # Y - ANÁLISE PRÉ FECH
-                analise_pre_fechamento = str(row.iloc[24]) if pd.notna(row.iloc[24]) else ''
-                # Z - SOLICITAÇÃO DE RESERVA
-                data_solicitacao_reserva = str(row.iloc[25]) if pd.notna(row.iloc[25]) else ''
-                
-                # Calcular progresso
-                progresso = 0
-                if postes_previstos > 0:
-                    progresso = min(round((postes_implantados / postes_previstos) * 100), 100)
-                
-                # Verificar se está energizada
-                is_energizada = 'ENERGIZADA' in anotacoes.upper()
-                
-                # Determinar status baseado nas DATAS (LÓGICA CORRIGIDA)
-                from datetime import datetime
-                hoje = datetime.now().date()
-                
-                # Processar data de início
-                dt_inicio = None
-                if data_inicio and data_inicio != 'nan' and str(data_inicio).strip():
-                    try:
-                        # Tentar converter data
-                        if isinstance(data_inicio, datetime):
-                            dt_inicio = data_inicio.date()
-                        else:
-                            # Tentar parsear string
-                            data_str = str(data_inicio).strip()
-                            if '/' in data_str:
-                                dt_inicio = datetime.strptime(data_str, '%d/%m/%Y').date()
-                            elif '-' in data_str:
-                                dt_inicio = datetime.strptime(data_str.split()[0], '%Y-%m-%d').date()
-                    except:
-                        dt_inicio = None
-                
-                # Processar data de término (prazo)
-                dt_termino = None
-                if prazo and prazo != 'nan' and str(prazo).strip():
-                    try:
-                        if isinstance(prazo, datetime):
-                            dt_termino = prazo.date()
-                        else:
-                            data_str = str(prazo).strip()
-                            if '/' in data_str:
-                                dt_termino = datetime.strptime(data_str, '%d/%m/%Y').date()
-                            elif '-' in data_str:
-                                dt_termino = datetime.strptime(data_str.split()[0], '%Y-%m-%d').date()
-                    except:
-                        dt_termino = None
-                
-                # ========== LÓGICA DE STATUS CORRIGIDA ==========
-                # 1. ENERGIZADA: Anotações contém "ENERGIZADA" OU Data de término < hoje
-                # 2. PROGRAMADA: Data início > hoje
-                # 3. EM ANDAMENTO: Data início <= hoje E Data término >= hoje
-                # 4. CONCLUÍDA: Progresso >= 100%
-                
-                if is_energizada or (dt_termino and dt_termino < hoje):
-                    # Obras energizadas: anotações com "ENERGIZADA" ou data término passou
-                    status = 'Energizada'
-                elif progresso >= 100:
-                    # Obras concluídas: progresso completo
-                    status = 'Concluída'
-                elif dt_inicio and dt_inicio > hoje:
-                    # Obras programadas: data de início no futuro
-                    status = 'Programada'
-                elif dt_inicio and dt_inicio <= hoje:
-                    # Obras que já começaram
-                    if dt_termino:
-                        if dt_termino >= hoje:
-                            # Data início passou e data término não passou = Em Andamento
-                            status = 'Em Andamento'
-                        else:
-                            # Data início passou e data término passou = Energizada
-                            status = 'Energizada'
-                    else:
-                        # Sem data término definida, mas já começou = Em Andamento
-                        status = 'Em Andamento'
-                else:
-                    # Se não tem data de início, usa progresso
-                    if progresso > 0:
-                        status = 'Em Andamento'
-                    else:
-                        status = 'Programada'
-                
-                # Verificar se tem coordenadas válidas
-                has_valid_coordinates = (
-                    latitude is not None and 
-                    longitude is not None and
-                    -90 <= latitude <= 90 and
-                    -180 <= longitude <= 180
-                )
-                
-                obra = {
-                    'id': index + 1,
-                    'encarregado': encarregado,
-                    'supervisor': supervisor,
-                    'projeto': projeto,
-                    'cliente': cliente,
-                    'localidade': localidade,
-                    'criterio': criterio,
-                    'anotacoes': anotacoes,
-                    'postesPrevistos': int(postes_previstos),
-                    'dataInicio': data_inicio,
-                    'prazo': prazo,
-                    'obraSemana': obra_semana,
-                    'motivoAtraso': motivo_atraso,
-                    'atividadeDia': atividade_dia,
-                    'programacaoLv': programacao_lv,
-                    'cavasRealizadas': int(cavas_realizadas),
-                    'postesImplantados': int(postes_implantados),
-                    'latitude': latitude,
-                    'longitude': longitude,
-                    'hasCoordinates': has_valid_coordinates,
-                    'clientesPrevistos': int(clientes_previstos),
-                    'projetoKit': projeto_kit,
-                    'projetoMedidor': projeto_medidor,
-                    'arCoelba': ar_coelba,
-                    'dataVisitaPrevia': data_visita_previa,
-                    'observacaoVisita': observacao_visita,
-                    'analisePreFechamento': analise_pre_fechamento,
-                    'dataSolicitacaoReserva': data_solicitacao_reserva,
-                    'progresso': progresso,
-                    'isEnergizada': is_energizada,
-                    'status': status
-                }
-                
-                # Só adicionar se tiver projeto válido
-                if projeto and projeto != 'nan':
-                    obras.append(obra)
-                    # Debug: mostrar coordenadas das primeiras 3 obras
-                    if len(obras) <= 3:
-                        print(f"Obra {projeto}: Status={status}, DataInicio={dt_inicio}, DataTermino={dt_termino}, Hoje={hoje}")
-                    
-                    
-            except Exception as e:
-                print(f"Erro ao processar linha {index}: {e}")
-                continue
-        
-        return obras
+        obras = normalizar_dataframe_obras(df)
+        hoje = datetime.now().date()
+        obras['status'] = calcular_status_obras(obras, hoje)
+
+        # Debug: mostrar status das primeiras 3 obras
+        for _, obra in obras.head(3).iterrows():
+            dt_inicio = datetime.fromordinal(int(obra['_inicio'])).date() if pd.notna(obra['_inicio']) else None
+            dt_termino = datetime.fromordinal(int(obra['_termino'])).date() if pd.notna(obra['_termino']) else None
+            logger.debug(f"Obra {obra['projeto']}: Status={obra['status']}, DataInicio={dt_inicio}, DataTermino={dt_termino}, Hoje={hoje}")
+
+        return obras[CHAVES_OBRA].to_dict('records')
     except Exception as e:
         raise Exception(f"Erro ao processar planilha: {str(e)}")
 
+def normalizar_dataframe_obras(df):
+    """
+    Converte o DataFrame bruto da planilha mensal nas obras normalizadas, sem o status
+
+    Args:
+        df (DataFrame): Planilha como retornada por pd.read_excel (não é modificado)
+
+    Returns:
+        DataFrame: Uma linha por obra válida com as colunas de CHAVES_OBRA_NORMALIZADA,
+                   mais _inicio e _termino (ordinais das datas, NaN se vazias)
+
+    Funcionalidade:
+        - Converte cada coluna de uma vez (texto, números, coordenadas e datas)
+        - Linhas com valores numéricos inválidos são descartadas
+        - Progresso = postes implantados / postes previstos (máximo 100%)
+        - hasCoordinates indica latitude/longitude válidas
+        - Não depende da data atual: pode ficar em cache enquanto a planilha não mudar
+    """
+    if len(df.columns) < len(COLUNAS_PLANILHA_OBRAS):
+        logger.warning(f"Planilha com {len(df.columns)} colunas; esperado {len(COLUNAS_PLANILHA_OBRAS)}")
+        return pd.DataFrame(columns=CHAVES_OBRA_NORMALIZADA + ['_inicio', '_termino'])
+
+    df = df.iloc[:, :len(COLUNAS_PLANILHA_OBRAS)].reset_index(drop=True)
+    df.columns = [chave for chave, _ in COLUNAS_PLANILHA_OBRAS]
+
+    obras = pd.DataFrame({'id': np.arange(1, len(df) + 1)})
+    invalidos = pd.Series(False, index=df.index)
+
+    for chave, padrao in COLUNAS_PLANILHA_OBRAS:
+        if padrao is not None:
+            obras[chave] = coluna_texto(df[chave], padrao)
+    obras['projeto'] = coluna_texto(df['projeto'], '').where(
+        df['projeto'].notna(), 'B-' + obras['id'].astype(str).str.zfill(4))
+
+    numericas = {}
+    for chave in ('postesPrevistos', 'cavasRealizadas', 'postesImplantados', 'clientesPrevistos'):
+        numericas[chave], invalidos_coluna = coluna_numerica(df[chave])
+        invalidos |= invalidos_coluna
+        obras[chave] = np.trunc(numericas[chave].where(~invalidos_coluna, 0)).astype('int64')
+
+    latitude = coluna_coordenada(df['latitude'])
+    longitude = coluna_coordenada(df['longitude'])
+    obras['latitude'] = latitude.astype(object).where(latitude.notna(), None)
+    obras['longitude'] = longitude.astype(object).where(longitude.notna(), None)
+    obras['hasCoordinates'] = latitude.between(-90, 90) & longitude.between(-180, 180)
+
+    # Calcular progresso
+    previstos = numericas['postesPrevistos']
+    razao = numericas['postesImplantados'] / previstos.where(previstos > 0)
+    progresso = np.minimum(np.round(razao * 100), 100)
+    obras['progresso'] = progresso.where(previstos > 0, 0).fillna(0).astype('int64')
+
+    # Verificar se está energizada
+    obras['isEnergizada'] = obras['anotacoes'].str.upper().str.contains('ENERGIZADA', regex=False)
+
+    # Datas usadas no status, já convertidas (o status é calculado depois, para cada dia)
+    obras['_inicio'] = coluna_datas_ordinais(obras['dataInicio'])
+    obras['_termino'] = coluna_datas_ordinais(obras['prazo'])
+
+    # Só manter linhas com números válidos e projeto válido
+    manter = ~invalidos & (obras['projeto'] != '') & (obras['projeto'] != 'nan')
+    for idx in invalidos[invalidos].index:
+        logger.debug(f"Erro ao processar linha {idx}: valor numérico inválido")
+    if invalidos.any():
+        logger.warning(f"{int(invalidos.sum())} linha(s) descartada(s) por valor numérico inválido")
+
+    return obras.loc[manter, CHAVES_OBRA_NORMALIZADA + ['_inicio', '_termino']].reset_index(drop=True)
+
+def calcular_status_obras(obras, hoje):
+    """
+    Calcula o status de cada obra normalizada para a data informada
+
+    Args:
+        obras (DataFrame): Resultado de normalizar_dataframe_obras
+        hoje (date): Data de referência
+
+    Returns:
+        ndarray: Status de cada obra (mesma ordem das linhas)
+
+    Lógica de status (na ordem de prioridade):
+        1. ENERGIZADA: Anotações contém "ENERGIZADA" OU Data de término < hoje
+        2. CONCLUÍDA: Progresso >= 100%
+        3. PROGRAMADA: Data início > hoje
+        4. EM ANDAMENTO: Data início <= hoje (término, se houver, ainda não passou)
+        5. Sem data de início: Em Andamento se houver progresso, senão Programada
+    """
+    hoje_ordinal = hoje.toordinal()
+    inicio = obras['_inicio'].to_numpy(dtype=float)
+    termino = obras['_termino'].to_numpy(dtype=float)
+    progresso = obras['progresso'].to_numpy()
+
+    return np.select(
+        [
+            obras['isEnergizada'].to_numpy(dtype=bool) | (termino < hoje_ordinal),
+            progresso >= 100,
+            inicio > hoje_ordinal,
+            inicio <= hoje_ordinal,
+            progresso > 0,
+        ],
+        ['Energizada', 'Concluída', 'Programada', 'Em Andamento', 'Em Andamento'],
+        default='Programada'
+    )
+
 # Endpoint de login
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -439,76 +596,62 @@ def login():
 # Endpoint para upload de programação do dia
 @app.route('/api/programacao-dia/upload', methods=['POST', 'OPTIONS'])
 def upload_programacao_dia():
-    global programacao_dia_data
-
     # Handle CORS preflight
     if request.method == 'OPTIONS':
         return '', 200
 
     try:
-        print("📤 Recebendo upload de programação do dia...")
-        print(f"📋 Files na request: {list(request.files.keys())}")
+        logger.info("📤 Recebendo upload de programação do dia...")
+        logger.debug(f"📋 Files na request: {list(request.files.keys())}")
 
         # Verificar se há arquivo na requisição
         if 'file' not in request.files:
-            print("❌ Nenhum arquivo na request")
+            logger.warning("❌ Nenhum arquivo na request")
             return jsonify({'error': 'Nenhum arquivo enviado', 'success': False}), 400
 
         file = request.files['file']
-        print(f"📄 Arquivo recebido: {file.filename}")
+        logger.debug(f"📄 Arquivo recebido: {file.filename}")
 
         # Verificar se o arquivo tem nome
         if file.filename == '':
-            print("❌ Nome de arquivo vazio")
+            logger.warning("❌ Nome de arquivo vazio")
             return jsonify({'error': 'Nome de arquivo vazio', 'success': False}), 400
 
         # Verificar extensão do arquivo
         if not allowed_file(file.filename):
-            print(f"❌ Extensão não permitida: {file.filename}")
+            logger.warning(f"❌ Extensão não permitida: {file.filename}")
             return jsonify({
                 'error': 'Tipo de arquivo não permitido. Apenas arquivos .xlsx ou .xls são aceitos',
                 'success': False
             }), 400
 
-        # Salvar temporariamente para processar
-        temp_filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'temp_programacao_dia.xlsx')
-        file.save(temp_filepath)
-
-        print(f"✅ Arquivo temporário salvo: {temp_filepath}")
-        print(f"✅ Tamanho do arquivo: {os.path.getsize(temp_filepath)} bytes")
+        # Processar o arquivo em memória (cada upload tem seu próprio buffer, sem arquivo temporário)
+        conteudo = io.BytesIO(file.read())
+        logger.debug(f"✅ Tamanho do arquivo: {len(conteudo.getbuffer())} bytes")
 
-        # Processar o arquivo
         try:
-            programacao_dia_data = processar_programacao_dia(temp_filepath)
-            total_itens = len(programacao_dia_data)
-            print(f"✅ Programação processada: {total_itens} itens encontrados")
-
-            # Remover arquivo temporário
-            os.remove(temp_filepath)
+            programacao = processar_programacao_dia(conteudo)
+            total_itens = len(programacao)
+            versao = obter_estado_programacao().definir(programacao)
+            logger.info(f"✅ Programação processada: {total_itens} itens encontrados (versão {versao})")
 
             return jsonify({
                 'success': True,
                 'message': f'Programação do dia carregada com sucesso!',
                 'total_itens': total_itens,
-                'programacao': programacao_dia_data
+                'programacao': programacao,
+                'versao': versao
             }), 200
 
         except Exception as e:
-            # Remover arquivo temporário em caso de erro
-            if os.path.exists(temp_filepath):
-                os.remove(temp_filepath)
-            print(f"❌ Erro ao processar programação: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"❌ Erro ao processar programação: {str(e)}")
             return jsonify({
                 'error': f'Erro ao processar arquivo: {str(e)}. Verifique se as colunas estão na ordem: Data, Projeto, Supervisor, Encarregado, Título, Município, Atividade Programada, Critério',
                 'success': False
             }), 400
 
     except Exception as e:
-        print(f"❌ Erro no upload: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Erro no upload: {str(e)}")
         return jsonify({
             'error': f'Erro no upload: {str(e)}',
             'success': False
@@ -517,139 +660,1404 @@ def upload_programacao_dia():
 # Endpoint para buscar programação do dia atual
 @app.route('/api/programacao-dia', methods=['GET'])
 def get_programacao_dia():
-    global programacao_dia_data
+    """
+    Retorna a programação do dia atual
+
+    Parâmetros opcionais (query string):
+        versao: número de uma versão anterior (as últimas versões ficam disponíveis)
+    """
+    try:
+        versao = int(request.args['versao']) if request.args.get('versao') else None
+    except ValueError:
+        return jsonify({'error': 'Parâmetro inválido: versao', 'success': False}), 400
 
+    snapshot = obter_estado_programacao().obter(versao)
+    if snapshot is None:
+        return jsonify({'error': f'Versão {versao} não disponível', 'success': False}), 404
+    versao, programacao = snapshot
+
+    return jsonify({
+        'success': True,
+        'total': len(programacao),
+        'programacao': programacao,
+        'versao': versao
+    }), 200
+
+# Endpoint com as versões disponíveis da programação do dia
+@app.route('/api/programacao-dia/versoes', methods=['GET'])
+def get_versoes_programacao_dia():
+    estado = obter_estado_programacao()
     return jsonify({
         'success': True,
-        'total': len(programacao_dia_data),
-        'programacao': programacao_dia_data
+        'armazenamento': estado.tipo,
+        'versoes': estado.versoes()
     }), 200
 
 # Endpoint para salvar programação do dia na pasta ProgramacaoNovembro
 @app.route('/api/programacao-dia/salvar', methods=['POST'])
 def salvar_programacao_dia():
-    global programacao_dia_data
-
     try:
-        if not programacao_dia_data:
+        estado = obter_estado_programacao()
+        versao, programacao = estado.obter()
+        if not programacao:
             return jsonify({
                 'error': 'Nenhuma programação carregada. Faça upload de um arquivo primeiro.',
                 'success': False
             }), 400
 
         # Obter dados atualizados do request (caso tenha modificações)
+        # Se o cliente informar a versão que editou, uma alteração concorrente gera 409
         data = request.get_json()
         if data and 'programacao' in data:
-            programacao_dia_data = data['programacao']
+            programacao = data['programacao']
+            versao = estado.definir(programacao, data.get('versao'))
 
         # Nome do arquivo com data do dia
         data_hoje = datetime.now().strftime('%d-%m-%Y')
         filename = f"{data_hoje}.xlsx"
         filepath = os.path.join(PROGRAMACAO_DIA_FOLDER, filename)
 
-        # Criar DataFrame com as colunas na ordem especificada
-        df = pd.DataFrame(programacao_dia_data)
-
-        # Reordenar colunas
+        # Salvar no Excel (colunas na ordem da planilha de upload, com cabeçalho formatado)
         colunas_ordenadas = ['data', 'projeto', 'supervisor', 'encarregado', 'titulo', 'municipio', 'atividadeProgramada', 'criterio']
-        df = df[colunas_ordenadas]
-
-        # Renomear colunas para o Excel
-        df.columns = ['Data', 'Projeto', 'Supervisor', 'Encarregado', 'Título', 'Município', 'Atividade Programada', 'Critério']
+        titulos = ['Data', 'Projeto', 'Supervisor', 'Encarregado', 'Título', 'Município', 'Atividade Programada', 'Critério']
+        linhas = (tuple(item.get(coluna) for coluna in colunas_ordenadas) for item in programacao)
+        exportacao.gravar_xlsx(filepath, data_hoje, titulos, linhas)
 
-        # Salvar no Excel
-        df.to_excel(filepath, index=False, engine='openpyxl')
-
-        print(f"✅ Programação salva: {filepath}")
+        logger.info(f"✅ Programação salva: {filepath}")
 
         return jsonify({
             'success': True,
             'message': f'Programação salva com sucesso!',
             'filename': filename,
-            'filepath': filepath
+            'filepath': filepath,
+            'versao': versao
         }), 200
 
+    except VersaoDesatualizada as e:
+        return jsonify({'error': str(e), 'versao': e.versao_atual, 'success': False}), 409
     except Exception as e:
-        print(f"❌ Erro ao salvar programação: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Erro ao salvar programação: {str(e)}")
         return jsonify({
             'error': f'Erro ao salvar programação: {str(e)}',
             'success': False
         }), 500
 
+def obter_banco_local():
+    """Banco SQLite local (uploads/banco_local.sqlite3) com as planilhas importadas"""
+    return obter_banco(os.path.join(app.config['UPLOAD_FOLDER'], app.config['BANCO_LOCAL']))
+
+def carregar_mainbd_banco(caminho_arquivo):
+    """
+    Retorna o MainBD a partir do banco local, importando a planilha se ela mudou
+
+    Funcionalidade:
+        - Só abre o Excel quando o arquivo é novo ou foi alterado
+        - Após reiniciar o servidor, o MainBD vem do instantâneo Arrow (ou do SQLite)
+    """
+    banco = obter_banco_local()
+    banco.sincronizar(caminho_arquivo, 'mainbd', carregar_mainbd)
+    return carregar_com_instantaneo(caminho_arquivo, 'mainbd', lambda: banco.ler_tabela('mainbd'))
+
+def ler_planilha_obras(caminho_arquivo):
+    """Lê a planilha mensal bruta, nomeando as 26 primeiras colunas com as chaves da API"""
+    df = ler_excel(caminho_arquivo, header=0)
+    nomes = [chave for chave, _ in COLUNAS_PLANILHA_OBRAS]
+    df.columns = nomes[:len(df.columns)] + [str(c) for c in df.columns[len(nomes):]]
+    return df
+
+def carregar_obras_banco(caminho_arquivo):
+    """Retorna a planilha mensal bruta a partir do banco local, importando-a se mudou"""
+    banco = obter_banco_local()
+    banco.sincronizar(caminho_arquivo, 'obras', ler_planilha_obras)
+    return carregar_com_instantaneo(caminho_arquivo, 'obras', lambda: banco.ler_tabela('obras'))
+
+def ler_programacao_salva(caminho_arquivo):
+    """
+    Lê uma programação diária salva (DD-MM-YYYY.xlsx) para importação no banco local
+
+    Returns:
+        DataFrame: Colunas data, projeto, supervisor, encarregado, titulo, municipio,
+                   atividadeProgramada, criterio e data_arquivo (YYYY-MM-DD, do nome do arquivo)
+    """
+    df = ler_excel(caminho_arquivo, header=0).iloc[:, :len(COLUNAS_PROGRAMACAO_DIA)]
+    df.columns = COLUNAS_PROGRAMACAO_DIA[:len(df.columns)]
+    df = df.dropna(subset=['projeto'])
+    for coluna in df.columns:
+        df[coluna] = coluna_texto(df[coluna], '')
+
+    nome = os.path.splitext(os.path.basename(caminho_arquivo))[0]
+    data_arquivo = pd.to_datetime(nome, format='%d-%m-%Y', errors='coerce')
+    df['data_arquivo'] = data_arquivo.strftime('%Y-%m-%d') if pd.notna(data_arquivo) else None
+    return df
+
+def sincronizar_programacoes_salvas():
+    """
+    Importa para o banco local as programações diárias novas ou alteradas
+
+    Funcionalidade:
+        - Verifica apenas mtime/tamanho de cada arquivo da pasta ProgramacaoNovembro
+        - Reimporta somente os arquivos alterados (demais permanecem no banco)
+        - Remove do banco as programações cujos arquivos foram apagados
+    """
+    banco = obter_banco_local()
+    arquivos = [
+        os.path.join(PROGRAMACAO_DIA_FOLDER, nome)
+        for nome in sorted(os.listdir(PROGRAMACAO_DIA_FOLDER))
+        if nome.lower().endswith('.xlsx') and not nome.startswith('~$')
+    ]
+    for caminho in arquivos:
+        banco.sincronizar(caminho, 'programacao_dia', ler_programacao_salva, substituir=False)
+    banco.remover_ausentes('programacao_dia', arquivos)
+    return banco
+
+_cache_arquivo_programacao = {'chave': None, 'arquivo': None}
+_lock_arquivo_programacao = threading.Lock()
+
+def obter_arquivo_programacao():
+    """
+    Arquivo histórico de todas as programações diárias salvas, indexado por dia/projeto/equipe
+
+    Returns:
+        ArquivoProgramacao: Programações em memória com índices para consulta
+
+    Funcionalidade:
+        - Importa no banco local apenas os arquivos novos ou alterados
+        - Remonta o arquivo em memória somente quando algum arquivo mudou
+    """
+    banco = sincronizar_programacoes_salvas()
+    chave = tuple(
+        (arquivo['caminho'], arquivo['mtime_ns'], arquivo['tamanho'])
+        for arquivo in banco.arquivos() if arquivo['tabela'] == 'programacao_dia'
+    )
+
+    with _lock_arquivo_programacao:
+        if _cache_arquivo_programacao['arquivo'] is not None and _cache_arquivo_programacao['chave'] == chave:
+            metricas.incrementar('cache_total', cache='arquivo_programacao', resultado='acerto')
+            return _cache_arquivo_programacao['arquivo']
+
+        metricas.incrementar('cache_total', cache='arquivo_programacao', resultado='falha')
+        with metricas.etapa('indice_programacoes'):
+            if chave:
+                df = banco.ler_tabela('programacao_dia')
+            else:
+                df = pd.DataFrame(columns=COLUNAS_PROGRAMACAO_DIA + ['data_arquivo'])
+            arquivo = ArquivoProgramacao(df)
+        _cache_arquivo_programacao.update(chave=chave, arquivo=arquivo)
+        logger.info(f"🗂️ Arquivo de programações: {len(arquivo)} linhas em {len(arquivo.dias_disponiveis())} dia(s)")
+        return arquivo
+
+# Colunas da BDProgramacao.xlsx (produção realizada por dia): coluna no Excel -> chave da API
+COLUNAS_BD_PROGRAMACAO = {
+    'DATA': 'data',
+    'PROJETO': 'projeto',
+    'ENCARREGADO': 'encarregado',
+    'SUPERVISOR': 'supervisor',
+    'TITULO': 'titulo',
+    'ATIVIDADE PROGRAMADA': 'atividadeProgramada',
+    'LOCAÇÃO': 'locacao',
+    'CAV PREV': 'cavaPrevista',
+    'CAVA REAL': 'cavaReal',
+    'CAVA EM ROCHA': 'cavaEmRocha',
+    'POSTE PREV': 'postePrevisto',
+    'POSTE REAL': 'posteReal',
+    'EVENTO': 'evento',
+    'RESPONSAVEL': 'responsavel',
+    'JUSTIFICATIVA': 'justificativa',
+}
+
+# Quantidades da produção realizada (somadas quando a mesma equipe aparece mais de uma vez na obra)
+CAMPOS_PRODUCAO_NUMERICOS = ['locacao', 'cavaPrevista', 'cavaReal', 'cavaEmRocha', 'postePrevisto', 'posteReal']
+
+def carregar_bd_programacao(caminho_arquivo):
+    """
+    Lê a BDProgramacao.xlsx (produção realizada) com as chaves da API
+
+    Returns:
+        DataFrame: Uma linha por equipe/obra/dia, com "dia" (ordinal), quantidades numéricas
+                   (0 se vazias) e textos ('' se vazios)
+    """
+    df = ler_excel(caminho_arquivo, header=0)
+    df = df[[coluna for coluna in COLUNAS_BD_PROGRAMACAO if coluna in df.columns]].rename(columns=COLUNAS_BD_PROGRAMACAO)
+
+    datas = pd.to_datetime(df['data'], errors='coerce', dayfirst=True)
+    df = df.loc[datas.notna() & df['projeto'].notna()].copy()
+    df['dia'] = datas[df.index].map(lambda dia: dia.toordinal()).astype('int64')
+    df = df.drop(columns=['data'])
+
+    for chave in COLUNAS_BD_PROGRAMACAO.values():
+        if chave == 'data':
+            continue
+        if chave in CAMPOS_PRODUCAO_NUMERICOS:
+            df[chave] = pd.to_numeric(df[chave], errors='coerce').fillna(0) if chave in df.columns else 0
+        else:
+            df[chave] = coluna_texto(df[chave], '').str.strip() if chave in df.columns else ''
+    return df.reset_index(drop=True)
+
+def obter_bd_programacao():
+    """Entrada do cache da BDProgramacao.xlsx, ou None se o arquivo não existir"""
+    caminho = os.path.join(app.config['UPLOAD_FOLDER'], 'BD', 'BDProgramacao.xlsx')
+    if not os.path.exists(caminho):
+        return None
+    return cache_planilhas.obter(
+        caminho,
+        lambda arquivo: carregar_com_instantaneo(arquivo, 'bd_programacao', lambda: carregar_bd_programacao(arquivo)),
+        serializar_registros
+    )
+
+def calcular_progresso(producao):
+    """
+    Progresso (0 a 100) de uma obra no dia
+
+    Funcionalidade:
+        - Com postes previstos: postes realizados / previstos
+        - Senão, com cavas previstas: (cavas + cavas em rocha) / previstas
+        - Sem previsão: 100 se o evento for EXECUTADO, senão 0
+    """
+    if producao['postePrevisto'] > 0:
+        razao = producao['posteReal'] / producao['postePrevisto']
+    elif producao['cavaPrevista'] > 0:
+        razao = (producao['cavaReal'] + producao['cavaEmRocha']) / producao['cavaPrevista']
+    else:
+        razao = 1 if normalizar_chave(producao['evento']) == 'EXECUTADO' else 0
+    return int(min(round(razao * 100), 100))
+
+def montar_producao_dia(arquivo, realizado, dia):
+    """
+    Junta a programação salva do dia com a produção realizada (BDProgramacao)
+
+    Args:
+        arquivo (ArquivoProgramacao): Programações salvas
+        realizado (DataFrame): BDProgramacao normalizada (ou None)
+        dia (int): Ordinal do dia
+
+    Returns:
+        list: Itens no formato esperado pela tela de Produção do Dia; obras com produção
+              lançada mas sem programação salva também são incluídas
+    """
+    vazio = {chave: 0 for chave in CAMPOS_PRODUCAO_NUMERICOS}
+    vazio.update(evento='', responsavel='', justificativa='')
+
+    producoes = {}
+    for item in arquivo.registros(arquivo.filtrar(inicio=dia, fim=dia)):
+        chave = (normalizar_chave(item['projeto']), normalizar_chave(item['encarregado']))
+        producoes.setdefault(chave, {
+            'projeto': item['projeto'], 'encarregado': item['encarregado'], 'supervisor': item['supervisor'],
+            'titulo': item['titulo'], 'municipio': item['municipio'],
+            'atividadeProgramada': item['atividadeProgramada'], 'criterio': item['criterio'], **vazio,
+        })
+
+    if realizado is not None and len(realizado):
+        do_dia = realizado.loc[realizado['dia'] == dia]
+        for linha in do_dia.to_dict('records'):
+            chave = (normalizar_chave(linha['projeto']), normalizar_chave(linha['encarregado']))
+            producao = producoes.get(chave)
+            if producao is None:
+                producao = producoes[chave] = {
+                    'projeto': linha['projeto'], 'encarregado': linha['encarregado'], 'supervisor': linha['supervisor'],
+                    'titulo': linha['titulo'], 'municipio': '', 'atividadeProgramada': linha['atividadeProgramada'],
+                    'criterio': '', **vazio,
+                }
+            for campo in CAMPOS_PRODUCAO_NUMERICOS:
+                producao[campo] += linha[campo]
+            for campo in ('evento', 'responsavel', 'justificativa'):
+                producao[campo] = producao[campo] or linha[campo]
+
+    lista = list(producoes.values())
+    for producao in lista:
+        for campo in CAMPOS_PRODUCAO_NUMERICOS:
+            valor = float(producao[campo])
+            producao[campo] = int(valor) if valor.is_integer() else valor
+        producao['progresso'] = calcular_progresso(producao)
+        producao['status'] = producao['evento']
+    return lista
+
+# Endpoint da produção do dia: programação salva + produção realizada
+@app.route('/api/producao-dia', methods=['GET'])
+def get_producao_dia():
+    """
+    Produção de um dia a partir do arquivo de programações salvas
+
+    Parâmetros opcionais (query string):
+        data: dia consultado (DD-MM-YYYY ou YYYY-MM-DD); padrão: hoje, ou o último dia salvo
+    """
+    try:
+        arquivo = obter_arquivo_programacao()
+        entrada_bd = obter_bd_programacao()
+
+        try:
+            if request.args.get('data'):
+                dia = ordinal_dia(request.args['data'])
+            else:
+                dia = datetime.now().date().toordinal()
+                disponiveis = arquivo.dias_disponiveis()
+                if dia not in disponiveis and len(disponiveis):
+                    dia = int(disponiveis[-1])
+        except ValueError as e:
+            return jsonify({'error': f'Data inválida: {str(e)}', 'success': False}), 400
+
+        producoes = montar_producao_dia(arquivo, entrada_bd.dados if entrada_bd else None, dia)
+        return jsonify({
+            'success': True,
+            'data': texto_dia(dia),
+            'total': len(producoes),
+            'producoes': producoes
+        }), 200
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"❌ Erro ao buscar produção do dia: {str(e)}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+# Endpoint de consulta ao histórico de programações salvas
+@app.route('/api/programacao-dia/historico', methods=['GET'])
+def get_historico_programacao():
+    """
+    Consulta as programações de todos os dias salvos
+
+    Parâmetros opcionais (query string):
+        projeto, encarregado, supervisor: valores separados por vírgula
+        inicio, fim: período (DD-MM-YYYY ou YYYY-MM-DD)
+        limit, cursor: paginação; o cursor é o nextCursor da página anterior
+
+    Exemplo: /api/programacao-dia/historico?encarregado=JAILSON&projeto=B-1225231
+    retorna as linhas e a lista "dias" em que a equipe esteve programada na obra.
+    """
+    try:
+        try:
+            filtros = {
+                campo: separar_valores(request.args[campo])
+                for campo in CAMPOS_ARQUIVO if request.args.get(campo)
+            }
+            inicio = ordinal_dia(request.args['inicio']) if request.args.get('inicio') else None
+            fim = ordinal_dia(request.args['fim']) if request.args.get('fim') else None
+            limite = int(request.args['limit']) if request.args.get('limit') else None
+            cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+            if limite is not None and limite < 1:
+                raise ValueError('limit deve ser maior que zero')
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}', 'success': False}), 400
+
+        arquivo = obter_arquivo_programacao()
+        posicoes = arquivo.filtrar(filtros, inicio, fim)
+        pagina, proximo = arquivo.pagina(posicoes, cursor, limite)
+
+        return jsonify({
+            'success': True,
+            'total': len(posicoes),
+            'dias': [texto_dia(dia) for dia in np.unique(arquivo.dias[posicoes])],
+            'programacao': arquivo.registros(pagina),
+            'nextCursor': proximo
+        }), 200
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"❌ Erro ao consultar histórico de programações: {str(e)}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+def carregar_mainbd(caminho_arquivo):
+    """
+    Lê o MainBD.xlsx e normaliza os tipos para serialização em JSON
+
+    Args:
+        caminho_arquivo (str): Caminho do MainBD.xlsx
+
+    Returns:
+        DataFrame: Dados do MainBD com datas/horários como texto e NaN/inf como None
+    """
+    df = ler_excel(caminho_arquivo, header=0)
+
+    # Converter datas e horários para strings
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype(str)
+        elif df[col].dtype == 'object':
+            # Converter objetos time para string
+            df[col] = df[col].apply(lambda x: str(x) if x is not None and not pd.isna(x) else None)
+
+    # Substituir todos os tipos de NaN por None
+    df = df.replace([np.nan, np.inf, -np.inf], None)
+    df = df.where(pd.notnull(df), None)
+
+    logger.info(f"Total de registros processados: {len(df)}")
+    return df
+
+def serializar_registros(df):
+    """Serializa o DataFrame como lista JSON de registros (bytes UTF-8)"""
+    return df.to_json(orient='records', date_format='iso').encode('utf-8')
+
+def resposta_json_cache(entrada):
+    """
+    Monta a resposta HTTP a partir de uma entrada do cache de planilhas
+
+    Funcionalidade:
+        - Envia o JSON já serializado, sem novo parse/serialização
+        - Define ETag e Last-Modified da versão do arquivo em disco
+        - Responde 304 quando o cliente já possui a mesma versão
+    """
+    codificacao = negociar_codificacao(request.headers.get('Accept-Encoding'))
+    if codificacao and len(entrada.json_bytes) >= TAMANHO_MINIMO_COMPRESSAO:
+        # Comprimido uma única vez por versão do arquivo
+        response = Response(entrada.comprimido(codificacao), status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = codificacao
+        response.set_etag(entrada.etag, weak=True)
+    else:
+        response = Response(entrada.json_bytes, status=200, mimetype='application/json')
+        response.set_etag(entrada.etag)
+    response.vary.add('Accept-Encoding')
+    response.last_modified = entrada.last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def modo_streaming():
+    """
+    Verifica se o cliente pediu a resposta em streaming
+
+    Returns:
+        str: 'ndjson' (?format=ndjson ou Accept: application/x-ndjson),
+             'json' (?stream=1, array JSON enviado em partes) ou None
+    """
+    if request.args.get('format') == 'ndjson' or MIMETYPE_NDJSON in request.headers.get('Accept', ''):
+        return 'ndjson'
+    if request.args.get('stream', '').lower() in ('1', 'true', 'sim'):
+        return 'json'
+    return None
+
+def resposta_stream(partes, mimetype):
+    """
+    Resposta HTTP enviada em partes (chunked), comprimida conforme o Accept-Encoding
+
+    Args:
+        partes (iterable): Gerador de blocos de bytes
+        mimetype (str): Tipo do conteúdo (application/json ou application/x-ndjson)
+    """
+    codificacao = negociar_codificacao(request.headers.get('Accept-Encoding'))
+    response = Response(stream_with_context(comprimir_stream(partes, codificacao)), status=200, mimetype=mimetype)
+    if codificacao:
+        response.headers['Content-Encoding'] = codificacao
+    response.vary.add('Accept-Encoding')
+    return response
+
+def rota_da_requisicao():
+    """Regra da rota atendida (ex: /api/obras/atualizar/<int:obra_id>), para rótulos de métricas"""
+    return request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+
+@app.before_request
+def iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+
+# Registrado antes de comprimir_resposta: o Flask executa os after_request na ordem
+# inversa, então a medição vê o tamanho final (comprimido) da resposta
+@app.after_request
+def registrar_metricas_requisicao(response):
+    """
+    Registra a latência e o tamanho da resposta por rota
+
+    Funcionalidade:
+        - Respostas comuns: duração até a resposta pronta e tamanho do corpo
+        - Respostas em streaming: medidas quando o envio termina (duração total e bytes enviados)
+    """
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is None:
+        return response
+    rotulos = {'rota': rota_da_requisicao(), 'metodo': request.method, 'status': response.status_code}
+
+    def registrar(tamanho):
+        metricas.observar('requisicao_segundos', time.perf_counter() - inicio, **rotulos)
+        if tamanho is not None:
+            metricas.observar('resposta_bytes', tamanho, rota=rotulos['rota'])
+
+    if not response.is_streamed:
+        registrar(response.content_length)
+        return response
+
+    enviados = [0]
+    partes = response.response
+
+    def contar_partes():
+        for parte in partes:
+            enviados[0] += len(parte)
+            yield parte
+
+    response.response = contar_partes()
+    response.call_on_close(lambda: registrar(enviados[0]))
+    return response
+
+@app.after_request
+def comprimir_resposta(response):
+    """
+    Comprime respostas JSON comuns (não streaming) quando o cliente aceita gzip/brotli
+
+    Funcionalidade:
+        - Ignora respostas pequenas, de erro, em streaming ou já comprimidas
+        - ETag passa a ser fraco, pois o corpo enviado é a versão comprimida
+    """
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.mimetype != 'application/json'):
+        return response
+
+    codificacao = negociar_codificacao(request.headers.get('Accept-Encoding'))
+    response.vary.add('Accept-Encoding')
+    if not codificacao or (response.content_length or 0) < TAMANHO_MINIMO_COMPRESSAO:
+        return response
+
+    response.set_data(comprimir(response.get_data(), codificacao))
+    response.headers['Content-Encoding'] = codificacao
+    etag, fraco = response.get_etag()
+    if etag and not fraco:
+        response.set_etag(etag, weak=True)
+    return response
+
+# Classe de custo das rotas (as não listadas são 'normal')
+#   - pesada: abre, processa ou grava planilhas do Excel; concorrência limitada
+#   - normal: usa os caches; só a leitura de uma planilha com o cache vazio ou
+#     desatualizado ocupa uma vaga pesada (vaga_leitura)
+#   - leve: sem planilhas; nunca limitada nem enfileirada
+CLASSES_ROTAS = {
+    '/api/programacao-dia/upload': 'pesada',
+    '/api/programacao-dia/salvar': 'pesada',
+    '/api/producao-dia': 'pesada',
+    '/api/programacao-dia/historico': 'pesada',
+    '/api/mainbd': 'pesada',
+    '/api/exportar/obras': 'pesada',
+    '/api/exportar/mainbd': 'pesada',
+    '/api/obras/adicionar': 'pesada',
+    '/api/obras/atualizar/<int:obra_id>': 'pesada',
+    '/api/obras/aplicar-programacao': 'pesada',
+    '/api/login': 'leve',
+    '/api/atividades': 'leve',
+    '/api/projeto-config/<projeto_id>': 'leve',
+    '/api/obras/gravacao': 'leve',
+    '/api/saude': 'leve',
+    '/api/cache/status': 'leve',
+    '/api/metrics': 'leve',
+}
+
+def classe_da_requisicao():
+    return CLASSES_ROTAS.get(rota_da_requisicao(), 'normal')
+
+def resposta_admissao_recusada(erro):
+    """Resposta 429 (com Retry-After) quando a requisição excede um limite de admissão"""
+    response = jsonify({'error': str(erro), 'success': False})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(erro.tentar_apos)
+    return response
+
+# Registrado depois de iniciar_medicao: as requisições recusadas também entram nas métricas
+@app.before_request
+def admitir_requisicao():
+    """
+    Aplica o controle de admissão da classe da rota
+
+    Funcionalidade:
+        - Limite por cliente (endereço IP) nas classes 'pesada' e 'normal'
+        - Classe 'pesada': ocupa uma vaga (ou aguarda na fila), devolvida em liberar_admissao
+        - Preflight CORS (OPTIONS) e rotas leves passam direto
+    """
+    if not app.config['ADMISSAO'] or request.method == 'OPTIONS':
+        return None
+    classe = classe_da_requisicao()
+    if classe == 'leve':
+        return None
+
+    controle_admissao.configurar(app.config['LIMITES_ADMISSAO'], app.config['CONCORRENCIA_PESADA'],
+                                 app.config['FILA_PESADA'], app.config['ESPERA_PESADA'])
+    try:
+        with metricas.etapa('espera_admissao'):
+            g.vagas_admissao = controle_admissao.admitir(classe, request.remote_addr or 'desconhecido')
+    except AdmissaoRecusada as e:
+        metricas.incrementar('admissao_total', classe=classe, resultado=e.motivo)
+        logger.warning(f"⚠️ Requisição recusada ({e.motivo}): {request.method} {request.path} de {request.remote_addr}")
+        return resposta_admissao_recusada(e)
+    g.inicio_admissao = time.perf_counter()
+    metricas.incrementar('admissao_total', classe=classe, resultado='admitida')
+    return None
+
+# teardown_request roda depois do envio completo, inclusive de respostas em partes (exportações)
+@app.teardown_request
+def liberar_admissao(erro=None):
+    vagas = g.pop('vagas_admissao', None)
+    if vagas is not None:
+        controle_admissao.liberar(vagas, time.perf_counter() - g.pop('inicio_admissao'))
+
+def obter_mainbd():
+    """
+    Retorna a entrada do cache do MainBD.xlsx, ou None se o arquivo não existir
+
+    Funcionalidade:
+        - Reprocessa a planilha somente se ela mudou desde a última leitura
+        - Compartilhado por /api/mainbd e pelos endpoints de indicadores
+    """
+    mainbd_path = os.path.join(app.config['UPLOAD_FOLDER'], 'BD', 'MainBD.xlsx')
+
+    if not os.path.exists(mainbd_path):
+        logger.warning(f"MainBD não encontrado em: {mainbd_path}")
+        return None
+
+    return cache_planilhas.obter(mainbd_path, carregar_mainbd_banco, serializar_registros)
+
+def intervalo_data_serv(inicio=None, fim=None):
+    """
+    Intervalo de data_serv para consultas no banco local (limites inclusivos)
+
+    Args:
+        inicio: Data inicial (texto YYYY-MM-DD ou Timestamp, opcional)
+        fim: Data final (texto YYYY-MM-DD ou Timestamp, opcional)
+
+    Returns:
+        tuple: ('data_serv', início, fim) com dias YYYY-MM-DD, comparados com o dia de
+               data_serv normalizado na importação (banco_local.DATAS)
+    """
+    inicio = pd.Timestamp(inicio).strftime('%Y-%m-%d') if inicio is not None else None
+    fim = pd.Timestamp(fim).strftime('%Y-%m-%d') if fim is not None else None
+    return ('data_serv', inicio, fim)
+
+# Filtros de /api/mainbd: parâmetro da URL -> coluna do MainBD (sem diferença de maiúsculas, banco_local.CHAVES)
+FILTROS_MAINBD = {
+    'equipe': 'des_equipe',
+    'supervisor': 'Supervisor',
+    'atividade': 'des_atividade',
+    'ssot': 'SS/OT',
+}
+
 # Endpoint para buscar dados do MainBD.xlsx (para dashboards)
 @app.route('/api/mainbd', methods=['GET'])
 def get_mainbd():
-    try:
-        import numpy as np
-        import json
-
-        # Arquivo MainBD.xlsx na pasta BD
-        mainbd_path = os.path.join(app.config['UPLOAD_FOLDER'], 'BD', 'MainBD.xlsx')
+    """
+    Retorna as linhas do MainBD
 
-        print(f"Procurando MainBD em: {mainbd_path}")
-        print(f"Arquivo existe? {os.path.exists(mainbd_path)}")
+    Sem parâmetros, devolve a planilha inteira (resposta em cache, com ETag).
 
-        if not os.path.exists(mainbd_path):
+    Parâmetros opcionais (query string):
+        equipe, supervisor, atividade, ssot: valores separados por vírgula
+        inicio, fim: período de data_serv (YYYY-MM-DD)
+        fields: colunas a retornar
+        limit, cursor: paginação; o próximo cursor vem no cabeçalho X-Next-Cursor
+    """
+    try:
+        entrada = obter_mainbd()
+        if entrada is None:
             return jsonify({'error': 'Arquivo MainBD.xlsx não encontrado no servidor'}), 404
 
-        # Ler Excel com pandas
-        df = pd.read_excel(mainbd_path, header=0)
+        streaming = modo_streaming()
+        mimetype = MIMETYPE_NDJSON if streaming == 'ndjson' else 'application/json'
+        serializar_blocos = ndjson_dataframes if streaming == 'ndjson' else array_json_dataframes
 
-        # Converter datas e horários para strings
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].astype(str)
-            elif df[col].dtype == 'object':
-                # Converter objetos time para string
-                df[col] = df[col].apply(lambda x: str(x) if x is not None and not pd.isna(x) else None)
+        parametros_consulta = [nome for nome in request.args if nome not in ('format', 'stream')]
+        if not parametros_consulta:
+            if streaming:
+                # Serializa em blocos direto do DataFrame em cache
+                return resposta_stream(serializar_blocos(blocos_dataframe(entrada.dados)), mimetype)
+            return resposta_json_cache(entrada)
 
-        # Substituir todos os tipos de NaN por None
-        df = df.replace([np.nan, np.inf, -np.inf], None)
-        df = df.where(pd.notnull(df), None)
+        try:
+            parametros = ler_parametros_paginacao()
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+
+        banco = obter_banco_local()
+        colunas_existentes = banco.colunas('mainbd')
+
+        campos = parametros['campos']
+        if campos is not None:
+            invalidos = [campo for campo in campos if campo not in colunas_existentes]
+            if invalidos:
+                return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+
+        filtros = {
+            coluna: separar_valores(request.args[parametro])
+            for parametro, coluna in FILTROS_MAINBD.items()
+            if request.args.get(parametro) and coluna in colunas_existentes
+        }
+        intervalo = intervalo_data_serv(parametros['inicio'], parametros['fim'])
+
+        if streaming and parametros['limite'] is None and parametros['cursor'] is None:
+            # Lê do SQLite em blocos e envia cada bloco assim que é serializado
+            blocos = banco.consultar('mainbd', filtros=filtros, intervalo=intervalo, colunas=campos,
+                                     blocos=LINHAS_POR_BLOCO)
+            response = resposta_stream(serializar_blocos(blocos), mimetype)
+            response.headers['X-Total-Count'] = str(banco.contar('mainbd', filtros=filtros, intervalo=intervalo))
+            return response
+
+        df = banco.consultar(
+            'mainbd', filtros=filtros, intervalo=intervalo, colunas=campos,
+            cursor=parametros['cursor'], limite=parametros['limite']
+        )
+
+        proximo = None
+        if '_cursor' in df.columns:
+            if parametros['limite'] is not None and len(df) == parametros['limite']:
+                proximo = str(int(df['_cursor'].iloc[-1]))
+            df = df.drop(columns=['_cursor'])
+
+        if streaming:
+            response = resposta_stream(serializar_blocos(blocos_dataframe(df)), mimetype)
+        else:
+            response = Response(serializar_registros(df), status=200, mimetype='application/json')
+        if proximo:
+            response.headers['X-Next-Cursor'] = proximo
+        response.headers['X-Total-Count'] = str(banco.contar('mainbd', filtros=filtros, intervalo=intervalo))
+        return response
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"Erro ao buscar MainBD: {e}")
+        return jsonify({'error': str(e)}), 500
 
-        # Converter para JSON string manualmente para garantir conversão correta
-        # Usar orient='records' e depois fazer parse manual
-        json_str = df.to_json(orient='records', date_format='iso')
-        data = json.loads(json_str)
+def resposta_indicadores(calcular):
+    """
+    Executa um cálculo de indicadores sobre o MainBD e monta a resposta JSON
 
-        print(f"Total de registros processados: {len(data)}")
+    Args:
+        calcular (callable): Recebe os agregados diários e as obras por dia e retorna o dicionário de indicadores
 
-        return jsonify(data), 200
+    Funcionalidade:
+        - Usa os agregados diários do MainBD (atualizados só com as linhas novas quando a planilha cresce)
+        - Com ?inicio=/&fim= (YYYY-MM-DD), considera apenas os dias do período em data_serv
+        - ETag combina a versão do MainBD com os parâmetros da consulta
+        - Responde 304 quando o cliente já possui o mesmo resultado
+    """
+    try:
+        entrada = obter_mainbd()
+        if entrada is None:
+            return jsonify({'error': 'Arquivo MainBD.xlsx não encontrado no servidor'}), 404
 
+        base, obras = agregados_mainbd.atualizar(entrada).periodo(request.args.get('inicio'), request.args.get('fim'))
+        response = jsonify({'success': True, **calcular(base, obras)})
+        chave = f"{entrada.etag}:{request.path}:{request.query_string.decode('utf-8')}"
+        response.set_etag(hashlib.sha1(chave.encode('utf-8')).hexdigest())
+        response.last_modified = entrada.last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
     except Exception as e:
-        print(f"Erro ao buscar MainBD: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Erro ao calcular indicadores: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Endpoints de indicadores dos dashboards (agregados no backend)
+@app.route('/api/dashboard/kpis', methods=['GET'])
+def get_dashboard_kpis():
+    mes = request.args.get('mes')
+    return resposta_indicadores(lambda base, obras: indicadores.resumo_kpis(base, mes, obras))
+
+@app.route('/api/dashboard/kpis/postes', methods=['GET'])
+def get_dashboard_kpis_postes():
+    mes = request.args.get('mes')
+    return resposta_indicadores(lambda base, obras: indicadores.indicadores_postes(base, mes))
+
+@app.route('/api/dashboard/kpis/cavas', methods=['GET'])
+def get_dashboard_kpis_cavas():
+    filtros = {
+        tipo: request.args.get(tipo, '').lower() in ('1', 'true', 'sim')
+        for tipo in ('normal', 'rocha', 'rompedor')
+    }
+    return resposta_indicadores(lambda base, obras: indicadores.indicadores_cavas(base, **filtros))
+
+@app.route('/api/dashboard/kpis/clientes', methods=['GET'])
+def get_dashboard_kpis_clientes():
+    return resposta_indicadores(lambda base, obras: indicadores.indicadores_clientes(base))
+
+@app.route('/api/dashboard/kpis/obras', methods=['GET'])
+def get_dashboard_kpis_obras():
+    return resposta_indicadores(lambda base, obras: indicadores.indicadores_obras(obras))
+
+# Colunas das obras normalizadas usadas por calcular_status_obras
+COLUNAS_STATUS_OBRAS = ['_inicio', '_termino', 'progresso', 'isEnergizada']
+
+_cache_obras = {'chave': None, 'normalizadas': None, 'colunas': None, 'dia': None, 'indice': None}
+_lock_cache_obras = threading.Lock()
+
+def obter_obras():
+    """
+    Obras processadas e indexadas a partir do modelo em memória
+
+    Returns:
+        IndiceObras: Lista de obras (com versão) e índices para os filtros
+
+    Funcionalidade:
+        - Normaliza a planilha apenas quando o modelo muda (edição ou planilha alterada)
+        - Inclui edições confirmadas que ainda não foram gravadas no disco
+        - O status depende da data atual: na virada do dia é recalculado a partir das
+          obras normalizadas em cache, sem reler nem reprocessar a planilha
+    """
+    modelo = obter_modelo_obras()
+    geracao, df = modelo.estado()
+    chave = (modelo.caminho, geracao)
+    hoje = datetime.now().date()
+
+    with _lock_cache_obras:
+        resultado = 'acerto'
+        if _cache_obras['chave'] != chave:
+            resultado = 'falha'
+            with metricas.etapa('processamento_obras'):
+                normalizadas = normalizar_dataframe_obras(df)
+                colunas = ColunasObras(normalizadas)
+            metricas.incrementar('linhas_processadas_total', len(df), etapa='obras')
+            # Do DataFrame só ficam as colunas usadas no cálculo do status
+            normalizadas = normalizadas[COLUNAS_STATUS_OBRAS]
+            _cache_obras.update(chave=chave, normalizadas=normalizadas, colunas=colunas, dia=None)
+            logger.info(f"Total de obras processadas: {colunas.total}")
+
+        if _cache_obras['dia'] != hoje:
+            if resultado == 'acerto':
+                resultado = 'status_recalculado'  # Virada do dia: só o status muda
+            with metricas.etapa('status_obras'):
+                normalizadas = _cache_obras['normalizadas']
+                status = calcular_status_obras(normalizadas, hoje)
+                obras, codigos = _cache_obras['colunas'].montar(status, modelo.versao)
+                indice = IndiceObras(obras, normalizadas['_inicio'].to_numpy(), codigos,
+                                     versao=f"{modelo.caminho}:{geracao}:{hoje.isoformat()}")
+            _cache_obras.update(dia=hoje, indice=indice)
+
+        metricas.incrementar('cache_total', cache='obras', resultado=resultado)
+        return _cache_obras['indice']
+
+def ler_parametros_paginacao():
+    """
+    Lê os parâmetros comuns de consulta: fields, limit, cursor, inicio e fim
+
+    Returns:
+        dict: campos (list ou None), limite (int ou None), cursor (int ou None),
+              inicio/fim (Timestamp ou None)
+
+    Raises:
+        ValueError: Parâmetro com formato inválido
+    """
+    campos = request.args.get('fields')
+    limite = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    inicio = request.args.get('inicio')
+    fim = request.args.get('fim')
+
+    if limite is not None and int(limite) < 1:
+        raise ValueError('limit deve ser maior que zero')
+
+    return {
+        'campos': separar_valores(campos) if campos else None,
+        'limite': int(limite) if limite is not None else None,
+        'cursor': int(cursor) if cursor else None,
+        'inicio': pd.Timestamp(inicio) if inicio else None,
+        'fim': pd.Timestamp(fim) if fim else None,
+    }
+
+def ler_bbox():
+    """
+    Lê o parâmetro bbox (min_lng,min_lat,max_lng,max_lat)
+
+    Returns:
+        tuple: Os 4 limites como float, ou None se ausente
+
+    Raises:
+        ValueError: Parâmetro com formato inválido
+    """
+    bbox = request.args.get('bbox')
+    if not bbox:
+        return None
+    bbox = tuple(float(valor) for valor in bbox.split(','))
+    if len(bbox) != 4:
+        raise ValueError('bbox deve ter 4 valores: min_lng,min_lat,max_lng,max_lat')
+    return bbox
+
 # Endpoint para buscar obras do mês (arquivo fixo)
 @app.route('/api/obras', methods=['GET'])
 @app.route('/api/obras/', methods=['GET'])
 def get_obras():
+    """
+    Lista as obras do mês
+
+    Parâmetros opcionais (query string):
+        status, supervisor, encarregado, localidade, criterio: valores separados por vírgula
+        inicio, fim: período de dataInicio (YYYY-MM-DD)
+        bbox: min_lng,min_lat,max_lng,max_lat (somente obras com coordenadas)
+        fields: campos a retornar (ex: id,projeto,status)
+        limit, cursor: paginação; o cursor é o nextCursor da página anterior
+    """
     try:
         # Arquivo fixo para obras do mês
         planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
 
-        print(f"Procurando planilha em: {planilha_path}")
-        print(f"Arquivo existe? {os.path.exists(planilha_path)}")
+        if not os.path.exists(planilha_path):
+            logger.warning(f"Planilha não encontrada em: {planilha_path}")
+            return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada no servidor'}), 404
 
+        try:
+            parametros = ler_parametros_paginacao()
+            filtros = {
+                campo: separar_valores(request.args[campo])
+                for campo in CAMPOS_INDEXADOS if request.args.get(campo)
+            }
+            bbox = ler_bbox()
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+
+        indice = obter_obras()
+
+        campos = parametros['campos']
+        if campos is not None:
+            invalidos = [campo for campo in campos if campo not in CAMPOS_OBRA]
+            if invalidos:
+                return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+            if 'id' not in campos:
+                campos = ['id'] + campos
+
+        inicio, fim = parametros['inicio'], parametros['fim']
+        posicoes = indice.filtrar(
+            filtros,
+            inicio=inicio.date().toordinal() if inicio is not None else None,
+            fim=fim.date().toordinal() if fim is not None else None,
+            bbox=bbox or None
+        )
+        pagina, proximo = indice.pagina(posicoes, parametros['cursor'], parametros['limite'])
+
+        streaming = modo_streaming()
+        if streaming:
+            registros = (indice.obras[posicao].para_dict(campos) for posicao in pagina)
+            if streaming == 'ndjson':
+                response = resposta_stream(ndjson_registros(registros), MIMETYPE_NDJSON)
+                response.headers['X-Total-Count'] = str(len(posicoes))
+                if proximo is not None:
+                    response.headers['X-Next-Cursor'] = str(proximo)
+                return response
+
+            cabecalho = json.dumps({'success': True, 'total': len(posicoes), 'nextCursor': proximo})
+            prefixo = (cabecalho[:-1] + ', "obras": [').encode('utf-8')
+            return resposta_stream(array_json_registros(registros, prefixo, b']}'), 'application/json')
+
+        with metricas.etapa('serializacao'):
+            response = jsonify({
+                'success': True,
+                'total': len(posicoes),
+                'obras': [indice.obras[posicao].para_dict(campos) for posicao in pagina],
+                'nextCursor': proximo
+            })
+        return response, 200
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"Erro ao buscar obras: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Campos das obras no mapa (padrão de /api/obras/geo)
+CAMPOS_GEO = ['id', 'projeto', 'cliente', 'localidade', 'supervisor', 'encarregado',
+              'status', 'progresso', 'latitude', 'longitude']
+
+# A partir deste zoom as obras são enviadas uma a uma (sem agrupamento)
+ZOOM_SEM_AGRUPAMENTO = 16
+
+# Endpoint das obras no mapa: área visível (bbox ou tile) com agrupamento por zoom
+@app.route('/api/obras/geo', methods=['GET'])
+def get_obras_geo():
+    """
+    Obras com coordenadas dentro de uma área do mapa
+
+    Parâmetros opcionais (query string):
+        bbox: min_lng,min_lat,max_lng,max_lat (padrão: o mapa inteiro)
+        tile: z/x/y do tile do mapa (define bbox e zoom; alternativa ao bbox)
+        zoom: zoom do mapa; abaixo de ZOOM_SEM_AGRUPAMENTO as obras próximas
+              são agrupadas (clusters com total e contagem por status)
+        status, supervisor, encarregado, localidade, criterio: valores separados por vírgula
+        fields: campos das obras (padrão: CAMPOS_GEO)
+
+    Funcionalidade:
+        - Consulta a grade espacial do índice de obras (só as células da área)
+        - ETag por versão das obras e consulta: ao mover o mapa, tiles já
+          recebidos respondem 304 e só as áreas novas são transferidas
+    """
+    try:
+        planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
         if not os.path.exists(planilha_path):
             return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada no servidor'}), 404
 
-        obras = processar_planilha(planilha_path)
+        try:
+            filtros = {
+                campo: separar_valores(request.args[campo])
+                for campo in CAMPOS_INDEXADOS if request.args.get(campo)
+            }
+            zoom = request.args.get('zoom')
+            zoom = int(zoom) if zoom else None
+            tile = request.args.get('tile')
+            if tile:
+                partes = [int(parte) for parte in tile.split('/')]
+                if len(partes) != 3:
+                    raise ValueError('tile deve estar no formato z/x/y')
+                bbox = bbox_do_tile(*partes)
+                zoom = partes[0]
+            else:
+                bbox = ler_bbox() or (-180.0, -90.0, 180.0, 90.0)
+            if zoom is not None and zoom < 0:
+                raise ValueError('zoom deve ser maior ou igual a zero')
+            campos = separar_valores(request.args['fields']) if request.args.get('fields') else CAMPOS_GEO
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+
+        invalidos = [campo for campo in campos if campo not in CAMPOS_OBRA]
+        if invalidos:
+            return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+        if 'id' not in campos:
+            campos = ['id'] + campos
+
+        indice = obter_obras()
+        chave = f"{indice.versao}:{request.query_string.decode('utf-8')}"
+        etag = hashlib.sha1(chave.encode('utf-8')).hexdigest()
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        with metricas.etapa('consulta_geo'):
+            posicoes = indice.filtrar(filtros, bbox=bbox)
+            grupos = []
+            if zoom is not None and zoom < ZOOM_SEM_AGRUPAMENTO:
+                grupos, posicoes_obras = indice.agrupar(posicoes, zoom)
+            else:
+                posicoes_obras = posicoes
+            response = jsonify({
+                'success': True,
+                'bbox': list(bbox),
+                'zoom': zoom,
+                'total': len(posicoes),
+                'clusters': grupos,
+                'obras': [indice.obras[posicao].para_dict(campos) for posicao in posicoes_obras],
+            })
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"Erro ao buscar obras no mapa: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Endpoint de sincronização incremental: apenas as obras alteradas desde uma versão
+@app.route('/api/obras/changes', methods=['GET'])
+def get_obras_alteracoes():
+    """
+    Obras inseridas, atualizadas e removidas desde a versão informada
+
+    Parâmetros opcionais (query string):
+        since: última versão recebida (campo "versao" da resposta anterior);
+               ausente ou maior que a versão atual (banco local recriado) -> lista completa
+        fields: campos das obras retornadas
 
-        print(f"Total de obras processadas: {len(obras)}")
+    Funcionalidade:
+        - Cada edição pela API e cada linha alterada na planilha fora do sistema
+          (hash por linha na recarga) recebe uma versão crescente
+        - O contador fica no banco local: continua após reiniciar e é o mesmo em todos os workers
+        - A resposta traz só as obras com versão maior que since; com "completo": true
+          o cliente deve substituir a lista inteira
+    """
+    try:
+        planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+        if not os.path.exists(planilha_path):
+            return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada no servidor'}), 404
+
+        try:
+            desde = request.args.get('since')
+            desde = int(desde) if desde else None
+            if desde is not None and desde < 0:
+                raise ValueError('since deve ser maior ou igual a zero')
+            campos = separar_valores(request.args['fields']) if request.args.get('fields') else None
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+
+        if campos is not None:
+            invalidos = [campo for campo in campos if campo not in CAMPOS_OBRA]
+            if invalidos:
+                return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+            if 'id' not in campos:
+                campos = ['id'] + campos
+
+        # Alterações antes do índice: uma edição entre as duas leituras é reenviada na próxima consulta
+        alteracoes = obter_modelo_obras().alteracoes(desde or 0)
+        indice = obter_obras()
+
+        completo = desde is None or desde > alteracoes['versao']
+        if completo:
+            inseridas, atualizadas, removidas = np.arange(len(indice.obras)), [], []
+        else:
+            inseridas, fora_inseridas = indice.posicoes_dos_ids(alteracoes['inseridas'])
+            atualizadas, fora_atualizadas = indice.posicoes_dos_ids(alteracoes['atualizadas'])
+            # Obras que deixaram de ser válidas (ex: projeto apagado) saem da lista do cliente
+            removidas = sorted(alteracoes['removidas'] + fora_inseridas + fora_atualizadas)
+
+        return jsonify({
+            'success': True,
+            'versao': alteracoes['versao'],
+            'completo': completo,
+            'inseridas': [indice.obras[posicao].para_dict(campos) for posicao in inseridas],
+            'atualizadas': [indice.obras[posicao].para_dict(campos) for posicao in atualizadas],
+            'removidas': removidas,
+        }), 200
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"Erro ao buscar alterações das obras: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Títulos das colunas na exportação das obras (mesmos nomes da planilha mensal)
+TITULOS_OBRAS = {
+    'id': 'ID', 'encarregado': 'Encarregado', 'supervisor': 'Supervisor', 'projeto': 'Projeto',
+    'cliente': 'Título', 'localidade': 'Município', 'criterio': 'Critério', 'anotacoes': 'Anotações',
+    'postesPrevistos': 'Postes Previstos', 'dataInicio': 'Data de Início', 'prazo': 'Data Conclusão',
+    'obraSemana': 'Obra da Semana', 'motivoAtraso': 'Motivo do Atraso', 'atividadeDia': 'Atividade do Dia',
+    'programacaoLv': 'Programação LV', 'cavasRealizadas': 'Cavas Realizadas',
+    'postesImplantados': 'Postes Realizados', 'latitude': 'Latitude', 'longitude': 'Longitude',
+    'hasCoordinates': 'Com Coordenadas', 'clientesPrevistos': 'Clientes Previstos',
+    'projetoKit': 'Projeto Kit', 'projetoMedidor': 'Projeto Medidor', 'arCoelba': 'AR Coelba',
+    'dataVisitaPrevia': 'Visita Prévia', 'observacaoVisita': 'Observação da Visita',
+    'analisePreFechamento': 'Análise Pré Fechamento', 'dataSolicitacaoReserva': 'Solicitação de Reserva',
+    'progresso': 'Progresso (%)', 'isEnergizada': 'Energizada', 'status': 'Status', 'versao': 'Versão',
+}
+
+def ler_formato_exportacao():
+    """Formato pedido em ?formato= (xlsx ou csv; padrão xlsx)"""
+    formato = request.args.get('formato', 'xlsx').lower()
+    if formato not in exportacao.FORMATOS:
+        raise ValueError(f'formato deve ser um de: {", ".join(exportacao.FORMATOS)}')
+    return formato
+
+def resposta_exportacao(formato, nome, titulo, colunas, linhas):
+    """
+    Resposta em partes (chunked) com o arquivo exportado para download
+
+    Args:
+        formato (str): 'xlsx' ou 'csv'
+        nome (str): Nome do arquivo sem extensão
+        titulo (str): Nome da aba (XLSX)
+        colunas (list): Títulos das colunas
+        linhas (iterable): Tuplas de valores, lidas sob demanda durante o envio
+    """
+    if formato == 'csv':
+        # Texto: comprimido conforme o Accept-Encoding, como as demais respostas em partes
+        response = resposta_stream(exportacao.partes_csv(colunas, linhas), exportacao.MIMETYPES['csv'])
+    else:
+        # XLSX já é um arquivo compactado: enviado sem nova compressão
+        response = Response(stream_with_context(exportacao.partes_xlsx(titulo, colunas, linhas)),
+                            status=200, mimetype=exportacao.MIMETYPES['xlsx'])
+    response.headers['Content-Disposition'] = f'attachment; filename="{nome}.{formato}"'
+    return response
+
+# Endpoint de exportação das obras filtradas (XLSX formatado ou CSV)
+@app.route('/api/exportar/obras', methods=['GET'])
+def exportar_obras():
+    """
+    Exporta as obras com os mesmos filtros de /api/obras
+
+    Parâmetros opcionais (query string):
+        formato: xlsx (padrão) ou csv
+        status, supervisor, encarregado, localidade, criterio: valores separados por vírgula
+        inicio, fim: período de dataInicio (YYYY-MM-DD)
+        bbox: min_lng,min_lat,max_lng,max_lat
+        fields: colunas exportadas (padrão: todas as chaves da planilha)
+    """
+    try:
+        planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+        if not os.path.exists(planilha_path):
+            return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada no servidor'}), 404
+
+        try:
+            formato = ler_formato_exportacao()
+            parametros = ler_parametros_paginacao()
+            filtros = {
+                campo: separar_valores(request.args[campo])
+                for campo in CAMPOS_INDEXADOS if request.args.get(campo)
+            }
+            bbox = ler_bbox()
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+
+        campos = parametros['campos'] or CHAVES_OBRA
+        invalidos = [campo for campo in campos if campo not in CAMPOS_OBRA]
+        if invalidos:
+            return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+
+        indice = obter_obras()
+        inicio, fim = parametros['inicio'], parametros['fim']
+        posicoes = indice.filtrar(
+            filtros,
+            inicio=inicio.date().toordinal() if inicio is not None else None,
+            fim=fim.date().toordinal() if fim is not None else None,
+            bbox=bbox
+        )
+
+        obras = indice.obras
+        linhas = (tuple(getattr(obras[posicao], campo) for campo in campos) for posicao in posicoes)
+        nome = 'obras-' + '-'.join(
+            [valor for valores in filtros.values() for valor in valores][:3] + [datetime.now().strftime('%Y%m%d')]
+        )
+        response = resposta_exportacao(formato, secure_filename(nome), 'Obras',
+                                       [TITULOS_OBRAS.get(campo, campo) for campo in campos], linhas)
+        response.headers['X-Total-Count'] = str(len(posicoes))
+        return response
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"Erro ao exportar obras: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Endpoint de exportação do MainBD filtrado (XLSX formatado ou CSV)
+@app.route('/api/exportar/mainbd', methods=['GET'])
+def exportar_mainbd():
+    """
+    Exporta as linhas do MainBD, lidas do banco local em blocos
+
+    Parâmetros opcionais (query string):
+        formato: xlsx (padrão) ou csv
+        mes: mês de data_serv (YYYY-MM); alternativa a inicio/fim
+        inicio, fim: período de data_serv (YYYY-MM-DD)
+        equipe, supervisor, atividade, ssot: valores separados por vírgula
+        fields: colunas exportadas
+    """
+    try:
+        entrada = obter_mainbd()
+        if entrada is None:
+            return jsonify({'error': 'Arquivo MainBD.xlsx não encontrado no servidor'}), 404
+
+        try:
+            formato = ler_formato_exportacao()
+            parametros = ler_parametros_paginacao()
+            inicio, fim = parametros['inicio'], parametros['fim']
+            mes = request.args.get('mes')
+            if mes:
+                periodo = pd.Period(mes, freq='M')
+                inicio, fim = periodo.start_time, periodo.end_time
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+
+        banco = obter_banco_local()
+        colunas_existentes = banco.colunas('mainbd')
+        campos = parametros['campos'] or colunas_existentes
+        invalidos = [campo for campo in campos if campo not in colunas_existentes]
+        if invalidos:
+            return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+
+        filtros = {
+            coluna: separar_valores(request.args[parametro])
+            for parametro, coluna in FILTROS_MAINBD.items()
+            if request.args.get(parametro) and coluna in colunas_existentes
+        }
+        intervalo = intervalo_data_serv(inicio, fim)
+        blocos = banco.consultar('mainbd', filtros=filtros, intervalo=intervalo, colunas=campos,
+                                 blocos=LINHAS_POR_BLOCO)
+
+        nome = f"mainbd-{mes or datetime.now().strftime('%Y%m%d')}"
+        response = resposta_exportacao(formato, secure_filename(nome), 'MainBD', campos,
+                                       exportacao.linhas_de_blocos(blocos))
+        response.headers['X-Total-Count'] = str(banco.contar('mainbd', filtros=filtros, intervalo=intervalo))
+        return response
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"Erro ao exportar MainBD: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Campos das obras nos resultados da busca (padrão de /api/search)
+CAMPOS_RESULTADO_BUSCA = ['id', 'projeto', 'cliente', 'localidade', 'encarregado', 'supervisor', 'status']
+
+# Resultados por página da busca (padrão e máximo)
+LIMITE_BUSCA = 20
+LIMITE_MAXIMO_BUSCA = 100
+
+# Endpoint de busca textual nas obras e no MainBD
+@app.route('/api/search', methods=['GET'])
+def get_busca():
+    """
+    Busca textual (sem diferença de acentos e maiúsculas) nas obras e nas SS/OT do MainBD
+
+    Parâmetros (query string):
+        q: texto da busca; cada termo (2+ caracteres) precisa aparecer em algum campo
+        tipo: fontes separadas por vírgula, 'obras' e/ou 'mainbd' (padrão: as duas)
+        fields: campos das obras nos resultados (padrão: CAMPOS_RESULTADO_BUSCA)
+        limit, cursor: paginação; o cursor é o nextCursor da página anterior
+
+    Funcionalidade:
+        - Obras: projeto, cliente, localidade, encarregado e anotações
+        - MainBD: SS/OT e descrições das atividades (um resultado por SS/OT)
+        - Resultados ordenados pela pontuação (campo e tipo de correspondência)
+        - Os índices acompanham a versão das planilhas, reindexando só o que mudou
+    """
+    try:
+        consulta = request.args.get('q', '')
+        termos = termos_da_consulta(consulta)
+        if not termos:
+            return jsonify({
+                'error': f'Informe ao menos um termo com {TAMANHO_MINIMO_TERMO} ou mais caracteres em q'
+            }), 400
+
+        fontes = separar_valores(request.args.get('tipo', '')) or list(BuscaMariua.FONTES)
+        invalidas = [fonte for fonte in fontes if fonte not in BuscaMariua.FONTES]
+        if invalidas:
+            return jsonify({'error': f'Tipos inexistentes: {", ".join(invalidas)}'}), 400
+
+        try:
+            parametros = ler_parametros_paginacao()
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {str(e)}'}), 400
+        campos = parametros['campos'] or CAMPOS_RESULTADO_BUSCA
+        invalidos = [campo for campo in campos if campo not in CAMPOS_OBRA]
+        if invalidos:
+            return jsonify({'error': f'Campos inexistentes: {", ".join(invalidos)}'}), 400
+        limite = min(parametros['limite'] or LIMITE_BUSCA, LIMITE_MAXIMO_BUSCA)
+        inicio = max(parametros['cursor'] or 0, 0)
+
+        indice = None
+        planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+        if 'obras' in fontes and os.path.exists(planilha_path):
+            indice = obter_obras()
+            busca.atualizar_obras(indice)
+        else:
+            fontes = [fonte for fonte in fontes if fonte != 'obras']
+        if 'mainbd' in fontes:
+            entrada = obter_mainbd()
+            if entrada is not None:
+                busca.atualizar_mainbd(entrada)
+            else:
+                fontes.remove('mainbd')
+
+        with metricas.etapa('consulta_busca'):
+            resultados = busca.buscar(consulta, fontes)
+        pagina = resultados[inicio:inicio + limite]
+        proximo = inicio + limite if inicio + limite < len(resultados) else None
+
+        ids = np.array([chave for _, fonte, chave, _ in pagina if fonte == 'obras'], dtype=np.int64)
+        obras_da_pagina = {}
+        if indice is not None and len(ids):
+            posicoes, _ = indice.posicoes_dos_ids(ids)
+            obras_da_pagina = {int(indice.ids[posicao]): indice.obras[posicao] for posicao in posicoes}
+
+        itens = []
+        for pontuacao, fonte, chave, dados in pagina:
+            if fonte == 'obras':
+                obra = obras_da_pagina.get(chave)
+                if obra is not None:
+                    itens.append({'tipo': 'obra', 'pontuacao': pontuacao, 'obra': obra.para_dict(campos)})
+            else:
+                itens.append({'tipo': 'mainbd', 'pontuacao': pontuacao, **dados})
 
         return jsonify({
             'success': True,
-            'total': len(obras),
-            'obras': obras
+            'termos': termos,
+            'total': len(resultados),
+            'resultados': itens,
+            'nextCursor': proximo
         }), 200
 
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
     except Exception as e:
-        print(f"Erro ao buscar obras: {e}")
+        logger.exception(f"Erro na busca: {e}")
         return jsonify({'error': str(e)}), 500
 
 # Endpoint para buscar atividades disponíveis
@@ -669,93 +2077,116 @@ def get_projeto_config(projeto_id):
         'config': config
     }), 200
 
+# Valor padrão ao adicionar uma obra para as colunas numéricas e de coordenadas
+# (as demais usam o padrão de COLUNAS_PLANILHA_OBRAS)
+PADROES_ADICIONAR_OBRA = {
+    'projeto': '',
+    'postesPrevistos': 0,
+    'cavasRealizadas': 0,
+    'postesImplantados': 0,
+    'latitude': '',
+    'longitude': '',
+    'clientesPrevistos': 0,
+}
+
+# Colunas gravadas ao adicionar uma obra: (letra no Excel, chave JSON, valor padrão)
+# Letras de LETRAS_PLANILHA_OBRAS: leitura e gravação usam a mesma disposição
+COLUNAS_ADICIONAR_OBRA = [
+    (LETRAS_PLANILHA_OBRAS[chave], chave, PADROES_ADICIONAR_OBRA[chave] if padrao is None else padrao)
+    for chave, padrao in COLUNAS_PLANILHA_OBRAS
+]
+
+# Campos editáveis via /api/obras/atualizar: chave JSON -> letra no Excel
+COLUNAS_ATUALIZAR_OBRA = {
+    chave: LETRAS_PLANILHA_OBRAS[chave]
+    for chave in ('encarregado', 'supervisor', 'atividadeDia', 'postesImplantados', 'cavasRealizadas', 'anotacoes')
+}
+
+def obter_modelo_obras():
+    """Modelo em memória da planilha mensal de obras (gravação em segundo plano)"""
+    planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+    banco_path = os.path.join(app.config['UPLOAD_FOLDER'], app.config['BANCO_LOCAL'])
+    return obter_modelo(planilha_path, salvar_planilha_com_retry, carregar_obras_banco, banco_path)
+
+def verificar_planilha_obras():
+    """
+    Verifica se a planilha mensal existe e não está aberta em outro programa
+
+    Returns:
+        tuple: (response, status) de erro, ou None se a planilha pode ser alterada
+    """
+    planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+
+    if not os.path.exists(planilha_path):
+        logger.error("❌ ERRO: Planilha não encontrada")
+        return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada'}), 404
+
+    # Verificar se o arquivo está aberto
+    try:
+        with open(planilha_path, 'r+b'):
+            pass
+    except PermissionError:
+        return jsonify({
+            'error': '⚠️ O arquivo Excel está ABERTO! Por favor, FECHE o arquivo "PROGRAMACAO - NOVEMBRO.xlsx" e tente novamente.'
+        }), 423  # 423 Locked
+
+    return None
+
+def ler_versao_esperada(versao=None):
+    """
+    Versão da obra que o cliente leu: campo "versao" do corpo ou cabeçalho If-Match
+
+    Args:
+        versao: Valor do campo "versao" do corpo (tem prioridade sobre o cabeçalho)
+
+    Returns:
+        int: Versão esperada, ou None sem verificação (ausente ou If-Match: *)
+
+    Raises:
+        ValueError: Versão que não é um número inteiro (ou If-Match com mais de uma versão)
+    """
+    if versao is None:
+        cabecalho = request.headers.get('If-Match', '').strip()
+        if not cabecalho or cabecalho == '*':
+            return None
+        if ',' in cabecalho:
+            raise ValueError('If-Match deve ter uma única versão')
+        if cabecalho.startswith('W/'):
+            cabecalho = cabecalho[2:]
+        versao = cabecalho.strip('"')
+    if isinstance(versao, bool) or not str(versao).strip().isdigit():
+        raise ValueError(f'{versao!r} não é um número inteiro')
+    return int(versao)
+
 # Endpoint para adicionar nova obra
 @app.route('/api/obras/adicionar', methods=['POST'])
 def adicionar_obra():
     try:
         data = request.get_json()
-        print(f"📥 Dados recebidos para adicionar: {data}")
+        logger.debug(f"📥 Dados recebidos para adicionar: {data}")
 
-        # Arquivo fixo para obras do mês
-        planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+        erro = verificar_planilha_obras()
+        if erro:
+            return erro
 
-        if not os.path.exists(planilha_path):
-            print("❌ ERRO: Planilha não encontrada")
-            return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada'}), 404
-        
-        # Verificar se o arquivo está aberto
-        try:
-            # Tenta abrir o arquivo para verificar permissões
-            with open(planilha_path, 'r+b'):
-                pass
-        except PermissionError:
-            return jsonify({
-                'error': '⚠️ O arquivo Excel está ABERTO! Por favor, FECHE o arquivo "PROGRAMACAO - NOVEMBRO.xlsx" e tente novamente.'
-            }), 423  # 423 Locked
-        
-        # Carregar a planilha
-        wb = load_workbook(planilha_path)
-        ws = wb.active
-        
-        # Encontrar a próxima linha vazia
-        proxima_linha = ws.max_row + 1
-        print(f"➕ Adicionando obra na linha: {proxima_linha}")
-        
-        # Adicionar dados na planilha
-        ws[f'A{proxima_linha}'] = data.get('encarregado', 'N/A')
-        ws[f'B{proxima_linha}'] = data.get('supervisor', 'N/A')
-        ws[f'C{proxima_linha}'] = data.get('projeto', '')
-        ws[f'D{proxima_linha}'] = data.get('cliente', 'N/A')
-        ws[f'E{proxima_linha}'] = data.get('localidade', 'N/A')
-        ws[f'F{proxima_linha}'] = data.get('criterio', '')
-        ws[f'G{proxima_linha}'] = data.get('anotacoes', '')
-        ws[f'H{proxima_linha}'] = data.get('postesPrevistos', 0)
-        ws[f'I{proxima_linha}'] = data.get('dataInicio', '')
-        ws[f'J{proxima_linha}'] = data.get('prazo', '')
-        ws[f'K{proxima_linha}'] = data.get('obraSemana', '')
-        ws[f'L{proxima_linha}'] = data.get('atividadeDia', 'IMPLANTAÇÃO')
-        ws[f'M{proxima_linha}'] = data.get('programacaoLv', '')
-        ws[f'N{proxima_linha}'] = data.get('cavasRealizadas', 0)
-        ws[f'O{proxima_linha}'] = data.get('postesImplantados', 0)
-        ws[f'P{proxima_linha}'] = data.get('latitude', '')
-        ws[f'Q{proxima_linha}'] = data.get('longitude', '')
-        ws[f'R{proxima_linha}'] = data.get('clientesPrevistos', 0)
-        ws[f'S{proxima_linha}'] = data.get('projetoKit', '')
-        ws[f'T{proxima_linha}'] = data.get('projetoMedidor', '')
-        ws[f'U{proxima_linha}'] = data.get('arCoelba', 'N/A')
-        ws[f'V{proxima_linha}'] = data.get('dataVisitaPrevia', '')
-        ws[f'W{proxima_linha}'] = data.get('observacaoVisita', '')
-        ws[f'X{proxima_linha}'] = data.get('analisePreFechamento', '')
-        ws[f'Y{proxima_linha}'] = data.get('dataSolicitacaoReserva', '')
-        
-        print(f"💾 Salvando planilha...")
-        
-        # Salvar a planilha com retry
-        try:
-            salvar_planilha_com_retry(wb, planilha_path)
-            wb.close()
-            
-            print("✅ Obra adicionada com sucesso!")
-            return jsonify({
-                'success': True,
-                'message': 'Obra adicionada com sucesso!'
-            }), 200
-            
-        except Exception as save_error:
-            wb.close()
-            raise save_error
-        
+        celulas = {letra: data.get(chave, padrao) for letra, chave, padrao in COLUNAS_ADICIONAR_OBRA}
+
+        # A edição é aplicada no modelo em memória e gravada na planilha em segundo plano
+        obra_id, versao = obter_modelo_obras().adicionar(celulas)
+        logger.info(f"➕ Obra adicionada (ID {obra_id}, versão {versao}); gravação agendada")
+
+        return jsonify({
+            'success': True,
+            'message': 'Obra adicionada com sucesso!',
+            'id': obra_id,
+            'versao': versao
+        }), 200
+
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
     except Exception as e:
-        print(f"❌ ERRO ao adicionar obra: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        # Mensagem mais amigável para erro de permissão
-        error_msg = str(e)
-        if 'Permission denied' in error_msg or 'FECHE O ARQUIVO' in error_msg:
-            error_msg = '⚠️ O arquivo Excel está ABERTO! Por favor, FECHE o arquivo e tente novamente.'
-        
-        return jsonify({'error': error_msg}), 500
+        logger.exception(f"❌ ERRO ao adicionar obra: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 # Endpoint para atualizar obra existente
 @app.route('/api/obras/atualizar/<int:obra_id>', methods=['PUT'])
@@ -763,96 +2194,257 @@ def atualizar_obra(obra_id):
     try:
         data = request.get_json()
 
-        # Arquivo fixo para obras do mês
-        planilha_path = os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')
+        logger.debug(f"📝 Tentando atualizar obra ID: {obra_id}")
+        logger.debug(f"📥 Dados recebidos: {data}")
 
-        print(f"📝 Tentando atualizar obra ID: {obra_id}")
-        print(f"📥 Dados recebidos: {data}")
+        erro = verificar_planilha_obras()
+        if erro:
+            return erro
 
-        if not os.path.exists(planilha_path):
-            return jsonify({'error': 'Planilha PROGRAMACAO - NOVEMBRO.xlsx não encontrada'}), 404
-        
-        # Verificar se o arquivo está aberto
-        try:
-            with open(planilha_path, 'r+b'):
-                pass
-        except PermissionError:
-            return jsonify({
-                'error': '⚠️ O arquivo Excel está ABERTO! Por favor, FECHE o arquivo "PROGRAMACAO - NOVEMBRO.xlsx" e tente novamente.'
-            }), 423  # 423 Locked
-        
-        # Carregar a planilha
-        wb = load_workbook(planilha_path)
-        ws = wb.active
-        
-        # A linha na planilha é obra_id (obra_id já considera o cabeçalho)
-        # obra_id = 1 significa a primeira obra (linha 2 no Excel, pois linha 1 é cabeçalho)
-        linha = obra_id + 1
-        
-        print(f"🔄 Atualizando linha {linha} na planilha")
-        
-        # Verificar se a linha existe
-        if linha > ws.max_row:
-            wb.close()
-            return jsonify({'error': f'Obra ID {obra_id} não encontrada'}), 404
-        
         # Atualizar dados na planilha (apenas campos fornecidos)
-        if 'encarregado' in data:
-            ws[f'A{linha}'] = data['encarregado']
-            print(f"✏️ Encarregado atualizado: {data['encarregado']}")
-        
-        if 'supervisor' in data:
-            ws[f'B{linha}'] = data['supervisor']
-            print(f"✏️ Supervisor atualizado: {data['supervisor']}")
-        
-        if 'atividadeDia' in data:
-            ws[f'L{linha}'] = data['atividadeDia']
-            print(f"✏️ Atividade do dia atualizada: {data['atividadeDia']}")
-        
-        if 'postesImplantados' in data:
-            ws[f'O{linha}'] = data['postesImplantados']
-            print(f"✏️ Postes implantados atualizado: {data['postesImplantados']}")
-        
-        if 'cavasRealizadas' in data:
-            ws[f'N{linha}'] = data['cavasRealizadas']
-            print(f"✏️ Cavas realizadas atualizado: {data['cavasRealizadas']}")
-        
-        if 'anotacoes' in data:
-            ws[f'G{linha}'] = data['anotacoes']
-            print(f"✏️ Anotações atualizadas: {data['anotacoes']}")
-        
-        print(f"💾 Salvando alterações...")
-        
-        # Salvar a planilha com retry
+        celulas = {
+            letra: data[chave] for chave, letra in COLUNAS_ATUALIZAR_OBRA.items() if chave in data
+        }
+
+        # Versão lida pelo cliente (corpo ou If-Match) para detectar edições conflitantes
         try:
-            salvar_planilha_com_retry(wb, planilha_path)
-            wb.close()
-            
-            print(f"✅ Obra atualizada com sucesso!")
-            return jsonify({
-                'success': True,
-                'message': 'Obra atualizada com sucesso'
-            }), 200
-            
-        except Exception as save_error:
-            wb.close()
-            raise save_error
-        
+            versao_esperada = ler_versao_esperada(data.get('versao'))
+        except ValueError as e:
+            return jsonify({'error': f'Versão inválida: {str(e)}'}), 400
+
+        versao = obter_modelo_obras().atualizar(obra_id, celulas, versao_esperada)
+        logger.debug(f"✅ Obra {obra_id} atualizada (versão {versao}); gravação agendada")
+
+        return jsonify({
+            'success': True,
+            'message': 'Obra atualizada com sucesso',
+            'versao': versao
+        }), 200
+
+    except ObraNaoEncontrada as e:
+        return jsonify({'error': str(e)}), 404
+    except ConflitoVersao as e:
+        return jsonify({'error': str(e), 'versao': e.versao_atual}), 409
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
     except Exception as e:
-        print(f"❌ ERRO ao atualizar obra: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        # Mensagem mais amigável para erro de permissão
-        error_msg = str(e)
-        if 'Permission denied' in error_msg or 'FECHE O ARQUIVO' in error_msg:
-            error_msg = '⚠️ O arquivo Excel está ABERTO! Por favor, FECHE o arquivo e tente novamente.'
-        
-        return jsonify({'error': error_msg}), 500
+        logger.exception(f"❌ ERRO ao atualizar obra: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Endpoint para aplicar a programação do dia na planilha mensal (um único lote de edições)
+@app.route('/api/obras/aplicar-programacao', methods=['POST'])
+def aplicar_programacao_obras():
+    """
+    Atualiza encarregado, supervisor e atividade do dia das obras a partir da programação
+
+    Corpo JSON (opcional):
+        arquivo: programação salva em ProgramacaoNovembro (ex: "10-11-2025" ou "10-11-2025.xlsx");
+                 sem ele, usa a programação do dia carregada no servidor
+        versao: versão da programação do dia que o cliente leu (409 se outra foi carregada);
+                também aceita o cabeçalho If-Match
+        simular: true para apenas gerar o relatório, sem alterar a planilha
+
+    Funcionalidade:
+        - Liga programação e obras pelo projeto (junção por dicionário)
+        - Todas as alterações entram de uma vez no modelo de obras: uma única gravação da planilha
+        - Relatório por item: aplicada, sem_alteracao, nao_encontrada ou conflito
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        erro = verificar_planilha_obras()
+        if erro:
+            return erro
+
+        arquivo = data.get('arquivo')
+        if arquivo:
+            nome = secure_filename(str(arquivo))
+            if not nome.lower().endswith('.xlsx'):
+                nome += '.xlsx'
+            caminho = os.path.join(PROGRAMACAO_DIA_FOLDER, nome)
+            if not os.path.exists(caminho):
+                return jsonify({'error': f'Programação {nome} não encontrada', 'success': False}), 404
+            programacao = processar_programacao_dia(caminho)
+            origem = nome
+        else:
+            try:
+                versao_esperada = ler_versao_esperada(data.get('versao'))
+            except ValueError as e:
+                return jsonify({'error': f'Versão inválida: {str(e)}', 'success': False}), 400
+
+            versao, programacao = obter_estado_programacao().obter()
+            if versao_esperada is not None and versao_esperada != versao:
+                return jsonify({'error': f'A programação do dia mudou (versão atual: {versao})',
+                                'versao': versao, 'success': False}), 409
+            if not programacao:
+                return jsonify({
+                    'error': 'Nenhuma programação carregada. Faça upload de um arquivo primeiro.',
+                    'success': False
+                }), 400
+            origem = f'programacao-dia (versão {versao})'
+
+        indice = obter_obras()
+        edicoes, relatorio = mesclar_programacao(programacao, indice.obras)
+
+        versoes = {}
+        if edicoes and not data.get('simular'):
+            celulas = {
+                obra_id: {LETRAS_PLANILHA_OBRAS[campo]: valor for campo, valor in campos.items()}
+                for obra_id, campos in edicoes.items()
+            }
+            esperadas = {linha['obraId']: linha['versao'] for linha in relatorio if linha['resultado'] == APLICADA}
+            versoes, conflitos = obter_modelo_obras().atualizar_lote(celulas, esperadas)
+            for linha in relatorio:
+                if linha['resultado'] != APLICADA:
+                    continue
+                if linha['obraId'] in conflitos:
+                    linha.update(resultado=CONFLITO, versao=conflitos[linha['obraId']],
+                                 motivo='Obra alterada por outro usuário durante a aplicação')
+                else:
+                    linha['versao'] = versoes[linha['obraId']]
+            logger.info(f"📋 Programação ({origem}) aplicada: {len(versoes)} obra(s) atualizada(s) "
+                        f"em um único lote; gravação agendada")
+
+        resumo = {
+            resultado: sum(1 for linha in relatorio if linha['resultado'] == resultado)
+            for resultado in (APLICADA, SEM_ALTERACAO, NAO_ENCONTRADA, CONFLITO)
+        }
+        return jsonify({
+            'success': True,
+            'origem': origem,
+            'simulacao': bool(data.get('simular')),
+            'obrasAtualizadas': len(versoes),
+            'resumo': resumo,
+            'itens': relatorio,
+        }), 200
+
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Parâmetro inválido: {str(e)}', 'success': False}), 400
+    except ObraNaoEncontrada as e:
+        return jsonify({'error': str(e), 'success': False}), 404
+    except TempoEsgotadoLeitura as e:
+        return resposta_tempo_esgotado(e)
+    except Exception as e:
+        logger.exception(f"❌ Erro ao aplicar a programação nas obras: {str(e)}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+# Endpoint com o estado da fila de gravação da planilha de obras
+@app.route('/api/obras/gravacao', methods=['GET'])
+def get_status_gravacao_obras():
+    return jsonify({
+        'success': True,
+        **obter_modelo_obras().status()
+    }), 200
+
+def aquecer_mainbd():
+    """Processa o MainBD e atualiza os agregados diários dos indicadores e o índice de busca"""
+    entrada = obter_mainbd()
+    if entrada is not None:
+        agregados_mainbd.atualizar(entrada)
+        busca.atualizar_mainbd(entrada)
+
+def aquecer_obras():
+    """Processa as obras e atualiza o índice de busca"""
+    busca.atualizar_obras(obter_obras())
+
+# Observador das planilhas: cada alvo é reprocessado em segundo plano quando seus arquivos mudam
+observador = ObservadorArquivos()
+observador.registrar('mainbd', lambda: [os.path.join(app.config['UPLOAD_FOLDER'], 'BD', 'MainBD.xlsx')], aquecer_mainbd)
+observador.registrar('obras', lambda: [os.path.join(app.config['UPLOAD_FOLDER'], 'PROGRAMACAO - NOVEMBRO.xlsx')], aquecer_obras)
+observador.registrar('programacao_dia', lambda: arquivos_da_pasta(PROGRAMACAO_DIA_FOLDER), obter_arquivo_programacao)
+observador.registrar('bd_programacao', lambda: [os.path.join(app.config['UPLOAD_FOLDER'], 'BD', 'BDProgramacao.xlsx')], obter_bd_programacao)
+
+def iniciar_observador():
+    """Inicia o observador de arquivos, se habilitado em OBSERVAR_ARQUIVOS"""
+    if app.config['OBSERVAR_ARQUIVOS']:
+        observador.iniciar()
+
+def aquecer_caches():
+    """
+    Processa todas as planilhas uma vez, aguardando o término (caches aquecidos)
+
+    Funcionalidade:
+        - Usado pelo servidor de produção antes de criar os workers, que herdam
+          os dados já processados (memória compartilhada por copy-on-write)
+        - Ao terminar, /api/saude passa a indicar que a aplicação está pronta
+    """
+    observador.verificar()
+
+def criar_app(configuracao=None):
+    """
+    Configura e retorna a aplicação Flask (usado pelo servidor de produção, servidor.py)
+
+    Args:
+        configuracao (dict): Valores de app.config a sobrescrever (ex: UPLOAD_FOLDER)
+
+    Returns:
+        Flask: A aplicação com as pastas de upload criadas
+    """
+    global PROGRAMACAO_DIA_FOLDER
+
+    app.config.update(configuracao or {})
+    configurar_logs()
+    PROGRAMACAO_DIA_FOLDER = os.path.join(app.config['UPLOAD_FOLDER'], 'ProgramacaoNovembro')
+    os.makedirs(PROGRAMACAO_DIA_FOLDER, exist_ok=True)
+    return app
+
+# Endpoint de prontidão: 503 até as planilhas terem sido processadas pela primeira vez
+@app.route('/api/saude', methods=['GET'])
+def get_saude():
+    pronto = observador.pronto.is_set() or not app.config['OBSERVAR_ARQUIVOS']
+    return jsonify({
+        'success': pronto,
+        'pronto': pronto,
+        'pid': os.getpid()
+    }), 200 if pronto else 503
+
+# Endpoint com o estado do pré-processamento das planilhas
+@app.route('/api/cache/status', methods=['GET'])
+def get_status_cache():
+    return jsonify({
+        'success': True,
+        **observador.status(),
+        'leitura': executor_planilhas.status(),
+        'admissao': controle_admissao.status()
+    }), 200
+
+# Medidores lidos a cada coleta de /api/metrics
+metricas.registrar_medidor(
+    'leituras_excel_em_andamento', 'Leituras de planilha em andamento nos processos auxiliares',
+    lambda: executor_planilhas.status()['emAndamento'])
+metricas.registrar_medidor(
+    'leituras_excel_aguardando', 'Requisições aguardando uma leitura de planilha',
+    lambda: executor_planilhas.status()['aguardando'])
+metricas.registrar_medidor(
+    'admissao_pesadas_em_execucao', 'Requisições pesadas (planilhas) em execução neste processo',
+    lambda: controle_admissao.status()['pesadasEmExecucao'])
+metricas.registrar_medidor(
+    'admissao_pesadas_aguardando', 'Requisições pesadas aguardando vaga neste processo',
+    lambda: controle_admissao.status()['pesadasAguardando'])
+metricas.registrar_medidor(
+    'preprocessamento_segundos', 'Duração do último pré-processamento de cada planilha observada',
+    lambda: [({'alvo': nome}, alvo['duracao']) for nome, alvo in observador.status()['alvos'].items()])
+metricas.registrar_medidor(
+    'preprocessamento_ultima_atualizacao', 'Horário (epoch) do último pré-processamento de cada planilha observada',
+    lambda: [({'alvo': nome}, alvo['ultimaAtualizacao']) for nome, alvo in observador.status()['alvos'].items()])
+metricas.registrar_medidor(
+    'obras_celulas_pendentes', 'Células editadas aguardando gravação na planilha de obras',
+    lambda: obter_modelo_obras().status()['pendentes'])
+
+# Métricas no formato texto do Prometheus (latência por rota, etapas, cache, tamanhos)
+@app.route('/api/metrics', methods=['GET'])
+def get_metricas():
+    return Response(metricas.exportar(), status=200, content_type='text/plain; version=0.0.4; charset=utf-8')
 
 if __name__ == '__main__':
-    print("Iniciando servidor Flask...")
-    print(f"Diretorio de uploads: {app.config['UPLOAD_FOLDER']}")
-    print("Para carregar dados, faca upload de um arquivo Excel via interface web")
-    print("API rodando em: http://localhost:5000")
+    # Com debug=True o reloader executa este bloco em dois processos;
+    # o observador roda apenas no processo que atende as requisições
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_observador()
+
+    logger.info("Iniciando servidor Flask...")
+    logger.info(f"Diretorio de uploads: {app.config['UPLOAD_FOLDER']}")
+    logger.info("Para carregar dados, faca upload de um arquivo Excel via interface web")
+    logger.info("Para producao (varios workers): python servidor.py --workers 4 --threads 8")
+    logger.info("API rodando em: http://localhost:5000")
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Arquivo histórico das programações diárias salvas (ProgramacaoNovembro/DD-MM-YYYY.xlsx).
+
+As programações já importadas para o banco local são mantidas em memória em
+forma compacta (textos categóricos e dias como ordinais), ordenadas por dia e
+com índices por projeto, encarregado e supervisor. Consultas como "todos os
+dias em que a equipe X esteve programada na obra B-1234567" combinam listas de
+posições já calculadas, sem abrir nenhuma planilha.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from indice_obras import normalizar_chave
+
+# Colunas de texto de cada linha da programação, na ordem da API
+COLUNAS_ARQUIVO = ['data', 'projeto', 'supervisor', 'encarregado', 'titulo', 'municipio', 'atividadeProgramada', 'criterio']
+
+# Campos indexados: parâmetro da URL -> coluna
+CAMPOS_ARQUIVO = {
+    'projeto': 'projeto',
+    'encarregado': 'encarregado',
+    'supervisor': 'supervisor',
+}
+
+
+def ordinal_dia(valor):
+    """
+    Converte uma data (DD-MM-YYYY, DD/MM/YYYY, YYYY-MM-DD ou Timestamp) no ordinal de datetime.date
+
+    Raises:
+        ValueError: Data em formato não reconhecido
+    """
+    if isinstance(valor, str):
+        texto = valor.strip().replace('/', '-')
+        formato = '%d-%m-%Y' if len(texto.split('-')[0]) <= 2 else '%Y-%m-%d'
+        valor = pd.to_datetime(texto[:10], format=formato)
+    return pd.Timestamp(valor).date().toordinal()
+
+
+def texto_dia(ordinal, formato='%d-%m-%Y'):
+    """Formata o ordinal de um dia (padrão DD-MM-YYYY, como o nome dos arquivos)"""
+    return date.fromordinal(int(ordinal)).strftime(formato)
+
+
+class ArquivoProgramacao:
+    """
+    Programações diárias de todos os dias salvos, com índices para consulta
+
+    Args:
+        df (DataFrame): Tabela programacao_dia do banco local (colunas de COLUNAS_ARQUIVO,
+                        data_arquivo em YYYY-MM-DD e arquivo)
+
+    Funcionalidade:
+        - Linhas ordenadas por dia (data do nome do arquivo, ou da coluna Data se o nome não for uma data)
+        - Textos guardados como categorias (nomes de supervisores/encarregados repetem muito)
+        - Para cada campo de CAMPOS_ARQUIVO, mapa valor -> posições (ordenadas) das linhas
+        - Período consultado por busca binária nos dias ordenados
+    """
+
+    def __init__(self, df):
+        dias = pd.to_datetime(df['data_arquivo'], format='%Y-%m-%d', errors='coerce')
+        # Arquivos com nome fora do padrão: usar a data da primeira coluna
+        dias = dias.fillna(pd.to_datetime(df['data'].astype(str).str[:10], format='%Y-%m-%d', errors='coerce'))
+        valido = dias.notna()
+
+        df = df.loc[valido].assign(_dia=dias[valido].map(lambda dia: dia.toordinal()))
+        df = df.sort_values('_dia', kind='stable').reset_index(drop=True)
+
+        self.dias = df['_dia'].to_numpy(dtype=np.int32)
+        self.colunas = {
+            coluna: (df[coluna] if coluna in df.columns else pd.Series('', index=df.index)).fillna('').astype(str).astype('category')
+            for coluna in COLUNAS_ARQUIVO
+        }
+
+        self.campos = {}
+        for parametro, coluna in CAMPOS_ARQUIVO.items():
+            categorias = self.colunas[coluna]
+            codigos = categorias.cat.codes.to_numpy()
+            ordem = np.argsort(codigos, kind='stable')
+            limites = np.cumsum(np.bincount(codigos, minlength=len(categorias.cat.categories)))[:-1]
+
+            grupos = {}
+            for valor, posicoes in zip(categorias.cat.categories, np.split(ordem, limites)):
+                grupos.setdefault(normalizar_chave(valor), []).append(posicoes)
+            self.campos[parametro] = {
+                chave: np.sort(np.concatenate(partes)) for chave, partes in grupos.items()
+            }
+
+    def __len__(self):
+        return len(self.dias)
+
+    def dias_disponiveis(self):
+        """Ordinais dos dias com programação salva, em ordem crescente"""
+        return np.unique(self.dias)
+
+    def filtrar(self, filtros=None, inicio=None, fim=None):
+        """
+        Seleciona as linhas que atendem a todos os filtros
+
+        Args:
+            filtros (dict): {parâmetro: [valores]} para os campos de CAMPOS_ARQUIVO (OU entre valores)
+            inicio (int): Ordinal do primeiro dia (inclusivo)
+            fim (int): Ordinal do último dia (inclusivo)
+
+        Returns:
+            ndarray: Posições das linhas selecionadas, em ordem de dia
+        """
+        esquerda = 0 if inicio is None else np.searchsorted(self.dias, inicio, side='left')
+        direita = len(self.dias) if fim is None else np.searchsorted(self.dias, fim, side='right')
+        selecao = np.arange(esquerda, direita, dtype=np.int64)
+
+        for parametro, valores in (filtros or {}).items():
+            indice = self.campos[parametro]
+            partes = [indice.get(normalizar_chave(valor)) for valor in valores]
+            partes = [parte for parte in partes if parte is not None]
+            posicoes = np.unique(np.concatenate(partes)) if partes else np.array([], dtype=np.int64)
+            selecao = np.intersect1d(selecao, posicoes, assume_unique=True)
+
+        return selecao
+
+    def registros(self, posicoes):
+        """
+        Linhas selecionadas no formato da API
+
+        Returns:
+            list: Dicionários com id (posição no arquivo), dia (DD-MM-YYYY) e as colunas de COLUNAS_ARQUIVO
+        """
+        posicoes = np.asarray(posicoes, dtype=np.int64)
+        colunas = {coluna: valores.to_numpy()[posicoes].tolist() for coluna, valores in self.colunas.items()}
+        dias = [texto_dia(ordinal) for ordinal in self.dias[posicoes]]
+        return [
+            {'id': int(posicao), 'dia': dia, **{coluna: colunas[coluna][i] for coluna in COLUNAS_ARQUIVO}}
+            for i, (posicao, dia) in enumerate(zip(posicoes, dias))
+        ]
+
+    def pagina(self, posicoes, cursor=None, limite=None):
+        """
+        Aplica a paginação por cursor (id da última linha recebida)
+
+        Returns:
+            tuple: (posições da página, próximo cursor ou None)
+        """
+        if cursor is not None:
+            posicoes = posicoes[posicoes > cursor]
+        if limite is None or len(posicoes) <= limite:
+            return posicoes, None
+        posicoes = posicoes[:limite]
+        return posicoes, int(posicoes[-1])
@@ -0,0 +1,382 @@
+"""
+Banco SQLite local com o conteúdo das planilhas de uploads/.
+
+Cada planilha (MainBD, planilha mensal de obras e programações diárias) é
+importada uma vez para uma tabela indexada. A importação só é refeita quando
+o arquivo muda (mtime + tamanho), então, após reiniciar o servidor, os dados
+são lidos do SQLite sem abrir o Excel, e as consultas filtradas usam índices
+em vez de percorrer a planilha inteira.
+
+As colunas usadas nos filtros ganham, na importação, uma coluna oculta e
+indexada com o valor normalizado (não aparece em ler_tabela nem em colunas):
+
+    - _chave_<coluna>: texto sem diferença de maiúsculas e espaços nas pontas
+      (números inteiros sem ".0"), para os filtros por igualdade
+    - _dia_<coluna>: dia no formato YYYY-MM-DD (de datas, textos ISO com ou
+      sem horário ou DD/MM/AAAA), para os intervalos de datas
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, time as hora
+
+import numpy as np
+import pandas as pd
+
+from cache_planilhas import assinatura_arquivo
+from metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Índices criados por tabela (somente para colunas existentes na planilha)
+INDICES = {
+    'obras': ['encarregado', 'supervisor', 'projeto', 'dataInicio'],
+    'programacao_dia': ['data_arquivo', 'projeto', 'encarregado', 'supervisor'],
+}
+
+# Colunas filtradas por igualdade sem diferença de maiúsculas (coluna oculta _chave_<coluna>, indexada)
+CHAVES = {
+    'mainbd': ['des_equipe', 'Supervisor', 'SS/OT', 'des_atividade'],
+}
+
+# Colunas de data filtradas por intervalo de dias (coluna oculta _dia_<coluna>, indexada)
+DATAS = {
+    'mainbd': ['data_serv'],
+}
+
+PREFIXOS_OCULTOS = ('_chave_', '_dia_')
+
+
+def _identificador(nome):
+    """Nome de tabela/coluna entre aspas para uso no SQL"""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def _valor_sql(valor):
+    """Converte um valor do DataFrame para um tipo aceito pelo sqlite3"""
+    if valor is None or isinstance(valor, (str, int, float, bytes)):
+        if isinstance(valor, float) and np.isnan(valor):
+            return None
+        return valor
+    if isinstance(valor, np.generic):
+        return _valor_sql(valor.item())
+    if isinstance(valor, (datetime, date, hora, pd.Timestamp)):
+        return str(valor)
+    if pd.isna(valor):
+        return None
+    return str(valor)
+
+
+def chave_filtro(valor):
+    """
+    Valor de comparação dos filtros por igualdade (como indice_obras.normalizar_chave)
+
+    Exemplo:
+        chave_filtro(' Hiago ') -> 'HIAGO'; chave_filtro(123456.0) -> '123456'
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float):
+        if not np.isfinite(valor):
+            return None
+        if valor.is_integer():
+            valor = int(valor)
+    return str(valor).strip().upper()
+
+
+def dias_iso(serie):
+    """
+    Dia (YYYY-MM-DD) de cada valor de uma coluna de datas, ou None
+
+    Funcionalidade:
+        - Datas e textos ISO, com ou sem horário ('2025-11-10', '2025-11-10 08:30:00')
+        - Textos DD/MM/AAAA (com ou sem horário)
+    """
+    inicio = serie.map(lambda valor: None if valor is None or pd.isna(valor) else str(valor).strip()[:10])
+    dias = pd.to_datetime(inicio, format='%Y-%m-%d', errors='coerce')
+    dias = dias.fillna(pd.to_datetime(inicio, format='%d/%m/%Y', errors='coerce'))
+    return dias.dt.strftime('%Y-%m-%d').astype(object).where(dias.notna(), None)
+
+
+def _visivel(coluna):
+    return not str(coluna).startswith(PREFIXOS_OCULTOS)
+
+
+class BancoLocal:
+    """
+    Banco SQLite com as planilhas importadas e o controle de versão de cada arquivo
+
+    Funcionalidade:
+        - Tabela "arquivos" guarda a assinatura (mtime + tamanho) de cada planilha importada
+        - Colunas sem tipo declarado: o SQLite guarda texto, inteiros e reais como vieram
+        - Uma conexão por thread, em modo WAL (leituras não bloqueiam a importação)
+        - Importações do mesmo arquivo são serializadas por lock
+    """
+
+    def __init__(self, caminho):
+        self.caminho = os.path.abspath(caminho)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._locks_arquivos = {}
+
+        with self.conexao() as con:
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS arquivos ('
+                'caminho TEXT PRIMARY KEY, tabela TEXT, mtime_ns INTEGER, tamanho INTEGER, '
+                'linhas INTEGER, importado_em REAL, duracao REAL)'
+            )
+
+    def conexao(self):
+        """Conexão SQLite da thread atual"""
+        con = getattr(self._local, 'conexao', None)
+        # Conexões não podem ser reutilizadas após um fork (workers do servidor de produção)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.caminho, timeout=30)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = con
+            self._local.pid = os.getpid()
+        return con
+
+    def _lock_do_arquivo(self, caminho):
+        with self._lock:
+            lock = self._locks_arquivos.get(caminho)
+            if lock is None:
+                lock = self._locks_arquivos[caminho] = threading.Lock()
+            return lock
+
+    # ------------------------------------------------------------------
+    # Importação
+    # ------------------------------------------------------------------
+    def assinatura_importada(self, caminho):
+        """Assinatura (mtime_ns, tamanho) do arquivo na última importação, ou None"""
+        linha = self.conexao().execute(
+            'SELECT mtime_ns, tamanho FROM arquivos WHERE caminho = ?', (os.path.abspath(caminho),)
+        ).fetchone()
+        return tuple(linha) if linha else None
+
+    def sincronizar(self, caminho, tabela, carregar, substituir=True):
+        """
+        Importa a planilha para a tabela se ela mudou desde a última importação
+
+        Args:
+            caminho (str): Caminho da planilha
+            tabela (str): Tabela de destino
+            carregar (callable): Recebe o caminho e retorna o DataFrame a importar
+            substituir (bool): True recria a tabela inteira; False troca apenas as linhas
+                               deste arquivo (coluna "arquivo"), usado para várias planilhas na mesma tabela
+
+        Returns:
+            bool: True se a planilha foi (re)importada
+        """
+        caminho = os.path.abspath(caminho)
+        assinatura = assinatura_arquivo(caminho)
+        if self.assinatura_importada(caminho) == assinatura and self._normalizada(tabela):
+            return False
+
+        with self._lock_do_arquivo(caminho):
+            if self.assinatura_importada(caminho) == assinatura and self._normalizada(tabela):
+                return False
+
+            inicio = time.perf_counter()
+            df = carregar(caminho)
+            if not substituir:
+                df = df.assign(arquivo=caminho)
+            with metricas.etapa('importacao_sqlite'):
+                self._gravar(tabela, df, caminho, substituir)
+
+            duracao = time.perf_counter() - inicio
+            with self.conexao() as con:
+                con.execute(
+                    'INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (caminho, tabela, assinatura[0], assinatura[1], len(df), time.time(), duracao)
+                )
+            logger.info(f"🗄️ {os.path.basename(caminho)} importado para '{tabela}': {len(df)} linhas em {duracao:.2f}s")
+            return True
+
+    @staticmethod
+    def _colunas_normalizadas(tabela, df):
+        """Colunas ocultas da tabela: {nome: valores normalizados}"""
+        normalizadas = {}
+        for coluna in CHAVES.get(tabela, []):
+            if coluna in df.columns:
+                normalizadas[f'_chave_{coluna}'] = df[coluna].map(chave_filtro)
+        for coluna in DATAS.get(tabela, []):
+            if coluna in df.columns:
+                normalizadas[f'_dia_{coluna}'] = dias_iso(df[coluna])
+        return normalizadas
+
+    def _normalizada(self, tabela):
+        """A tabela já tem as colunas ocultas (importada depois que elas foram criadas)"""
+        if not CHAVES.get(tabela) and not DATAS.get(tabela):
+            return True
+        return any(not _visivel(coluna) for coluna in self._todas_colunas(tabela))
+
+    def _gravar(self, tabela, df, caminho, substituir):
+        normalizadas = self._colunas_normalizadas(tabela, df)
+        if normalizadas:
+            df = df.assign(**normalizadas)
+        colunas = [str(c) for c in df.columns]
+        nome = _identificador(tabela)
+        registros = [tuple(_valor_sql(v) for v in linha) for linha in df.itertuples(index=False, name=None)]
+
+        con = self.conexao()
+        with con:
+            existentes = [c[1] for c in con.execute(f'PRAGMA table_info({nome})')]
+            if substituir or (existentes and existentes != colunas):
+                if existentes and not substituir:
+                    # Layout mudou: apagar as linhas de todos os arquivos para reimportá-los
+                    con.execute('DELETE FROM arquivos WHERE tabela = ?', (tabela,))
+                con.execute(f'DROP TABLE IF EXISTS {nome}')
+                existentes = []
+
+            if not existentes:
+                con.execute(f'CREATE TABLE {nome} ({", ".join(_identificador(c) for c in colunas)})')
+                for coluna in INDICES.get(tabela, []) + list(normalizadas) + ([] if substituir else ['arquivo']):
+                    if coluna in colunas:
+                        indice = _identificador(f'idx_{tabela}_{coluna}')
+                        con.execute(f'CREATE INDEX IF NOT EXISTS {indice} ON {nome} ({_identificador(coluna)})')
+            else:
+                con.execute(f'DELETE FROM {nome} WHERE arquivo = ?', (caminho,))
+
+            marcadores = ', '.join('?' * len(colunas))
+            con.executemany(f'INSERT INTO {nome} VALUES ({marcadores})', registros)
+
+    def remover_ausentes(self, tabela, caminhos):
+        """Remove da tabela as linhas de arquivos que não existem mais (tabelas de vários arquivos)"""
+        caminhos = {os.path.abspath(c) for c in caminhos}
+        con = self.conexao()
+        importados = [c for (c,) in con.execute('SELECT caminho FROM arquivos WHERE tabela = ?', (tabela,))]
+        with con:
+            for caminho in importados:
+                if caminho not in caminhos:
+                    con.execute(f'DELETE FROM {_identificador(tabela)} WHERE arquivo = ?', (caminho,))
+                    con.execute('DELETE FROM arquivos WHERE caminho = ?', (caminho,))
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def _selecao(self, tabela, colunas):
+        """Colunas do SELECT: as informadas, ou todas menos as ocultas"""
+        return ', '.join(_identificador(c) for c in (colunas or self.colunas(tabela)))
+
+    def ler_tabela(self, tabela, colunas=None):
+        """Lê a tabela inteira (ou apenas as colunas informadas) como DataFrame"""
+        selecao = self._selecao(tabela, colunas)
+        return pd.read_sql_query(f'SELECT {selecao} FROM {_identificador(tabela)}', self.conexao())
+
+    @staticmethod
+    def _condicoes(tabela, filtros, intervalo):
+        """
+        Monta as condições do WHERE e seus parâmetros
+
+        Funcionalidade:
+            - Colunas de CHAVES comparam a coluna oculta com os valores normalizados (chave_filtro)
+            - Colunas de DATAS comparam o dia ISO da coluna oculta (limites YYYY-MM-DD inclusivos)
+        """
+        condicoes, parametros = [], []
+        chaves = CHAVES.get(tabela, [])
+        for coluna, valor in (filtros or {}).items():
+            valores = list(valor) if isinstance(valor, (list, tuple, set)) else [valor]
+            if coluna in chaves:
+                coluna = f'_chave_{coluna}'
+                valores = [chave_filtro(v) for v in valores]
+            if len(valores) == 1:
+                condicoes.append(f'{_identificador(coluna)} = ?')
+            else:
+                condicoes.append(f'{_identificador(coluna)} IN ({", ".join("?" * len(valores))})')
+            parametros.extend(valores)
+
+        if intervalo:
+            coluna, inicio, fim = intervalo
+            if coluna in DATAS.get(tabela, []):
+                coluna = f'_dia_{coluna}'
+            if inicio is not None:
+                condicoes.append(f'{_identificador(coluna)} >= ?')
+                parametros.append(inicio)
+            if fim is not None:
+                condicoes.append(f'{_identificador(coluna)} <= ?')
+                parametros.append(fim)
+        return condicoes, parametros
+
+    def consultar(self, tabela, filtros=None, intervalo=None, colunas=None, ordem=None, cursor=None, limite=None,
+                  blocos=None):
+        """
+        Consulta a tabela usando os índices
+
+        Args:
+            tabela (str): Nome da tabela
+            filtros (dict): {coluna: valor ou lista de valores} (igualdade; sem diferença de
+                            maiúsculas nas colunas de CHAVES)
+            intervalo (tuple): (coluna, início, fim) com limites inclusivos (None = aberto);
+                               nas colunas de DATAS, dias YYYY-MM-DD
+            colunas (list): Colunas a retornar (padrão: todas)
+            ordem (str): Coluna de ordenação (opcional, ignorada na paginação)
+            cursor (int): Paginação: retorna linhas com rowid maior que o cursor
+            limite (int): Paginação: quantidade máxima de linhas
+            blocos (int): Se informado, retorna um iterador de DataFrames com esse número de linhas
+
+        Returns:
+            DataFrame: Linhas selecionadas; na paginação inclui a coluna "_cursor" (rowid)
+        """
+        condicoes, parametros = self._condicoes(tabela, filtros, intervalo)
+        paginado = cursor is not None or limite is not None
+
+        selecao = self._selecao(tabela, colunas)
+        if paginado:
+            selecao = f'rowid AS _cursor, {selecao}'
+            if cursor is not None:
+                condicoes.append('rowid > ?')
+                parametros.append(cursor)
+
+        sql = f'SELECT {selecao} FROM {_identificador(tabela)}'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        if paginado:
+            sql += ' ORDER BY rowid'
+            if limite is not None:
+                sql += ' LIMIT ?'
+                parametros.append(limite)
+        elif ordem:
+            sql += f' ORDER BY {_identificador(ordem)}'
+        return pd.read_sql_query(sql, self.conexao(), params=parametros, chunksize=blocos)
+
+    def contar(self, tabela, filtros=None, intervalo=None):
+        """Quantidade de linhas que atendem aos filtros"""
+        condicoes, parametros = self._condicoes(tabela, filtros, intervalo)
+        sql = f'SELECT COUNT(*) FROM {_identificador(tabela)}'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        return self.conexao().execute(sql, parametros).fetchone()[0]
+
+    def _todas_colunas(self, tabela):
+        return [c[1] for c in self.conexao().execute(f'PRAGMA table_info({_identificador(tabela)})')]
+
+    def colunas(self, tabela):
+        """Nomes das colunas da tabela (sem as colunas ocultas de filtro)"""
+        return [coluna for coluna in self._todas_colunas(tabela) if _visivel(coluna)]
+
+    def arquivos(self):
+        """Lista das planilhas importadas com assinatura, total de linhas e duração da importação"""
+        con = self.conexao()
+        cursor = con.execute('SELECT * FROM arquivos ORDER BY caminho')
+        nomes = [c[0] for c in cursor.description]
+        return [dict(zip(nomes, linha)) for linha in cursor.fetchall()]
+
+
+_bancos = {}
+_lock_bancos = threading.Lock()
+
+
+def obter_banco(caminho):
+    """Retorna a instância única do banco local para o caminho informado"""
+    caminho = os.path.abspath(caminho)
+    with _lock_bancos:
+        banco = _bancos.get(caminho)
+        if banco is None:
+            banco = _bancos[caminho] = BancoLocal(caminho)
+        return banco
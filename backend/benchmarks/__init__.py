@@ -0,0 +1,6 @@
+"""
+Benchmarks do backend com planilhas sintéticas (python -m benchmarks.executar).
+
+    - geradores: planilhas com o mesmo layout das reais, em qualquer tamanho
+    - executar: mede os endpoints (frio/quente, memória) e grava os resultados em JSON
+"""
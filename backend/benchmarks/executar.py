@@ -0,0 +1,307 @@
+"""
+Executa os benchmarks dos endpoints com planilhas sintéticas.
+
+Uso (na pasta backend):
+    python -m benchmarks.executar --linhas 1000 10000 100000 --saida resultados.json
+    python -m benchmarks.executar --linhas 1000 --comparar resultados.json
+
+Para cada tamanho, uma pasta no formato de uploads/ é gerada (e reaproveitada
+nas execuções seguintes) e cada cenário é medido pelo test client do Flask:
+
+    - frio: primeira requisição após a planilha mudar em disco (leitura + processamento)
+    - quente: requisições seguintes (mediana e mínimo de --repeticoes execuções)
+    - memória: pico de alocações do Python (tracemalloc) em uma execução fria extra,
+      e o pico de memória residente do processo (RSS) ao fim do cenário
+
+O cenário processar_obras mede só a conversão da planilha mensal de 50 mil
+obras (processar_dataframe_obras), já lida do disco, independente de --linhas.
+
+Por padrão a leitura do Excel roda no próprio processo (--processos 0), para
+que o tracemalloc enxergue a memória da leitura e os tempos não dependam do
+pool de processos auxiliares.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from benchmarks.geradores import SEMENTE, gerar_planilha_mensal, gerar_uploads
+
+TAMANHOS = [1000, 10000, 100000]
+REPETICOES = 5
+
+# Obras da planilha mensal do cenário processar_obras
+LINHAS_PROCESSAR_OBRAS = 50000
+
+# (nome, método, URL, planilha que torna o cenário "frio" quando alterada)
+CENARIOS = [
+    ('obras_pagina', 'GET', '/api/obras?limit=100', 'mensal'),
+    ('obras_completo', 'GET', '/api/obras', 'mensal'),
+    ('obras_filtro', 'GET', '/api/obras?supervisor=HIAGO&fields=id,projeto,status', 'mensal'),
+    ('mainbd', 'GET', '/api/mainbd', 'mainbd'),
+    ('mainbd_pagina', 'GET', '/api/mainbd?limit=100', 'mainbd'),
+    ('dashboard_kpis', 'GET', '/api/dashboard/kpis', 'mainbd'),
+    ('producao_dia', 'GET', '/api/producao-dia?data=2025-11-10', 'bd_programacao'),
+]
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description='Benchmarks do backend com planilhas sintéticas')
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS,
+                        help='Tamanhos das planilhas (padrão: 1000 10000 100000)')
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES,
+                        help='Execuções quentes por cenário (padrão: 5)')
+    parser.add_argument('--cenarios', nargs='+', default=None,
+                        help='Executar apenas estes cenários (ex: obras_pagina mainbd upload_programacao_dia)')
+    parser.add_argument('--pasta', default=os.path.join(tempfile.gettempdir(), 'benchmarks-mariua'),
+                        help='Pasta das planilhas geradas (reaproveitadas entre execuções)')
+    parser.add_argument('--processos', type=int, default=0,
+                        help='Processos auxiliares de leitura do Excel (padrão: 0, no próprio processo)')
+    parser.add_argument('--sem-memoria', action='store_true',
+                        help='Não medir o pico de memória (evita a execução fria extra com tracemalloc)')
+    parser.add_argument('--saida', default='resultados_benchmark.json', help='Arquivo JSON com os resultados')
+    parser.add_argument('--comparar', default=None, help='Resultados anteriores (JSON) para comparação')
+    return parser.parse_args()
+
+
+def tocar(caminho):
+    """Altera o mtime do arquivo: todos os caches passam a considerá-lo modificado"""
+    agora = time.time_ns()
+    os.utime(caminho, ns=(agora, agora))
+
+
+def rss_pico_mb():
+    """Pico de memória residente do processo (MB), ou None se indisponível"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def cronometrar(funcao):
+    """Executa funcao() e retorna (duração em segundos, resultado)"""
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def pico_memoria_mb(funcao):
+    """Executa funcao() com tracemalloc e retorna o pico de alocações (MB)"""
+    tracemalloc.start()
+    try:
+        funcao()
+        return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    finally:
+        tracemalloc.stop()
+
+
+def medir(nome, linhas, executar, preparar_frio=None, repeticoes=REPETICOES, memoria=True):
+    """
+    Mede um cenário: execução fria, execuções quentes e pico de memória
+
+    Args:
+        nome (str): Nome do cenário
+        linhas (int): Tamanho das planilhas
+        executar (callable): Executa o cenário uma vez e retorna (status HTTP, bytes da resposta)
+        preparar_frio (callable): Invalida os caches antes da execução fria (None = todas são frias)
+        repeticoes (int): Execuções quentes
+        memoria (bool): Medir o pico de memória em uma execução fria extra
+
+    Returns:
+        dict: Resultado do cenário
+    """
+    if preparar_frio is not None:
+        preparar_frio()
+    frio, (status, tamanho) = cronometrar(executar)
+
+    quentes = [cronometrar(executar)[0] for _ in range(repeticoes)]
+
+    pico = None
+    if memoria:
+        if preparar_frio is not None:
+            preparar_frio()
+        pico = pico_memoria_mb(executar)
+
+    resultado = {
+        'cenario': nome,
+        'linhas': linhas,
+        'status': status,
+        'bytes': tamanho,
+        'frio_s': round(frio, 4),
+        'quente_mediana_s': round(statistics.median(quentes), 4) if quentes else None,
+        'quente_min_s': round(min(quentes), 4) if quentes else None,
+        'repeticoes': repeticoes,
+        'memoria_pico_mb': pico,
+        'rss_pico_mb': rss_pico_mb(),
+    }
+    print(f"  {nome:<24} frio {resultado['frio_s']:>8.3f}s  quente {resultado['quente_mediana_s'] or 0:>8.4f}s  "
+          f"memória {pico if pico is not None else '-':>8} MB  status {status}  {tamanho} bytes")
+    return resultado
+
+
+def executar_tamanho(linhas, argumentos):
+    """Gera as planilhas do tamanho pedido e mede todos os cenários"""
+    import app as backend
+
+    pasta = os.path.join(argumentos.pasta, f'{linhas}-linhas')
+    inicio = time.perf_counter()
+    caminhos = gerar_uploads(pasta, linhas)
+    print(f"📁 {linhas} linhas: planilhas prontas em {time.perf_counter() - inicio:.1f}s ({pasta})")
+
+    backend.criar_app({
+        'UPLOAD_FOLDER': pasta,
+        'OBSERVAR_ARQUIVOS': False,
+        'PROCESSOS_LEITURA': argumentos.processos,
+        'ADMISSAO': False,
+        'LOG_LEVEL': 'WARNING',
+    })
+    cliente = backend.app.test_client()
+    memoria = not argumentos.sem_memoria
+    selecionado = lambda nome: argumentos.cenarios is None or nome in argumentos.cenarios
+    resultados = []
+
+    for nome, metodo, url, planilha in CENARIOS:
+        if not selecionado(nome):
+            continue
+
+        def requisitar(metodo=metodo, url=url):
+            resposta = cliente.open(url, method=metodo)
+            return resposta.status_code, len(resposta.get_data())
+
+        resultados.append(medir(
+            nome, linhas, requisitar, lambda planilha=planilha: tocar(caminhos[planilha]),
+            argumentos.repeticoes, memoria
+        ))
+
+    if selecionado('upload_programacao_dia'):
+        with open(caminhos['dia'], 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+        def enviar():
+            resposta = cliente.post('/api/programacao-dia/upload', data={'file': (io.BytesIO(conteudo), 'dia.xlsx')})
+            return resposta.status_code, len(resposta.get_data())
+
+        # Cada upload é processado do zero: todas as execuções são frias
+        resultados.append(medir('upload_programacao_dia', linhas, enviar, None, argumentos.repeticoes, memoria))
+
+    if selecionado('salvar_planilha'):
+        # Gravação da planilha mensal inteira (load_workbook fora da medição), em uma cópia
+        copia = os.path.join(pasta, 'copia-gravacao.xlsx')
+        shutil.copy2(caminhos['mensal'], copia)
+        wb = load_workbook(copia)
+        try:
+            def salvar():
+                backend.salvar_planilha_com_retry(wb, copia)
+                return 200, os.path.getsize(copia)
+
+            resultados.append(medir('salvar_planilha', linhas, salvar, None, argumentos.repeticoes, memoria))
+        finally:
+            wb.close()
+            os.remove(copia)
+
+    return resultados
+
+
+def executar_processar_obras(argumentos):
+    """Mede o processamento da planilha mensal de LINHAS_PROCESSAR_OBRAS obras (leitura fora da medição)"""
+    import app as backend
+
+    caminho = os.path.join(argumentos.pasta, f'{LINHAS_PROCESSAR_OBRAS}-obras', 'PROGRAMACAO - NOVEMBRO.xlsx')
+    if not os.path.exists(caminho):
+        inicio = time.perf_counter()
+        gerar_planilha_mensal(caminho, LINHAS_PROCESSAR_OBRAS)
+        print(f"📁 {LINHAS_PROCESSAR_OBRAS} obras: planilha pronta em {time.perf_counter() - inicio:.1f}s ({caminho})")
+    df = pd.read_excel(caminho, header=0)
+
+    def processar():
+        obras = backend.processar_dataframe_obras(df)
+        return 200, len(obras)
+
+    # Sem cache: todas as execuções processam a planilha inteira ("bytes" = obras processadas)
+    return medir('processar_obras', LINHAS_PROCESSAR_OBRAS, processar, None, argumentos.repeticoes,
+                 not argumentos.sem_memoria)
+
+
+def comparar(atuais, anteriores):
+    """
+    Compara os resultados com uma execução anterior (mesmo cenário e tamanho)
+
+    Returns:
+        list: Uma linha de texto por cenário, com a razão atual/anterior (< 1 = mais rápido)
+    """
+    referencia = {(r['cenario'], r['linhas']): r for r in anteriores}
+    linhas = []
+    for resultado in atuais:
+        anterior = referencia.get((resultado['cenario'], resultado['linhas']))
+        if anterior is None:
+            continue
+        partes = []
+        for campo in ('frio_s', 'quente_mediana_s', 'memoria_pico_mb'):
+            if resultado.get(campo) and anterior.get(campo):
+                partes.append(f"{campo} {anterior[campo]} -> {resultado[campo]} ({resultado[campo] / anterior[campo]:.2f}x)")
+        linhas.append(f"  {resultado['cenario']:<24} {resultado['linhas']:>7}  " + '  '.join(partes))
+    return linhas
+
+
+def main():
+    argumentos = ler_argumentos()
+    argumentos.saida = os.path.abspath(argumentos.saida)
+    if argumentos.comparar:
+        argumentos.comparar = os.path.abspath(argumentos.comparar)
+
+    # A aplicação usa caminhos relativos à pasta do backend
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    resultados = []
+    for linhas in argumentos.linhas:
+        resultados.extend(executar_tamanho(linhas, argumentos))
+    if argumentos.cenarios is None or 'processar_obras' in argumentos.cenarios:
+        resultados.append(executar_processar_obras(argumentos))
+
+    relatorio = {
+        'geradoEm': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'configuracao': {
+            'linhas': argumentos.linhas,
+            'repeticoes': argumentos.repeticoes,
+            'processos': argumentos.processos,
+            'semente': SEMENTE,
+        },
+        'resultados': resultados,
+    }
+    with open(argumentos.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados gravados em {argumentos.saida}")
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding='utf-8') as arquivo:
+            anteriores = json.load(arquivo)['resultados']
+        print("📊 Comparação com a execução anterior (razão atual/anterior):")
+        for linha in comparar(resultados, anteriores):
+            print(linha)
+
+
+if __name__ == '__main__':
+    main()
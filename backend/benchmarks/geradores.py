@@ -0,0 +1,241 @@
+"""
+Geradores de planilhas sintéticas com o mesmo layout das planilhas reais.
+
+    - Planilha mensal de obras (PROGRAMACAO - <MÊS>.xlsx, 26 colunas A..Z)
+    - Programação do dia (ProgramacaoNovembro/DD-MM-YYYY.xlsx, 8 colunas)
+    - MainBD.xlsx (produção executada: data_serv, des_equipe, des_atividade, qtd_atividade, SS/OT...)
+    - BDProgramacao.xlsx (produção realizada por dia, usada em /api/producao-dia)
+
+Os valores seguem a distribuição das planilhas de uploads/ (poucos
+supervisores e encarregados, datas em texto DD/MM/YYYY, coordenadas com
+vírgula decimal, algumas células vazias), e a semente fixa torna os
+arquivos idênticos entre execuções.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+SEMENTE = 2025
+
+SUPERVISORES = ['HIAGO', 'ETEMILSON OLIVEIRA', 'GILVANDO RIOS', 'CARLOS']
+ENCARREGADOS = ['JAILSON', 'IRISMAR', 'JARBAS', 'ROMERO', 'MARCOS', 'EDVALDO', 'GILMAR', 'VALDEMIR']
+MUNICIPIOS = ['IRECÊ', 'CANARANA', 'BARRO ALTO', 'CAFARNAUM', 'JACOBINA', 'CENTRAL', 'AMÉRICA DOURADA']
+CRITERIOS = ['QLP', 'QLU', 'PLI', 'REL']
+ATIVIDADES_DIA = ['IMPLANTAÇÃO', 'LANÇAMENTO', 'ESCAVAÇÃO', 'LV', 'DESCARGA/IMPLANTAÇÃO', 'PODA DE LIVRAMENTO']
+ATIVIDADES_MAINBD = [
+    'POSTE AT', 'POSTE BT', 'CAVA NORMAL', 'CAVA EM ROCHA', 'ESCAVAÇÃO PARA ESTAI',
+    'ESCAVAÇÃO COM ROMPEDOR', 'LIGAÇÃO DE CLIENTE', 'PODA', 'LANÇAMENTO'
+]
+EQUIPES = [
+    'WESLEI-IRC', 'MENEZES-IRC', 'VAGNO-IRC', 'OSIMAR-JAC', 'TIAGO-JAC', 'JOAO-JAC',
+    'JENILSON-JAC', 'WASHINGTON-IRC', 'EQ1-IRC', 'EQ2-JAC'
+]
+EVENTOS = ['EXECUTADO', 'EXECUTADO PARCIAL', 'NÃO EXECUTADO', 'CANCELADO']
+
+# Cabeçalhos das planilhas (o backend lê as colunas pela posição)
+CABECALHO_MENSAL = [
+    'ENCARREGADO', 'SUPERVISOR', 'PROJETO', 'TITULO', 'MUNICIPIO', 'CRITÉRIO', 'ANOTAÇÕES', 'POSTE PREV',
+    'INICIO', 'TERMINO', 'OBRA DA SEMANA', 'MOTIVO DO ATRASO', 'NECESSIDADE', 'PROGRAMAÇÃO LV', 'CAVA EXEC',
+    'POSTE EXEC', 'LATITUDE', 'LONGITUDE', 'CLIENTES PREVISTOS', 'PROJETO KIT', 'PROJETO MEDIDOR',
+    'AR COELBA', 'VISITA PRÉVIA', 'OBSERVAÇÃO DA VISITA', 'ANÁLISE PRÉ FECH', 'SOLICITAÇÃO DE RESERVA'
+]
+CABECALHO_DIA = ['Data', 'Projeto', 'Supervisor', 'Encarregado', 'Título', 'Município', 'Atividade Programada', 'Critério']
+
+
+def _escolher(rng, opcoes, linhas, vazios=0.0):
+    """Sorteia valores de opcoes; uma fração 'vazios' das células fica vazia (None)"""
+    valores = np.array(opcoes, dtype=object)[rng.integers(0, len(opcoes), linhas)]
+    if vazios:
+        valores[rng.random(linhas) < vazios] = None
+    return valores
+
+
+def _projetos(rng, linhas, distintos=None):
+    """Códigos de projeto no formato B-1234567"""
+    codigos = rng.integers(1_000_000, 1_300_000, distintos or linhas)
+    return np.array([f'B-{codigo}' for codigo in codigos], dtype=object)[rng.integers(0, len(codigos), linhas)]
+
+
+def _datas_texto(rng, linhas, inicio='2025-10-01', dias=90):
+    """Datas DD/MM/YYYY em texto, como digitadas na planilha mensal"""
+    datas = pd.Timestamp(inicio) + pd.to_timedelta(rng.integers(0, dias, linhas), unit='D')
+    return datas.strftime('%d/%m/%Y').to_numpy(dtype=object), datas
+
+
+def gerar_planilha_mensal(caminho, linhas, semente=SEMENTE):
+    """
+    Gera a planilha mensal de obras (26 colunas, A..Z)
+
+    Args:
+        caminho (str): Arquivo .xlsx de destino
+        linhas (int): Quantidade de obras
+        semente (int): Semente do gerador aleatório
+    """
+    rng = np.random.default_rng(semente)
+    inicio, datas_inicio = _datas_texto(rng, linhas)
+    termino = (datas_inicio + pd.to_timedelta(rng.integers(0, 45, linhas), unit='D')).strftime('%d/%m/%Y')
+    postes_previstos = rng.integers(0, 30, linhas)
+    latitude = np.char.replace((-11.0 - rng.random(linhas) * 2).round(6).astype(str), '.', ',').astype(object)
+    longitude = np.char.replace((-41.0 - rng.random(linhas) * 2).round(6).astype(str), '.', ',').astype(object)
+    sem_coordenadas = rng.random(linhas) < 0.2
+    latitude[sem_coordenadas] = None
+    longitude[sem_coordenadas] = None
+
+    colunas = [
+        _escolher(rng, ENCARREGADOS, linhas, 0.05),
+        _escolher(rng, SUPERVISORES, linhas, 0.02),
+        _projetos(rng, linhas),
+        np.array([f'ER-CIND-POV-LOCALIDADE {i % 997}' for i in range(linhas)], dtype=object),
+        _escolher(rng, MUNICIPIOS, linhas),
+        _escolher(rng, CRITERIOS, linhas, 0.1),
+        _escolher(rng, ['ENERGIZADA', 'AGUARDANDO MATERIAL', 'REPROGRAMAR'], linhas, 0.6),
+        postes_previstos,
+        inicio,
+        termino.to_numpy(dtype=object),
+        _escolher(rng, ['SIM', 'ENERGIZADA'], linhas, 0.7),
+        _escolher(rng, ['CHUVA', 'FALTA DE MATERIAL', 'LIBERAÇÃO'], linhas, 0.85),
+        _escolher(rng, ATIVIDADES_DIA, linhas, 0.1),
+        _escolher(rng, ['REALIZADO', 'PROGRAMADO'], linhas, 0.5),
+        rng.integers(0, 20, linhas),
+        np.minimum(rng.integers(0, 30, linhas), postes_previstos),
+        latitude,
+        longitude,
+        rng.integers(0, 5, linhas),
+        _escolher(rng, ['KIT-01', 'KIT-02'], linhas, 0.8),
+        _escolher(rng, ['MED-01'], linhas, 0.9),
+        _escolher(rng, ['MANOEL MESSIAS ALENCAR - U359765', 'JOSE SANTOS - U120044'], linhas, 0.3),
+        _escolher(rng, ['07/10/25', '15/10/25'], linhas, 0.5),
+        _escolher(rng, ['INTERCALAR POSTE 11/600', 'SEM OBSERVAÇÕES'], linhas, 0.7),
+        _escolher(rng, ['07/10/25'], linhas, 0.7),
+        _escolher(rng, ['07/10/25'], linhas, 0.7),
+    ]
+    _gravar(caminho, pd.DataFrame(dict(zip(CABECALHO_MENSAL, colunas))))
+
+
+def gerar_programacao_dia(caminho, linhas, dia='2025-11-10', semente=SEMENTE):
+    """
+    Gera a programação do dia (8 colunas, mesma ordem do upload)
+
+    Args:
+        caminho (str): Arquivo .xlsx de destino
+        linhas (int): Quantidade de itens programados
+        dia (str): Data da programação (YYYY-MM-DD)
+        semente (int): Semente do gerador aleatório
+    """
+    rng = np.random.default_rng(semente + 1)
+    colunas = [
+        np.full(linhas, pd.Timestamp(dia)),
+        _projetos(rng, linhas),
+        _escolher(rng, SUPERVISORES, linhas),
+        _escolher(rng, ENCARREGADOS, linhas),
+        np.array([f'ER-CIND-POV-LOCALIDADE {i % 997}' for i in range(linhas)], dtype=object),
+        _escolher(rng, MUNICIPIOS, linhas),
+        _escolher(rng, ATIVIDADES_DIA, linhas),
+        _escolher(rng, CRITERIOS, linhas),
+    ]
+    _gravar(caminho, pd.DataFrame(dict(zip(CABECALHO_DIA, colunas))))
+
+
+def gerar_mainbd(caminho, linhas, semente=SEMENTE):
+    """
+    Gera o MainBD.xlsx (produção executada, uma linha por atividade)
+
+    Args:
+        caminho (str): Arquivo .xlsx de destino
+        linhas (int): Quantidade de registros
+        semente (int): Semente do gerador aleatório
+    """
+    rng = np.random.default_rng(semente + 2)
+    datas = pd.Timestamp('2025-08-01') + pd.to_timedelta(rng.integers(0, 120, linhas), unit='D')
+    energizada = np.where(rng.random(linhas) < 0.3, datas.strftime('%Y-%m-%d'), None)
+    df = pd.DataFrame({
+        'data_serv': datas,
+        'des_equipe': _escolher(rng, EQUIPES, linhas),
+        'Supervisor': _escolher(rng, SUPERVISORES, linhas),
+        'des_atividade': _escolher(rng, ATIVIDADES_MAINBD, linhas),
+        'qtd_atividade': rng.integers(1, 10, linhas).astype(float),
+        'SS/OT': np.array([f'SS-{i:06d}' for i in rng.integers(0, max(linhas // 5, 1), linhas)], dtype=object),
+        'ar_coelba': _escolher(rng, ['AR1', 'AR2', 'AR3'], linhas, 0.3),
+        'data_energ': energizada,
+        'valor_projeto': (rng.random(linhas) * 1000).round(2),
+        'valor_mao': (rng.random(linhas) * 500).round(2),
+        'clientes': rng.integers(0, 3, linhas),
+    })
+    _gravar(caminho, df)
+
+
+def gerar_bd_programacao(caminho, linhas, dia='2025-11-10', semente=SEMENTE):
+    """
+    Gera a BDProgramacao.xlsx (produção realizada por projeto/encarregado em cada dia)
+
+    Args:
+        caminho (str): Arquivo .xlsx de destino
+        linhas (int): Quantidade de registros
+        dia (str): Último dia do período gerado (YYYY-MM-DD)
+        semente (int): Semente do gerador aleatório
+    """
+    rng = np.random.default_rng(semente + 3)
+    datas = pd.Timestamp(dia) - pd.to_timedelta(rng.integers(0, 30, linhas), unit='D')
+    df = pd.DataFrame({
+        'DATA': datas,
+        'SUPERVISOR': _escolher(rng, SUPERVISORES, linhas),
+        'ENCARREGADO': _escolher(rng, ENCARREGADOS, linhas),
+        'PROJETO': _projetos(rng, linhas, distintos=max(linhas // 3, 1)),
+        'TITULO': np.array([f'ER-CIND-POV-LOCALIDADE {i % 997}' for i in range(linhas)], dtype=object),
+        'MUNICÍPIO': _escolher(rng, MUNICIPIOS, linhas),
+        'ATIVIDADE PROGRAMADA': _escolher(rng, ATIVIDADES_DIA, linhas),
+        'LOCAÇÃO': _escolher(rng, [5.0, 10.0, 15.0], linhas, 0.5),
+        'CAV PREV': _escolher(rng, [1.0, 2.0, 4.0], linhas, 0.4),
+        'CAVA REAL': _escolher(rng, [0.0, 1.0, 2.0, 3.0], linhas, 0.4),
+        'CAVA EM ROCHA': _escolher(rng, [0.0, 1.0], linhas, 0.7),
+        'POSTE PREV': _escolher(rng, [1.0, 3.0, 5.0], linhas, 0.4),
+        'POSTE REAL': _escolher(rng, [0.0, 2.0, 5.0], linhas, 0.4),
+        'EVENTO': _escolher(rng, EVENTOS, linhas),
+        'RESPONSAVEL': _escolher(rng, ['EQUIPE', 'CLIENTE', 'CONCESSIONÁRIA'], linhas),
+        'JUSTIFICATIVA': _escolher(rng, ['CHUVA', 'TRADO ISOLOU'], linhas, 0.8),
+    })
+    _gravar(caminho, df)
+
+
+def _gravar(caminho, df):
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    df.to_excel(caminho, index=False, engine='openpyxl')
+
+
+def gerar_uploads(pasta, linhas, semente=SEMENTE):
+    """
+    Monta uma pasta no formato de uploads/ com todas as planilhas do tamanho pedido
+
+    Os arquivos já gerados (mesmo tamanho e semente) são reaproveitados, pois
+    gravar 100 mil linhas no Excel leva alguns minutos.
+
+    Args:
+        pasta (str): Pasta de destino (equivalente a backend/uploads)
+        linhas (int): Linhas de cada planilha
+        semente (int): Semente do gerador aleatório
+
+    Returns:
+        dict: Caminhos das planilhas geradas (mensal, dia, mainbd, bd_programacao)
+    """
+    caminhos = {
+        'mensal': os.path.join(pasta, 'PROGRAMACAO - NOVEMBRO.xlsx'),
+        'dia': os.path.join(pasta, 'ProgramacaoNovembro', '10-11-2025.xlsx'),
+        'mainbd': os.path.join(pasta, 'BD', 'MainBD.xlsx'),
+        'bd_programacao': os.path.join(pasta, 'BD', 'BDProgramacao.xlsx'),
+    }
+    geradores = {
+        'mensal': gerar_planilha_mensal,
+        'dia': gerar_programacao_dia,
+        'mainbd': gerar_mainbd,
+        'bd_programacao': gerar_bd_programacao,
+    }
+    marcador = os.path.join(pasta, f'.gerado-{linhas}-{semente}')
+    if not os.path.exists(marcador) or not all(os.path.exists(c) for c in caminhos.values()):
+        for nome, caminho in caminhos.items():
+            geradores[nome](caminho, linhas, semente=semente)
+        with open(marcador, 'w'):
+            pass
+    return caminhos
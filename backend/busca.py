@@ -0,0 +1,340 @@
+"""
+Busca textual (sem diferença de acentos e maiúsculas) nas obras e no MainBD.
+
+Cada documento (uma obra, ou uma SS/OT do MainBD com suas atividades) tem o
+texto de seus campos normalizado (sem acentos, minúsculo, só letras e
+números) e quebrado em trigramas, com espaço nas bordas de cada palavra
+(" rua " -> " ru", "rua", "ua "). O índice invertido liga cada trigrama aos
+documentos que o contêm:
+
+    - Termo com 3+ letras: documentos com todos os trigramas do termo
+      (trecho em qualquer posição da palavra)
+    - Termo com 2 letras: documentos com uma palavra começando pelo termo
+    - Vários termos: todos precisam aparecer (em qualquer campo)
+
+Os candidatos são conferidos no texto e pontuados pelo peso do campo em que
+cada termo aparece (palavra inteira > início de palavra > trecho).
+
+Quando a planilha muda, só os documentos cujo texto mudou (ou que surgiram ou
+sumiram) são retirados e reinseridos no índice.
+"""
+import logging
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+from metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Campos pesquisados das obras e peso de cada um na pontuação
+CAMPOS_BUSCA_OBRAS = {
+    'projeto': 5,
+    'cliente': 3,
+    'localidade': 2,
+    'encarregado': 2,
+    'anotacoes': 1,
+}
+
+# Campos pesquisados do MainBD (um documento por SS/OT) e peso de cada um
+CAMPOS_BUSCA_MAINBD = {
+    'ssot': 5,
+    'atividades': 2,
+}
+
+# Tamanho mínimo de um termo da busca
+TAMANHO_MINIMO_TERMO = 2
+
+# Pontos por termo, multiplicados pelo peso do campo
+PONTOS_PALAVRA = 3
+PONTOS_INICIO = 2
+PONTOS_TRECHO = 1
+
+_NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+@lru_cache(maxsize=65536)
+def _normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+    return ' '.join(_NAO_ALFANUMERICO.sub(' ', sem_acentos).split())
+
+
+def normalizar_texto(valor):
+    """
+    Texto de comparação da busca
+
+    Exemplo:
+        normalizar_texto('Conceição do Coité - BA') -> 'conceicao do coite ba'
+    """
+    if valor is None or valor != valor:  # None ou NaN
+        return ''
+    return _normalizar(str(valor))
+
+
+def trigramas(texto):
+    """Trigramas das palavras de um texto normalizado (com espaço nas bordas de cada palavra)"""
+    resultado = set()
+    for palavra in texto.split():
+        borda = f' {palavra} '
+        resultado.update(borda[i:i + 3] for i in range(len(borda) - 2))
+    return resultado
+
+
+def trigramas_do_termo(termo):
+    """Trigramas que um documento precisa ter para conter o termo"""
+    if len(termo) < 3:
+        return {f' {termo}'}
+    return {termo[i:i + 3] for i in range(len(termo) - 2)}
+
+
+def termos_da_consulta(consulta):
+    """Termos normalizados da consulta (sem repetições e sem os curtos demais)"""
+    return list(dict.fromkeys(
+        termo for termo in normalizar_texto(consulta).split() if len(termo) >= TAMANHO_MINIMO_TERMO
+    ))
+
+
+class IndiceTexto:
+    """
+    Índice invertido de trigramas de um conjunto de documentos
+
+    Args:
+        pesos (list): Peso de cada campo dos documentos, na ordem dos textos
+
+    Funcionalidade:
+        - sincronizar(): recebe todos os documentos atuais e atualiza só os que mudaram
+        - buscar(): documentos com todos os termos, pontuados
+    """
+
+    def __init__(self, pesos):
+        self.pesos = list(pesos)
+        self._lock = threading.Lock()
+        self._proximo_id = 0
+        self._ids = {}          # chave -> id interno
+        self._originais = {}    # id -> textos como vieram da planilha
+        self._textos = {}       # id -> textos normalizados de cada campo
+        self._chaves = {}       # id -> chave
+        self._dados = {}        # id -> dados devolvidos na busca
+        self._postagens = {}    # trigrama -> ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _inserir(self, chave, originais, dados):
+        id_documento = self._proximo_id
+        self._proximo_id += 1
+        textos = [normalizar_texto(texto) for texto in originais]
+        self._ids[chave] = id_documento
+        self._originais[id_documento] = originais
+        self._textos[id_documento] = textos
+        self._chaves[id_documento] = chave
+        self._dados[id_documento] = dados
+        for trigrama in trigramas(' '.join(textos)):
+            self._postagens.setdefault(trigrama, set()).add(id_documento)
+
+    def _remover(self, chave):
+        id_documento = self._ids.pop(chave)
+        for trigrama in trigramas(' '.join(self._textos.pop(id_documento))):
+            postagem = self._postagens[trigrama]
+            postagem.discard(id_documento)
+            if not postagem:
+                del self._postagens[trigrama]
+        del self._originais[id_documento], self._chaves[id_documento], self._dados[id_documento]
+
+    def sincronizar(self, documentos):
+        """
+        Atualiza o índice para o conjunto atual de documentos
+
+        Args:
+            documentos (iterable): Tuplas (chave, textos dos campos, dados devolvidos na busca)
+
+        Returns:
+            int: Documentos inseridos, alterados ou removidos
+        """
+        with self._lock:
+            vistos = set()
+            alterados = 0
+            for chave, originais, dados in documentos:
+                originais = tuple(originais)
+                vistos.add(chave)
+                id_documento = self._ids.get(chave)
+                if id_documento is not None:
+                    if self._originais[id_documento] == originais:
+                        self._dados[id_documento] = dados
+                        continue
+                    self._remover(chave)
+                self._inserir(chave, originais, dados)
+                alterados += 1
+
+            for chave in [chave for chave in self._ids if chave not in vistos]:
+                self._remover(chave)
+                alterados += 1
+            return alterados
+
+    def _pontuar(self, textos, termos):
+        """Pontuação do documento, ou 0 se algum termo não aparece em nenhum campo"""
+        total = 0
+        for termo in termos:
+            melhor = 0
+            palavra, inicio = f' {termo} ', f' {termo}'
+            for texto, peso in zip(textos, self.pesos):
+                if termo not in texto:
+                    continue
+                borda = f' {texto} '
+                if palavra in borda:
+                    pontos = PONTOS_PALAVRA
+                elif inicio in borda:
+                    pontos = PONTOS_INICIO
+                elif len(termo) >= 3:
+                    pontos = PONTOS_TRECHO
+                else:
+                    continue
+                melhor = max(melhor, pontos * peso)
+            if not melhor:
+                return 0
+            total += melhor
+        return total
+
+    def buscar(self, termos):
+        """
+        Documentos que contêm todos os termos
+
+        Args:
+            termos (list): Termos normalizados (termos_da_consulta)
+
+        Returns:
+            list: (pontuação, chave, dados) sem ordem definida
+        """
+        if not termos:
+            return []
+        with self._lock:
+            postagens = []
+            for termo in termos:
+                for trigrama in trigramas_do_termo(termo):
+                    postagem = self._postagens.get(trigrama)
+                    if not postagem:
+                        return []
+                    postagens.append(postagem)
+            postagens.sort(key=len)
+            candidatos = postagens[0].intersection(*postagens[1:])
+
+            resultados = []
+            for id_documento in candidatos:
+                pontuacao = self._pontuar(self._textos[id_documento], termos)
+                if pontuacao:
+                    resultados.append((pontuacao, self._chaves[id_documento], self._dados[id_documento]))
+            return resultados
+
+
+def documentos_obras(obras):
+    """Um documento por obra: chave e dados = ID da obra"""
+    campos = list(CAMPOS_BUSCA_OBRAS)
+    for obra in obras:
+        yield obra.id, [getattr(obra, campo) for campo in campos], obra.id
+
+
+def _texto_ssot(valor):
+    """SS/OT como texto (números lidos como float pelo pandas perdem o '.0')"""
+    if valor is None or valor != valor:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def documentos_mainbd(df):
+    """
+    Um documento por SS/OT do MainBD
+
+    Returns:
+        iterable: (SS/OT, [SS/OT, atividades], {'ssot', 'atividades', 'linhas'})
+    """
+    if 'SS/OT' not in df.columns:
+        return
+    ssot = df['SS/OT'].map(_texto_ssot)
+    atividades = (
+        df['des_atividade'].fillna('').astype(str).str.strip()
+        if 'des_atividade' in df.columns else pd.Series('', index=df.index)
+    )
+    tabela = pd.DataFrame({'ssot': ssot.to_numpy(), 'atividade': atividades.to_numpy()})
+    tabela = tabela[tabela['ssot'] != '']
+    linhas = tabela.groupby('ssot', sort=False).size()
+    distintas = tabela[tabela['atividade'] != ''].drop_duplicates().groupby('ssot', sort=False)['atividade'].agg(list)
+
+    for chave, total in linhas.items():
+        lista = distintas.get(chave, [])
+        yield chave, [chave, ' | '.join(lista)], {'ssot': chave, 'atividades': lista, 'linhas': int(total)}
+
+
+class BuscaMariua:
+    """
+    Índices de busca das obras e do MainBD, atualizados por versão
+
+    Funcionalidade:
+        - atualizar_obras(indice): sincroniza com a versão do índice de obras (IndiceObras)
+        - atualizar_mainbd(entrada): sincroniza com a versão do MainBD em cache (ETag)
+        - Versão igual à última sincronizada: nada a fazer
+    """
+
+    FONTES = ('obras', 'mainbd')
+
+    def __init__(self):
+        self.indices = {
+            'obras': IndiceTexto(CAMPOS_BUSCA_OBRAS.values()),
+            'mainbd': IndiceTexto(CAMPOS_BUSCA_MAINBD.values()),
+        }
+        self._versoes = {fonte: None for fonte in self.FONTES}
+        self._lock = threading.Lock()
+
+    def _atualizar(self, fonte, versao, documentos):
+        if self._versoes[fonte] == versao:
+            metricas.incrementar('cache_total', cache='busca', resultado='acerto')
+            return
+        with self._lock:
+            if self._versoes[fonte] == versao:
+                metricas.incrementar('cache_total', cache='busca', resultado='acerto')
+                return
+            indice = self.indices[fonte]
+            resultado = 'incremental' if self._versoes[fonte] is not None else 'completo'
+            with metricas.etapa('indice_busca'):
+                alterados = indice.sincronizar(documentos())
+            self._versoes[fonte] = versao
+        metricas.incrementar('cache_total', cache='busca', resultado=resultado)
+        metricas.incrementar('linhas_processadas_total', alterados, etapa=f'indice_busca_{fonte}')
+        logger.info(f"Índice de busca ({fonte}, {resultado}): {alterados} documentos atualizados, {len(indice)} no total")
+
+    def atualizar_obras(self, indice_obras):
+        self._atualizar('obras', indice_obras.versao, lambda: documentos_obras(indice_obras.obras))
+
+    def atualizar_mainbd(self, entrada):
+        self._atualizar('mainbd', entrada.etag, lambda: documentos_mainbd(entrada.dados))
+
+    def buscar(self, consulta, fontes=FONTES):
+        """
+        Busca nas fontes informadas
+
+        Args:
+            consulta (str): Texto digitado
+            fontes (list): 'obras' e/ou 'mainbd'
+
+        Returns:
+            list: (pontuação, fonte, chave, dados), da maior para a menor pontuação
+                  (empates na ordem da fonte e da chave)
+        """
+        termos = termos_da_consulta(consulta)
+        resultados = [
+            (pontuacao, fonte, chave, dados)
+            for fonte in self.FONTES if fonte in fontes
+            for pontuacao, chave, dados in self.indices[fonte].buscar(termos)
+        ]
+        ordem = {fonte: posicao for posicao, fonte in enumerate(self.FONTES)}
+        resultados.sort(key=lambda item: (-item[0], ordem[item[1]], item[2]))
+        return resultados
+
+
+# Instância única do processo
+busca = BuscaMariua()
@@ -0,0 +1,141 @@
+"""
+Cache em memória de planilhas já processadas, compartilhado por todo o processo.
+
+Cada entrada é indexada pelo caminho do arquivo e validada pela assinatura
+(mtime + tamanho) do arquivo em disco. Enquanto o arquivo não mudar, os
+endpoints reutilizam o DataFrame e o JSON já serializado em vez de chamar
+pd.read_excel novamente.
+"""
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from metricas import metricas
+from transmissao import comprimir
+
+logger = logging.getLogger(__name__)
+
+
+def assinatura_arquivo(caminho):
+    """
+    Retorna a assinatura (mtime_ns, tamanho) de um arquivo em disco
+
+    Args:
+        caminho (str): Caminho do arquivo
+
+    Returns:
+        tuple: (mtime em nanossegundos, tamanho em bytes)
+    """
+    info = os.stat(caminho)
+    return (info.st_mtime_ns, info.st_size)
+
+
+class EntradaCache:
+    """Resultado processado de uma planilha junto com seus metadados HTTP"""
+
+    __slots__ = ('caminho', 'assinatura', 'dados', 'json_bytes', 'etag', 'last_modified', '_comprimidos')
+
+    def __init__(self, caminho, assinatura, dados, json_bytes):
+        self.caminho = caminho
+        self.assinatura = assinatura
+        self.dados = dados
+        self.json_bytes = json_bytes
+
+        chave = f"{os.path.abspath(caminho)}:{assinatura[0]}:{assinatura[1]}"
+        self.etag = hashlib.sha1(chave.encode('utf-8')).hexdigest()
+        self.last_modified = datetime.fromtimestamp(assinatura[0] / 1e9, tz=timezone.utc)
+        self._comprimidos = {}
+
+    def comprimido(self, codificacao):
+        """JSON comprimido com gzip/brotli, calculado uma única vez por versão do arquivo"""
+        dados = self._comprimidos.get(codificacao)
+        if dados is None:
+            dados = self._comprimidos[codificacao] = comprimir(self.json_bytes, codificacao)
+        return dados
+
+
+class CachePlanilhas:
+    """
+    Cache de planilhas processadas, invalidado quando o arquivo muda em disco
+
+    Funcionalidade:
+        - Guarda uma entrada por caminho de arquivo
+        - Compara mtime + tamanho a cada acesso (apenas um os.stat)
+        - Reprocessa somente quando o arquivo foi alterado
+        - Requisições simultâneas para o mesmo arquivo aguardam um único processamento
+        - Durante o reprocessamento, a versão anterior (se houver) continua sendo servida
+    """
+
+    def __init__(self):
+        self._entradas = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_do_caminho(self, caminho):
+        with self._lock:
+            lock = self._locks.get(caminho)
+            if lock is None:
+                lock = self._locks[caminho] = threading.Lock()
+            return lock
+
+    def obter(self, caminho, carregar, serializar):
+        """
+        Retorna a entrada em cache do arquivo, processando-o se necessário
+
+        Args:
+            caminho (str): Caminho da planilha
+            carregar (callable): Recebe o caminho e retorna os dados processados
+            serializar (callable): Recebe os dados e retorna o JSON em bytes
+
+        Returns:
+            EntradaCache: Dados processados, JSON serializado, ETag e Last-Modified
+        """
+        caminho = os.path.abspath(caminho)
+        entrada = self._entradas.get(caminho)
+        assinatura = assinatura_arquivo(caminho)
+        if entrada is not None and entrada.assinatura == assinatura:
+            metricas.incrementar('cache_total', cache='planilhas', resultado='acerto')
+            return entrada
+
+        lock = self._lock_do_caminho(caminho)
+        if entrada is not None and not lock.acquire(blocking=False):
+            # A nova versão já está sendo processada (ex: pelo observador de arquivos):
+            # continuar servindo a versão anterior até a nova ficar pronta
+            metricas.incrementar('cache_total', cache='planilhas', resultado='versao_anterior')
+            return entrada
+        if entrada is None:
+            lock.acquire()
+
+        try:
+            # Outra requisição pode ter processado enquanto esperávamos o lock
+            entrada = self._entradas.get(caminho)
+            assinatura = assinatura_arquivo(caminho)
+            if entrada is not None and entrada.assinatura == assinatura:
+                metricas.incrementar('cache_total', cache='planilhas', resultado='acerto')
+                return entrada
+
+            metricas.incrementar('cache_total', cache='planilhas', resultado='falha')
+            logger.info(f"🔄 Processando planilha (cache vazio ou desatualizado): {caminho}")
+            dados = carregar(caminho)
+            with metricas.etapa('serializacao'):
+                json_bytes = serializar(dados)
+            entrada = EntradaCache(caminho, assinatura, dados, json_bytes)
+            # Troca atômica: as requisições passam a receber a nova entrada já completa
+            self._entradas[caminho] = entrada
+            return entrada
+        finally:
+            lock.release()
+
+    def invalidar(self, caminho=None):
+        """Remove do cache um arquivo específico ou todas as entradas"""
+        with self._lock:
+            if caminho is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(os.path.abspath(caminho), None)
+
+
+# Instância única usada pelos endpoints
+cache_planilhas = CachePlanilhas()
@@ -0,0 +1,225 @@
+"""
+Versões das obras guardadas no banco SQLite local.
+
+O contador de versões, a versão de cada obra e o hash de cada linha da
+planilha mensal ficam no banco (o mesmo arquivo do banco_local), e não na
+memória do processo:
+
+    - Reiniciar o servidor não reinicia o contador: um cliente com since=N
+      continua recebendo só o que mudou depois de N
+    - Todos os workers do servidor de produção usam o mesmo contador
+    - Alterações feitas na planilha com o servidor parado são detectadas na
+      próxima carga, comparando o hash de cada linha com o último gravado
+    - A assinatura (mtime + tamanho) da planilha já comparada também fica
+      gravada: cada versão do arquivo é comparada uma única vez, mesmo que
+      vários workers a recarreguem
+    - As edições confirmadas e ainda não gravadas na planilha ficam em um
+      diário (obras_edicoes): todos os workers aplicam as edições uns dos
+      outros, e qualquer um deles grava o diário inteiro na planilha
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class EstadoObras:
+    """
+    Versões e hashes das linhas das planilhas de obras em um arquivo SQLite
+
+    Args:
+        caminho (str): Arquivo do banco (ex: uploads/banco_local.sqlite3)
+
+    Funcionalidade:
+        - Tabela obras_estado: contador de versões, assinatura da planilha já comparada,
+          base (incrementada a cada carga com alterações feitas fora do sistema) e a
+          última edição descartada do diário
+        - Tabela obras_versoes: versão, versão de inserção, remoção e hash de cada obra
+        - Tabela obras_edicoes: diário das edições {letra: valor} por linha do Excel, em ordem
+        - Alterações em transação IMMEDIATE: dois workers não usam a mesma versão
+        - Uma conexão por thread, em modo WAL (leituras não bloqueiam gravações)
+    """
+
+    def __init__(self, caminho):
+        self.caminho = os.path.abspath(caminho)
+        self._local = threading.local()
+
+        con = self.conexao()
+        con.execute(
+            'CREATE TABLE IF NOT EXISTS obras_estado ('
+            'planilha TEXT PRIMARY KEY, versao INTEGER, mtime_ns INTEGER, tamanho INTEGER, '
+            'base INTEGER, podada INTEGER)'
+        )
+        con.execute(
+            'CREATE TABLE IF NOT EXISTS obras_versoes ('
+            'planilha TEXT, obra_id INTEGER, versao INTEGER, inserida INTEGER, removida INTEGER, hash INTEGER, '
+            'PRIMARY KEY (planilha, obra_id))'
+        )
+        con.execute('CREATE INDEX IF NOT EXISTS idx_obras_versoes_versao ON obras_versoes (planilha, versao)')
+        con.execute(
+            'CREATE TABLE IF NOT EXISTS obras_edicoes ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, planilha TEXT, linha INTEGER, celulas TEXT, gravada INTEGER)'
+        )
+        con.execute('CREATE INDEX IF NOT EXISTS idx_obras_edicoes_planilha ON obras_edicoes (planilha, seq)')
+
+    def conexao(self):
+        """Conexão SQLite da thread atual"""
+        con = getattr(self._local, 'conexao', None)
+        # Conexões não podem ser reutilizadas após um fork (workers do servidor de produção)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = con
+            self._local.pid = os.getpid()
+        return con
+
+    @contextmanager
+    def transacao(self):
+        """Transação de escrita (BEGIN IMMEDIATE); desfeita se houver exceção; aninhada = a mesma transação"""
+        con = self.conexao()
+        if con.in_transaction:
+            yield con
+            return
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            yield con
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+        con.execute('COMMIT')
+
+    def estado(self, planilha):
+        """
+        Estado gravado da planilha
+
+        Returns:
+            dict: {'versao': contador, 'assinatura': (mtime_ns, tamanho) já comparada,
+                   'base': carga da planilha, 'podada': última edição descartada do diário}, ou None
+        """
+        linha = self.conexao().execute(
+            'SELECT versao, mtime_ns, tamanho, base, podada FROM obras_estado WHERE planilha = ?', (planilha,)
+        ).fetchone()
+        if linha is None:
+            return None
+        return {'versao': linha[0], 'assinatura': (linha[1], linha[2]), 'base': linha[3], 'podada': linha[4]}
+
+    def gravar_estado(self, planilha, estado):
+        """Grava o estado da planilha (dicionário no formato de estado())"""
+        self.conexao().execute(
+            'INSERT OR REPLACE INTO obras_estado VALUES (?, ?, ?, ?, ?, ?)',
+            (planilha, estado['versao'], *estado['assinatura'], estado['base'], estado['podada'])
+        )
+
+    def versoes_desde(self, planilha, versao):
+        """Obras com versão maior que a informada: (obra_id, versão, versão de inserção, removida)"""
+        return self.conexao().execute(
+            'SELECT obra_id, versao, inserida, removida FROM obras_versoes WHERE planilha = ? AND versao > ?',
+            (planilha, versao)
+        ).fetchall()
+
+    def hashes(self, planilha):
+        """Hash gravado de cada obra existente: {obra_id: (hash, versão de inserção)}"""
+        cursor = self.conexao().execute(
+            'SELECT obra_id, hash, inserida FROM obras_versoes WHERE planilha = ? AND NOT removida', (planilha,)
+        )
+        return {obra_id: (hash_linha, inserida) for obra_id, hash_linha, inserida in cursor}
+
+    def gravar_versoes(self, planilha, linhas):
+        """
+        Grava a versão das obras
+
+        Args:
+            linhas (iterable): Tuplas (obra_id, versão, versão de inserção, removida, hash)
+        """
+        self.conexao().executemany(
+            'INSERT OR REPLACE INTO obras_versoes VALUES (?, ?, ?, ?, ?, ?)',
+            ((planilha, *linha) for linha in linhas)
+        )
+
+    def registrar_edicoes(self, planilha, edicoes):
+        """
+        Acrescenta edições ao diário (dentro da transação que incrementa as versões)
+
+        Args:
+            edicoes (dict): {linha do Excel: {letra: valor}}
+
+        Returns:
+            int: Sequência da última edição registrada
+        """
+        con = self.conexao()
+        seq = None
+        for linha, celulas in sorted(edicoes.items()):
+            seq = con.execute(
+                'INSERT INTO obras_edicoes (planilha, linha, celulas, gravada) VALUES (?, ?, ?, 0)',
+                (planilha, linha, json.dumps(celulas, default=str))
+            ).lastrowid
+        return seq
+
+    def ultima_edicao(self, planilha):
+        """Sequência da última edição registrada da planilha (0 se nenhuma)"""
+        seq, = self.conexao().execute(
+            'SELECT MAX(seq) FROM obras_edicoes WHERE planilha = ?', (planilha,)
+        ).fetchone()
+        estado = self.estado(planilha)
+        return max(seq or 0, estado['podada'] if estado else 0)
+
+    def edicoes(self, planilha, desde=0, ate=None, pendentes=False):
+        """
+        Edições do diário, em ordem
+
+        Args:
+            desde (int): Apenas edições com sequência maior que esta
+            ate (int): Apenas edições com sequência até esta (opcional)
+            pendentes (bool): Apenas as que ainda não foram gravadas na planilha
+
+        Returns:
+            list: Tuplas (sequência, linha do Excel, {letra: valor})
+        """
+        consulta = 'SELECT seq, linha, celulas FROM obras_edicoes WHERE planilha = ? AND seq > ?'
+        parametros = [planilha, desde]
+        if ate is not None:
+            consulta += ' AND seq <= ?'
+            parametros.append(ate)
+        if pendentes:
+            consulta += ' AND NOT gravada'
+        cursor = self.conexao().execute(consulta + ' ORDER BY seq', parametros)
+        return [(seq, linha, json.loads(celulas)) for seq, linha, celulas in cursor]
+
+    def marcar_gravadas(self, planilha, ate):
+        """Marca as edições até a sequência informada como gravadas na planilha"""
+        self.conexao().execute(
+            'UPDATE obras_edicoes SET gravada = 1 WHERE planilha = ? AND seq <= ? AND NOT gravada', (planilha, ate)
+        )
+
+    def podar(self, planilha, manter):
+        """
+        Descarta as edições já gravadas, menos as `manter` mais recentes
+
+        Returns:
+            int: Maior sequência descartada (0 se nenhuma)
+        """
+        con = self.conexao()
+        ultima, = con.execute(
+            'SELECT MAX(seq) FROM obras_edicoes WHERE planilha = ? AND gravada', (planilha,)
+        ).fetchone()
+        if ultima is None or ultima <= manter:
+            return 0
+        corte = ultima - manter
+        con.execute('DELETE FROM obras_edicoes WHERE planilha = ? AND gravada AND seq <= ?', (planilha, corte))
+        return corte
+
+
+_estados = {}
+_lock_estados = threading.Lock()
+
+
+def obter_estado_obras(caminho):
+    """Retorna a instância única do estado das obras para o arquivo de banco informado"""
+    caminho = os.path.abspath(caminho)
+    with _lock_estados:
+        estado = _estados.get(caminho)
+        if estado is None:
+            estado = _estados[caminho] = EstadoObras(caminho)
+        return estado
@@ -0,0 +1,220 @@
+"""
+Armazenamento da programação do dia carregada pelo upload.
+
+A programação atual é guardada como uma sequência de versões (snapshots):
+cada upload ou alteração cria uma nova versão, e as últimas versões ficam
+disponíveis para consulta. Há duas implementações com a mesma interface:
+
+    - EstadoMemoria: dentro do processo (padrão, um único worker)
+    - EstadoSQLite: arquivo SQLite compartilhado, seguro com vários workers
+      (ex: gunicorn -w 4), pois todos os processos leem e gravam no mesmo banco
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Quantidade de versões anteriores mantidas
+VERSOES_MANTIDAS = 20
+
+
+class VersaoDesatualizada(Exception):
+    """A programação foi alterada por outra requisição desde a versão informada pelo cliente"""
+
+    def __init__(self, versao_atual):
+        super().__init__(f'A programação do dia foi alterada por outro usuário (versão atual: {versao_atual})')
+        self.versao_atual = versao_atual
+
+
+class EstadoMemoria:
+    """
+    Programação do dia mantida na memória do processo
+
+    Funcionalidade:
+        - Cada definir() cria uma nova versão imutável (a lista não é alterada depois)
+        - Leituras não bloqueiam: a versão atual é trocada de uma vez
+        - Mantém as últimas VERSOES_MANTIDAS versões
+    """
+
+    tipo = 'memoria'
+
+    def __init__(self, versoes_mantidas=VERSOES_MANTIDAS):
+        self._lock = threading.Lock()
+        self._versoes_mantidas = versoes_mantidas
+        self._snapshots = {}
+        self._atual = (0, [])
+
+    def obter(self, versao=None):
+        """
+        Retorna a programação atual ou uma versão anterior
+
+        Args:
+            versao (int): Versão desejada (padrão: a atual)
+
+        Returns:
+            tuple: (versão, lista de itens); (0, []) se nada foi carregado; None se a versão não existe mais
+        """
+        if versao is None:
+            return self._atual
+        if versao == 0:
+            return (0, [])
+        snapshot = self._snapshots.get(versao)
+        return (versao, snapshot[1]) if snapshot is not None else None
+
+    def definir(self, programacao, versao_esperada=None):
+        """
+        Substitui a programação atual, criando uma nova versão
+
+        Args:
+            programacao (list): Itens da programação
+            versao_esperada (int): Versão lida pelo cliente (opcional), para detectar conflito
+
+        Returns:
+            int: Nova versão
+
+        Raises:
+            VersaoDesatualizada: A programação mudou desde a versão informada
+        """
+        programacao = list(programacao)
+        with self._lock:
+            versao_atual = self._atual[0]
+            if versao_esperada is not None and int(versao_esperada) != versao_atual:
+                raise VersaoDesatualizada(versao_atual)
+
+            versao = versao_atual + 1
+            self._snapshots[versao] = (time.time(), programacao)
+            self._snapshots.pop(versao - self._versoes_mantidas, None)
+            self._atual = (versao, programacao)
+            return versao
+
+    def versoes(self):
+        """Versões disponíveis, com data de criação e total de itens (mais recente primeiro)"""
+        with self._lock:
+            snapshots = sorted(self._snapshots.items(), reverse=True)
+        return [
+            {'versao': versao, 'criadoEm': criado_em, 'total': len(programacao)}
+            for versao, (criado_em, programacao) in snapshots
+        ]
+
+
+class EstadoSQLite:
+    """
+    Programação do dia guardada em um arquivo SQLite compartilhado entre processos
+
+    Funcionalidade:
+        - Uma linha por versão (JSON dos itens); a versão atual é a de maior número
+        - Nova versão gravada em transação IMMEDIATE: dois workers não criam a mesma versão
+        - Uma conexão por thread, em modo WAL (leituras não bloqueiam gravações)
+        - Mantém as últimas VERSOES_MANTIDAS versões
+    """
+
+    tipo = 'sqlite'
+
+    def __init__(self, caminho, versoes_mantidas=VERSOES_MANTIDAS):
+        self.caminho = os.path.abspath(caminho)
+        self._versoes_mantidas = versoes_mantidas
+        self._local = threading.local()
+        self._cache = (None, None)
+
+        with self.conexao() as con:
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS programacao_dia_versoes ('
+                'versao INTEGER PRIMARY KEY, criado_em REAL, total INTEGER, dados TEXT)'
+            )
+
+    def conexao(self):
+        """Conexão SQLite da thread atual"""
+        con = getattr(self._local, 'conexao', None)
+        # Conexões não podem ser reutilizadas após um fork (workers do servidor de produção)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = con
+            self._local.pid = os.getpid()
+        return con
+
+    def _versao_atual(self, con):
+        return con.execute('SELECT COALESCE(MAX(versao), 0) FROM programacao_dia_versoes').fetchone()[0]
+
+    def obter(self, versao=None):
+        """
+        Retorna a programação atual ou uma versão anterior
+
+        Returns:
+            tuple: (versão, lista de itens); (0, []) se nada foi carregado; None se a versão não existe mais
+        """
+        con = self.conexao()
+        if versao is None:
+            versao = self._versao_atual(con)
+        if versao == 0:
+            return (0, [])
+
+        # A versão atual é decodificada uma única vez por processo
+        versao_cache, programacao = self._cache
+        if versao_cache == versao:
+            return (versao, programacao)
+
+        linha = con.execute('SELECT dados FROM programacao_dia_versoes WHERE versao = ?', (versao,)).fetchone()
+        if linha is None:
+            return None
+        programacao = json.loads(linha[0])
+        self._cache = (versao, programacao)
+        return (versao, programacao)
+
+    def definir(self, programacao, versao_esperada=None):
+        """
+        Substitui a programação atual, criando uma nova versão
+
+        Returns:
+            int: Nova versão
+
+        Raises:
+            VersaoDesatualizada: A programação mudou desde a versão informada
+        """
+        programacao = list(programacao)
+        dados = json.dumps(programacao, ensure_ascii=False)
+
+        con = self.conexao()
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            versao_atual = self._versao_atual(con)
+            if versao_esperada is not None and int(versao_esperada) != versao_atual:
+                raise VersaoDesatualizada(versao_atual)
+
+            versao = versao_atual + 1
+            con.execute(
+                'INSERT INTO programacao_dia_versoes VALUES (?, ?, ?, ?)',
+                (versao, time.time(), len(programacao), dados)
+            )
+            con.execute('DELETE FROM programacao_dia_versoes WHERE versao <= ?', (versao - self._versoes_mantidas,))
+            con.execute('COMMIT')
+        except Exception:
+            con.execute('ROLLBACK')
+            raise
+
+        self._cache = (versao, programacao)
+        return versao
+
+    def versoes(self):
+        """Versões disponíveis, com data de criação e total de itens (mais recente primeiro)"""
+        cursor = self.conexao().execute(
+            'SELECT versao, criado_em, total FROM programacao_dia_versoes ORDER BY versao DESC'
+        )
+        return [{'versao': versao, 'criadoEm': criado_em, 'total': total} for versao, criado_em, total in cursor]
+
+
+def criar_estado(tipo, caminho=None):
+    """
+    Cria o armazenamento da programação do dia
+
+    Args:
+        tipo (str): 'memoria' (padrão, um processo) ou 'sqlite' (vários workers)
+        caminho (str): Arquivo do banco, obrigatório para 'sqlite'
+    """
+    if tipo == 'memoria':
+        return EstadoMemoria()
+    if tipo == 'sqlite':
+        return EstadoSQLite(caminho)
+    raise ValueError(f"Armazenamento de programação desconhecido: {tipo} (use 'memoria' ou 'sqlite')")
@@ -0,0 +1,219 @@
+"""
+Leitura de planilhas (pd.read_excel) em processos auxiliares.
+
+A leitura do Excel ocupa a CPU e, dentro do processo do servidor, segura o
+GIL: enquanto uma planilha grande é lida, nem /api/login responde. Aqui a
+leitura roda em um ProcessPoolExecutor com poucos processos, e o servidor só
+recebe o DataFrame pronto.
+
+Pedidos simultâneos para o mesmo arquivo (mesmo caminho, mesma versão em
+disco e mesmas opções) compartilham uma única leitura em andamento.
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from cache_planilhas import assinatura_arquivo
+
+logger = logging.getLogger(__name__)
+
+# Processos auxiliares de leitura (0 = ler no próprio processo do servidor)
+PROCESSOS_LEITURA = 2
+
+# Tempo máximo de espera por uma leitura (segundos)
+TEMPO_MAXIMO_LEITURA = 120
+
+
+class TempoEsgotadoLeitura(Exception):
+    """A leitura da planilha não terminou dentro do tempo máximo (ou não pôde começar); tentar após tentar_apos segundos"""
+
+    def __init__(self, mensagem, tentar_apos=5):
+        super().__init__(mensagem)
+        self.tentar_apos = tentar_apos
+
+
+def _ler_excel(origem, opcoes):
+    """Executado no processo auxiliar: lê a planilha (caminho ou conteúdo em bytes)"""
+    if isinstance(origem, bytes):
+        origem = io.BytesIO(origem)
+    return pd.read_excel(origem, **opcoes)
+
+
+class ExecutorPlanilhas:
+    """
+    Executor de leituras de planilhas em processos auxiliares
+
+    Funcionalidade:
+        - Pool limitado de processos, criado no primeiro uso (e recriado após um fork
+          ou se um processo auxiliar morrer)
+        - Processos iniciados com "spawn": não herdam locks nem threads do servidor
+        - Leituras idênticas em andamento são compartilhadas (uma única leitura)
+        - Tempo máximo de espera por leitura; a leitura continua e pode ser aproveitada
+          por pedidos seguintes
+        - Métricas: leituras em andamento, requisições aguardando, compartilhamentos,
+          tempos esgotados e duração das leituras
+    """
+
+    def __init__(self, processos=PROCESSOS_LEITURA, tempo_maximo=TEMPO_MAXIMO_LEITURA):
+        self.processos = processos
+        self.tempo_maximo = tempo_maximo
+        # RLock: o callback de conclusão pode rodar na própria thread que submeteu a leitura
+        self._lock = threading.RLock()
+        self._executor = None
+        self._pid = None
+        self._em_andamento = {}
+        self._aguardando = 0
+        self._metricas = {
+            'leituras': 0,
+            'compartilhadas': 0,
+            'tempoEsgotado': 0,
+            'erros': 0,
+            'duracaoTotal': 0.0,
+            'ultimaDuracao': None,
+        }
+
+    def configurar(self, processos=None, tempo_maximo=None):
+        """Altera a quantidade de processos e o tempo máximo (o pool é recriado se necessário)"""
+        with self._lock:
+            if tempo_maximo is not None:
+                self.tempo_maximo = tempo_maximo
+            if processos is not None and processos != self.processos:
+                self.processos = processos
+                self._encerrar_pool()
+
+    def _encerrar_pool(self, aguardar=False):
+        """Encerra o pool atual; chamar com o lock"""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=aguardar, cancel_futures=True)
+        self._executor = None
+
+    def encerrar(self):
+        """
+        Encerra os processos auxiliares e aguarda o fim deles (são recriados no próximo uso)
+
+        Funcionalidade:
+            - Usado antes do fork dos workers: um processo auxiliar ainda vivo seria
+              herdado pelos workers, que não podem aguardá-lo (não é filho deles)
+        """
+        with self._lock:
+            self._encerrar_pool(aguardar=True)
+
+    def _pool(self):
+        """Pool de processos do processo atual; chamar com o lock"""
+        if self._pid != os.getpid():
+            # Após um fork, o pool e as leituras em andamento pertencem ao processo pai
+            self._executor = None
+            self._em_andamento = {}
+            self._aguardando = 0
+            self._pid = os.getpid()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processos, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    @staticmethod
+    def _chave(origem, opcoes):
+        """Identifica leituras idênticas: arquivo + versão em disco (ou hash do conteúdo) + opções"""
+        if isinstance(origem, bytes):
+            identificacao = ('bytes', hashlib.sha1(origem).hexdigest())
+        else:
+            caminho = os.path.abspath(origem)
+            identificacao = (caminho, assinatura_arquivo(caminho))
+        return identificacao + (repr(sorted(opcoes.items())),)
+
+    def ler_excel(self, origem, **opcoes):
+        """
+        Lê uma planilha com pd.read_excel em um processo auxiliar
+
+        Args:
+            origem: Caminho do arquivo, bytes ou arquivo em memória (ex: io.BytesIO)
+            **opcoes: Parâmetros do pd.read_excel (ex: header=0, usecols=...)
+
+        Returns:
+            DataFrame: Planilha lida
+
+        Raises:
+            TempoEsgotadoLeitura: A leitura não terminou dentro de tempo_maximo
+        """
+        if hasattr(origem, 'read'):
+            origem = origem.read()
+        if not self.processos:
+            return _ler_excel(origem, opcoes)
+
+        chave = self._chave(origem, opcoes)
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                self._metricas['compartilhadas'] += 1
+            else:
+                futuro = self._submeter(chave, origem, opcoes)
+            self._aguardando += 1
+            tempo_maximo = self.tempo_maximo
+
+        try:
+            return futuro.result(timeout=tempo_maximo)
+        except FuturesTimeoutError:
+            with self._lock:
+                self._metricas['tempoEsgotado'] += 1
+            raise TempoEsgotadoLeitura(
+                f'A leitura da planilha não terminou em {tempo_maximo:g}s; tente novamente em instantes'
+            )
+        except BrokenProcessPool:
+            # Processo auxiliar morreu (ex: falta de memória): recriar o pool e ler no próprio processo
+            with self._lock:
+                self._metricas['erros'] += 1
+                self._executor = None
+            logger.warning("⚠️ Processo de leitura de planilhas encerrado inesperadamente; lendo no processo do servidor")
+            return _ler_excel(origem, opcoes)
+        finally:
+            with self._lock:
+                self._aguardando -= 1
+
+    def _submeter(self, chave, origem, opcoes):
+        """Envia a leitura ao pool e registra as métricas ao terminar; chamar com o lock"""
+        inicio = time.perf_counter()
+        futuro = self._pool().submit(_ler_excel, origem, opcoes)
+        self._em_andamento[chave] = futuro
+
+        def concluir(futuro_concluido):
+            duracao = time.perf_counter() - inicio
+            with self._lock:
+                if self._em_andamento.get(chave) is futuro_concluido:
+                    del self._em_andamento[chave]
+                self._metricas['leituras'] += 1
+                self._metricas['duracaoTotal'] += duracao
+                self._metricas['ultimaDuracao'] = duracao
+                if not futuro_concluido.cancelled() and futuro_concluido.exception() is not None:
+                    self._metricas['erros'] += 1
+
+        futuro.add_done_callback(concluir)
+        return futuro
+
+    def status(self):
+        """Métricas do executor (fila, compartilhamentos, tempos esgotados e duração das leituras)"""
+        with self._lock:
+            metricas = dict(self._metricas)
+            leituras = metricas.pop('leituras')
+            duracao_total = metricas.pop('duracaoTotal')
+            return {
+                'processos': self.processos,
+                'tempoMaximo': self.tempo_maximo,
+                'emAndamento': len(self._em_andamento),
+                'aguardando': self._aguardando,
+                'leituras': leituras,
+                'duracaoMedia': duracao_total / leituras if leituras else None,
+                **metricas,
+            }
+
+
+# Instância única usada pelo servidor
+executor_planilhas = ExecutorPlanilhas()
@@ -0,0 +1,166 @@
+"""
+Exportação de obras e do MainBD para XLSX ou CSV com memória constante.
+
+As linhas chegam de um iterador (índice de obras ou consulta em blocos ao
+banco local) e são escritas à medida que são lidas, sem montar a lista
+completa nem a planilha inteira em memória:
+
+    - CSV: cada bloco de linhas vira uma parte da resposta HTTP (chunked)
+    - XLSX: openpyxl em modo write_only (as linhas vão para arquivos temporários
+      em disco) com estilos nomeados; o arquivo pronto é enviado em partes
+"""
+import csv
+import io
+import math
+import tempfile
+from datetime import date, datetime
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+FORMATOS = ('xlsx', 'csv')
+
+MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Tamanho das partes enviadas na resposta
+TAMANHO_PARTE = 64 * 1024
+
+# Linhas do CSV acumuladas antes de enviar uma parte
+LINHAS_POR_PARTE_CSV = 1000
+
+# Largura máxima das colunas do XLSX (caracteres)
+LARGURA_MAXIMA = 50
+
+
+def _estilos():
+    """Estilos nomeados das planilhas exportadas (registrados uma vez por arquivo)"""
+    borda = Border(**{lado: Side(style='thin', color='D9D9D9') for lado in ('left', 'right', 'top', 'bottom')})
+    cabecalho = NamedStyle(
+        name='mariua_cabecalho',
+        font=Font(bold=True, color='FFFFFF'),
+        fill=PatternFill('solid', fgColor='1F4E78'),
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+        border=borda,
+    )
+    texto = NamedStyle(name='mariua_texto', border=borda, alignment=Alignment(vertical='top'))
+    inteiro = NamedStyle(name='mariua_inteiro', border=borda, number_format='#,##0')
+    decimal = NamedStyle(name='mariua_decimal', border=borda, number_format='#,##0.00')
+    data = NamedStyle(name='mariua_data', border=borda, number_format='DD/MM/YYYY',
+                      alignment=Alignment(horizontal='center'))
+    return [cabecalho, texto, inteiro, decimal, data]
+
+
+def _valor(valor):
+    """Valor exportável: nulos e NaN viram vazio; tipos do numpy viram tipos do Python"""
+    if valor is None:
+        return None
+    if hasattr(valor, 'item') and not isinstance(valor, (str, bytes)):
+        valor = valor.item()
+    if isinstance(valor, float) and (math.isnan(valor) or math.isinf(valor)):
+        return None
+    return valor
+
+
+def _estilo_do_valor(valor):
+    if isinstance(valor, bool):
+        return 'mariua_texto'
+    if isinstance(valor, int):
+        return 'mariua_inteiro'
+    if isinstance(valor, float):
+        return 'mariua_decimal'
+    if isinstance(valor, (datetime, date)):
+        return 'mariua_data'
+    return 'mariua_texto'
+
+
+def gravar_xlsx(destino, titulo, colunas, linhas, larguras=None):
+    """
+    Grava uma planilha formatada em modo write_only
+
+    Args:
+        destino: Caminho ou arquivo binário aberto
+        titulo (str): Nome da aba
+        colunas (list): Títulos das colunas
+        linhas (iterable): Tuplas de valores, na ordem das colunas
+        larguras (list): Largura de cada coluna (padrão: pelo tamanho do título)
+
+    Returns:
+        int: Número de linhas gravadas (sem o cabeçalho)
+    """
+    wb = Workbook(write_only=True)
+    for estilo in _estilos():
+        wb.add_named_style(estilo)
+    ws = wb.create_sheet(title=str(titulo)[:31])
+    ws.freeze_panes = 'A2'
+    for posicao, coluna in enumerate(colunas, start=1):
+        largura = larguras[posicao - 1] if larguras else len(str(coluna)) + 4
+        ws.column_dimensions[get_column_letter(posicao)].width = min(max(largura, 10), LARGURA_MAXIMA)
+
+    # Um modelo por estilo: as células copiam a referência ao estilo em vez de procurá-lo pelo nome
+    modelos = {}
+    for estilo in wb.named_styles:
+        modelo = WriteOnlyCell(ws)
+        modelo.style = estilo
+        modelos[estilo] = modelo._style
+
+    def celula(valor, estilo):
+        return Cell(ws, value=valor, style_array=modelos[estilo])
+
+    ws.append([celula(str(coluna), 'mariua_cabecalho') for coluna in colunas])
+    total = 0
+    for linha in linhas:
+        valores = [_valor(valor) for valor in linha]
+        ws.append([celula(valor, _estilo_do_valor(valor)) for valor in valores])
+        total += 1
+    wb.save(destino)
+    return total
+
+
+def partes_xlsx(titulo, colunas, linhas, larguras=None):
+    """
+    Gera a planilha XLSX em partes de bytes
+
+    Funcionalidade:
+        - As linhas são escritas em arquivos temporários (write_only), não em memória
+        - O arquivo final também fica em disco e é lido em partes de TAMANHO_PARTE
+    """
+    with tempfile.TemporaryFile() as arquivo:
+        gravar_xlsx(arquivo, titulo, colunas, linhas, larguras)
+        arquivo.seek(0)
+        while True:
+            parte = arquivo.read(TAMANHO_PARTE)
+            if not parte:
+                break
+            yield parte
+
+
+def partes_csv(colunas, linhas):
+    """
+    Gera o CSV (UTF-8 com BOM, para o Excel reconhecer a codificação) em partes de bytes
+
+    Args:
+        colunas (list): Títulos das colunas
+        linhas (iterable): Tuplas de valores, na ordem das colunas
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(colunas)
+    for numero, linha in enumerate(linhas, start=1):
+        escritor.writerow(['' if valor is None else valor for valor in map(_valor, linha)])
+        if numero % LINHAS_POR_PARTE_CSV == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def linhas_de_blocos(blocos):
+    """Tuplas de valores de um iterador de DataFrames (ex: BancoLocal.consultar com blocos)"""
+    for df in blocos:
+        yield from df.itertuples(index=False, name=None)
@@ -0,0 +1,146 @@
+"""
+Índice espacial das obras com coordenadas e agrupamento por nível de zoom.
+
+As obras ficam em uma grade regular sobre a área ocupada por elas (poucas
+obras por célula, ordenadas pela chave da célula). Uma consulta por área do
+mapa (bbox) percorre apenas as faixas de células que cruzam a área, com busca
+binária em cada faixa, em vez de testar todas as obras.
+
+Para o agrupamento (clusters), a posição de cada obra é convertida uma única
+vez para coordenadas inteiras de Web Mercator no nível mais detalhado; a
+célula de agrupamento em qualquer zoom é obtida por deslocamento de bits.
+"""
+import math
+
+import numpy as np
+
+# Zoom máximo dos mapas (Leaflet/OSM)
+ZOOM_MAXIMO = 18
+
+# Células de agrupamento: 2^BITS_CELULA por lado de cada tile (tile de 256 px -> células de 64 px)
+BITS_CELULA = 2
+
+# Nível das coordenadas inteiras de Web Mercator (células de agrupamento do zoom máximo)
+NIVEL_BASE = ZOOM_MAXIMO + BITS_CELULA
+
+# Média desejada de obras por célula da grade de consulta
+OBRAS_POR_CELULA = 8
+
+# Latitude limite da projeção Web Mercator
+LATITUDE_MAXIMA = 85.05112878
+
+
+def mercator(latitudes, longitudes, nivel):
+    """
+    Coordenadas inteiras de Web Mercator (x, y) em uma grade de 2^nivel por lado
+
+    Args:
+        latitudes (ndarray): Latitudes em graus
+        longitudes (ndarray): Longitudes em graus
+        nivel (int): Nível da grade
+
+    Returns:
+        tuple: (x, y) como arrays int64
+    """
+    lado = 1 << nivel
+    latitudes = np.radians(np.clip(latitudes, -LATITUDE_MAXIMA, LATITUDE_MAXIMA))
+    x = (np.asarray(longitudes, dtype=float) + 180.0) / 360.0 * lado
+    y = (1.0 - np.log(np.tan(latitudes) + 1.0 / np.cos(latitudes)) / math.pi) / 2.0 * lado
+    return (np.clip(x, 0, lado - 1).astype(np.int64), np.clip(y, 0, lado - 1).astype(np.int64))
+
+
+def bbox_do_tile(zoom, x, y):
+    """
+    Área (min_lng, min_lat, max_lng, max_lat) de um tile z/x/y do mapa
+
+    Raises:
+        ValueError: Tile fora da grade do zoom informado
+    """
+    lado = 1 << zoom
+    if not (0 <= zoom <= ZOOM_MAXIMO and 0 <= x < lado and 0 <= y < lado):
+        raise ValueError(f'tile {zoom}/{x}/{y} inválido')
+
+    def latitude(linha):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * linha / lado))))
+
+    return (x / lado * 360.0 - 180.0, latitude(y + 1), (x + 1) / lado * 360.0 - 180.0, latitude(y))
+
+
+class GradeGeo:
+    """
+    Grade de consulta por área e coordenadas de agrupamento das obras com coordenadas
+
+    Args:
+        latitudes (ndarray): Latitude de cada obra com coordenadas
+        longitudes (ndarray): Longitude de cada obra com coordenadas
+
+    Funcionalidade:
+        - consultar(bbox): obras dentro da área (índices nestes arrays, em ordem crescente)
+        - celulas(indices, zoom): chave da célula de agrupamento de cada obra no zoom
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        total = len(self.latitudes)
+
+        self.lados = max(1, math.ceil(math.sqrt(total / OBRAS_POR_CELULA)))
+        if total:
+            self._min_lat, self._min_lng = float(self.latitudes.min()), float(self.longitudes.min())
+            self._passo_lat = (float(self.latitudes.max()) - self._min_lat) / self.lados or 1.0
+            self._passo_lng = (float(self.longitudes.max()) - self._min_lng) / self.lados or 1.0
+        else:
+            self._min_lat = self._min_lng = 0.0
+            self._passo_lat = self._passo_lng = 1.0
+
+        linhas = self._linha(self.latitudes)
+        colunas = self._coluna(self.longitudes)
+        chaves = linhas * self.lados + colunas
+        self._ordem = np.argsort(chaves, kind='stable')
+        self._chaves = chaves[self._ordem]
+
+        self._x, self._y = mercator(self.latitudes, self.longitudes, NIVEL_BASE)
+
+    def _linha(self, latitudes):
+        linhas = np.floor((np.asarray(latitudes, dtype=float) - self._min_lat) / self._passo_lat)
+        return np.clip(linhas, 0, self.lados - 1).astype(np.int64)
+
+    def _coluna(self, longitudes):
+        colunas = np.floor((np.asarray(longitudes, dtype=float) - self._min_lng) / self._passo_lng)
+        return np.clip(colunas, 0, self.lados - 1).astype(np.int64)
+
+    def consultar(self, bbox):
+        """
+        Obras dentro da área (limites inclusivos)
+
+        Args:
+            bbox (tuple): (min_lng, min_lat, max_lng, max_lat)
+
+        Returns:
+            ndarray: Índices das obras (nos arrays de latitude/longitude), em ordem crescente
+        """
+        min_lng, min_lat, max_lng, max_lat = bbox
+        if not len(self.latitudes) or min_lng > max_lng or min_lat > max_lat:
+            return np.array([], dtype=np.int64)
+
+        primeira, ultima = self._linha([min_lat, max_lat])
+        coluna_inicial, coluna_final = self._coluna([min_lng, max_lng])
+        faixas = np.arange(primeira, ultima + 1) * self.lados
+        inicios = np.searchsorted(self._chaves, faixas + coluna_inicial, side='left')
+        fins = np.searchsorted(self._chaves, faixas + coluna_final, side='right')
+        candidatos = np.concatenate(
+            [self._ordem[inicio:fim] for inicio, fim in zip(inicios, fins)] or [np.array([], dtype=np.int64)]
+        )
+
+        latitudes, longitudes = self.latitudes[candidatos], self.longitudes[candidatos]
+        dentro = (
+            (longitudes >= min_lng) & (longitudes <= max_lng)
+            & (latitudes >= min_lat) & (latitudes <= max_lat)
+        )
+        return np.sort(candidatos[dentro])
+
+    def celulas(self, indices, zoom):
+        """Chave da célula de agrupamento de cada obra (índices) no zoom informado"""
+        nivel = min(zoom, ZOOM_MAXIMO) + BITS_CELULA
+        deslocamento = NIVEL_BASE - nivel
+        return ((self._y[indices] >> deslocamento) << nivel) | (self._x[indices] >> deslocamento)
@@ -0,0 +1,309 @@
+"""
+Cálculo dos indicadores (KPIs) dos dashboards a partir do MainBD.
+
+As regras são as mesmas de frontend/src/utils/chartUtils.js, mas aplicadas
+com operações vetorizadas do pandas no backend, de modo que o navegador
+recebe apenas as séries agregadas em vez de todas as linhas do MainBD.
+"""
+import pandas as pd
+
+# Metas de postes definidas pela coordenação
+META_POSTES_SEMANA = 15
+META_POSTES_MES = 50
+
+# Equipes de retroescavadeira consideradas no KPI "cavas por retro"
+EQUIPES_RETRO_KPI = ['WESLEI-IRC', 'MENEZES-IRC', 'VAGNO-IRC', 'OSIMAR-JAC', 'TIAGO-JAC', 'JOAO-JAC']
+
+# Equipes do gráfico "cavas por operador" (mesma grafia usada no frontend)
+EQUIPES_RETRO_OPERADOR = ['JOAO-JAC', 'OSIMAR-JAC', 'VAGNO-IRC', 'TIAGO-JAC', 'WESLEY-IRC', 'MENEZES-IRC']
+
+# Equipes responsáveis pela ligação de clientes
+EQUIPES_LIGACAO = ['WASHINGTON-IRC', 'JENILSON-JAC']
+
+# Supervisores da base de Jacobina (os demais são de Irecê)
+SUPERVISORES_JACOBINA = ['ETEMILSON OLIVEIRA', 'GILVANDO RIOS']
+
+
+def _texto(df, coluna):
+    """Retorna a coluna como texto (vazio quando ausente ou nula)"""
+    if coluna not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[coluna].where(df[coluna].notna(), '').astype(str)
+
+
+def _numero(df, coluna):
+    """Retorna a coluna como número (0 quando ausente ou inválida), como o parseFloat || 0 do frontend"""
+    if coluna not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[coluna], errors='coerce').fillna(0.0)
+
+
+def normalizar(df):
+    """
+    Converte as colunas do MainBD usadas pelos indicadores (sem as regras de atividade)
+
+    Args:
+        df (DataFrame): MainBD como retornado por carregar_mainbd
+
+    Returns:
+        DataFrame: data, equipe, supervisor, atividade, qtd, ssot, ar, energizada,
+                   faturamento e clientes, uma linha por linha do MainBD
+    """
+    clientes_lig = pd.to_numeric(df['clientes_lig'], errors='coerce') if 'clientes_lig' in df.columns else None
+
+    base = pd.DataFrame({
+        'data': pd.to_datetime(df['data_serv'], errors='coerce') if 'data_serv' in df.columns else pd.NaT,
+        'equipe': _texto(df, 'des_equipe'),
+        'supervisor': _texto(df, 'Supervisor'),
+        'atividade': _texto(df, 'des_atividade'),
+        'qtd': _numero(df, 'qtd_atividade'),
+        'ssot': df['SS/OT'] if 'SS/OT' in df.columns else None,
+        'ar': _texto(df, 'ar_coelba').replace('', 'Sem AR'),
+        'energizada': _texto(df, 'data_energ') != '',
+        'faturamento': _numero(df, 'valor_projeto') + _numero(df, 'valor_mao'),
+    }, index=df.index)
+
+    # clientes_lig tem prioridade; na ausência (ou zero) usa a coluna clientes
+    clientes = _numero(df, 'clientes')
+    if clientes_lig is not None:
+        clientes = clientes_lig.where(clientes_lig.fillna(0) != 0, clientes).fillna(0.0)
+    base['clientes'] = clientes
+    return base
+
+
+def classificar(base):
+    """
+    Acrescenta as máscaras das regras de atividade, a base (Jacobina/Irecê) e o mês
+
+    Args:
+        base (DataFrame): Linhas com data, equipe, supervisor e atividade (normalizar() ou agregados diários)
+
+    Funcionalidade:
+        - Máscaras de POSTE (AT/BT) e CAVA/ESCAVAÇÃO; a de cava exclui "ESCAVAÇÃO PARA ESTAI"
+        - Calculadas uma vez por atividade distinta (poucas), não por linha
+    """
+    atividades = pd.Series(base['atividade'].unique())
+    atividade_upper = atividades.str.upper()
+    regras = pd.DataFrame({
+        'atividade': atividades,
+        'poste': atividades.isin(['POSTE AT', 'POSTE BT']),
+        'cava': (
+            (atividade_upper.str.contains('CAVA', regex=False) | atividade_upper.str.contains('ESCAVAÇÃO', regex=False))
+            & ~atividade_upper.str.contains('ESCAVAÇÃO PARA ESTAI', regex=False)
+        ),
+        'cava_normal': atividade_upper.str.contains('CAVA NORMAL', regex=False),
+        'cava_rocha': atividade_upper.str.contains('ROCHA', regex=False),
+        'cava_rompedor': atividade_upper.str.contains('ROMPEDOR', regex=False),
+        'ligacao': atividade_upper == 'LIGAÇÃO DE CLIENTE',
+    })
+    regras['cava_sem_estai'] = regras['cava'] & ~atividade_upper.str.contains('ESTAI|ESTAÍ')
+    posicao = pd.Index(atividades).get_indexer(base['atividade'])
+
+    base = base.copy()
+    for coluna in ('poste', 'cava', 'cava_sem_estai', 'cava_normal', 'cava_rocha', 'cava_rompedor'):
+        base[coluna] = regras[coluna].to_numpy()[posicao]
+    base['ligacao_cliente'] = regras['ligacao'].to_numpy()[posicao] & base['equipe'].isin(EQUIPES_LIGACAO)
+    base['base'] = base['supervisor'].isin(SUPERVISORES_JACOBINA).map({True: 'JACOBINA', False: 'IRECÊ'})
+    base['mes'] = base['data'].dt.to_period('M')
+    return base
+
+
+def preparar(df):
+    """
+    Normaliza as colunas do MainBD usadas pelos indicadores
+
+    Args:
+        df (DataFrame): MainBD como retornado por carregar_mainbd
+
+    Returns:
+        DataFrame: Colunas normalizadas e máscaras das regras de atividade
+
+    Funcionalidade:
+        - Converte data_serv para datetime e qtd_atividade/valores para número
+        - Calcula uma única vez as máscaras de POSTE (AT/BT) e CAVA/ESCAVAÇÃO
+        - A máscara de cava exclui "ESCAVAÇÃO PARA ESTAI"
+    """
+    return classificar(normalizar(df))
+
+
+def _serie(valores):
+    """Converte uma Series agregada em [{'label', 'value'}] ordenada de forma decrescente"""
+    valores = valores.sort_values(ascending=False, kind='stable')
+    return [{'label': str(label), 'value': valor} for label, valor in zip(valores.index, valores.tolist())]
+
+
+def _soma_por(base, mascara, coluna):
+    filtrado = base.loc[mascara & (base[coluna] != '')]
+    return filtrado.groupby(coluna, sort=False)['qtd'].sum()
+
+
+def calcular_variacao(atual, anterior):
+    """Variação percentual entre dois valores (0 quando não há valor anterior)"""
+    if not anterior:
+        return 0.0
+    return (atual - anterior) / anterior * 100
+
+
+def calcular_kpis(base, obras=None):
+    """
+    Calcula os KPIs principais (equivalente ao processMainBDData do frontend)
+
+    Args:
+        base (DataFrame): MainBD normalizado por preparar() ou agregados diários
+        obras (DataFrame): Linhas com ssot e energizada para as contagens de obras distintas
+                           (padrão: a própria base, quando ela tem uma linha por linha do MainBD)
+
+    Returns:
+        dict: postes, cavas, clientes, obras, faturamento, cavas por retro e médias por equipe
+    """
+    if obras is None:
+        obras = base
+    postes = float(base.loc[base['poste'], 'qtd'].sum())
+    cavas = float(base.loc[base['cava'], 'qtd'].sum())
+    clientes = float(base.loc[base['equipe'].isin(EQUIPES_LIGACAO), 'clientes'].sum())
+    obras_energizadas = int(obras.loc[obras['energizada'], 'ssot'].dropna().nunique())
+    total_obras = int(obras['ssot'].dropna().nunique())
+    faturamento = float(base['faturamento'].sum())
+    cavas_por_retro = float(base.loc[base['cava'] & base['equipe'].isin(EQUIPES_RETRO_KPI), 'qtd'].sum())
+    total_equipes = int(base.loc[base['equipe'] != '', 'equipe'].nunique())
+
+    return {
+        'postes': postes,
+        'cavas': cavas,
+        'clientes': clientes,
+        'obrasEnergizadas': obras_energizadas,
+        'totalObras': total_obras,
+        'faturamento': faturamento,
+        'cavasPorRetro': cavas_por_retro,
+        'mediaPostesPorEquipe': postes / total_equipes if total_equipes else 0,
+        'mediaCavasPorEquipe': cavas / total_equipes if total_equipes else 0,
+        'totalEquipes': total_equipes,
+    }
+
+
+def mes_referencia(base, mes=None):
+    """
+    Define o mês de referência para a comparação com o mês anterior
+
+    Args:
+        base (DataFrame): MainBD normalizado
+        mes (str): Mês no formato YYYY-MM (opcional)
+
+    Returns:
+        Period: Mês informado ou o mês mais recente com data_serv no MainBD
+    """
+    if mes:
+        return pd.Period(mes, freq='M')
+    ultimo = base['mes'].max()
+    if pd.isna(ultimo):
+        return pd.Timestamp.now().to_period('M')
+    return ultimo
+
+
+def resumo_kpis(base, mes=None, obras=None):
+    """
+    KPIs do período total, do mês de referência e do mês anterior, com variações
+
+    Args:
+        base (DataFrame): MainBD normalizado ou agregados diários
+        mes (str): Mês de referência YYYY-MM (padrão: o mais recente)
+        obras (DataFrame): Linhas com ssot, energizada e mes (padrão: a própria base)
+
+    Returns:
+        dict: {'mes', 'total', 'mesAtual', 'mesAnterior', 'variacao'}
+    """
+    if obras is None:
+        obras = base
+    referencia = mes_referencia(base, mes)
+    atual = calcular_kpis(base.loc[base['mes'] == referencia], obras.loc[obras['mes'] == referencia])
+    anterior = calcular_kpis(base.loc[base['mes'] == referencia - 1], obras.loc[obras['mes'] == referencia - 1])
+
+    taxa_atual = atual['obrasEnergizadas'] / atual['totalObras'] * 100 if atual['totalObras'] else 0
+    taxa_anterior = anterior['obrasEnergizadas'] / anterior['totalObras'] * 100 if anterior['totalObras'] else 0
+
+    variacao = {
+        chave: calcular_variacao(atual[chave], anterior[chave])
+        for chave in ('postes', 'cavas', 'clientes', 'obrasEnergizadas', 'faturamento',
+                      'cavasPorRetro', 'mediaPostesPorEquipe', 'mediaCavasPorEquipe')
+    }
+    variacao['taxaEnergizacao'] = calcular_variacao(taxa_atual, taxa_anterior)
+
+    return {
+        'mes': str(referencia),
+        'total': calcular_kpis(base, obras),
+        'mesAtual': atual,
+        'mesAnterior': anterior,
+        'variacao': variacao,
+    }
+
+
+def indicadores_postes(base, mes=None):
+    """Postes por equipe, supervisor, base e mês, com o progresso das metas semanal e mensal"""
+    postes = base.loc[base['poste']]
+    referencia = mes_referencia(base, mes)
+
+    por_mes = postes.dropna(subset=['mes']).groupby('mes')['qtd'].sum().sort_index()
+
+    ultima_data = postes['data'].max()
+    semana = 0.0
+    if pd.notna(ultima_data):
+        inicio_semana = ultima_data.normalize() - pd.Timedelta(days=ultima_data.weekday())
+        semana = float(postes.loc[(postes['data'] >= inicio_semana) & (postes['data'] <= ultima_data), 'qtd'].sum())
+    total_mes = float(postes.loc[postes['mes'] == referencia, 'qtd'].sum())
+
+    return {
+        'porEquipe': _serie(_soma_por(base, base['poste'], 'equipe')),
+        'porSupervisor': _serie(_soma_por(base, base['poste'], 'supervisor')),
+        'porBase': _serie(postes.groupby('base', sort=False)['qtd'].sum()),
+        'porMes': [{'label': str(periodo), 'value': float(valor)} for periodo, valor in por_mes.items()],
+        'metas': {
+            'semana': {'realizado': semana, 'meta': META_POSTES_SEMANA,
+                       'percentual': semana / META_POSTES_SEMANA * 100},
+            'mes': {'realizado': total_mes, 'meta': META_POSTES_MES,
+                    'percentual': total_mes / META_POSTES_MES * 100},
+        },
+    }
+
+
+def indicadores_cavas(base, normal=False, rocha=False, rompedor=False):
+    """Cavas por equipe (com filtros de tipo de cava) e por operador de retro"""
+    mascara = base['cava']
+    if normal or rocha or rompedor:
+        tipo = pd.Series(False, index=base.index)
+        if normal:
+            tipo |= base['cava_normal']
+        if rocha:
+            tipo |= base['cava_rocha']
+        if rompedor:
+            tipo |= base['cava_rompedor']
+        mascara = mascara & tipo
+
+    operador = base['cava_sem_estai'] & base['equipe'].isin(EQUIPES_RETRO_OPERADOR)
+    return {
+        'porEquipe': _serie(_soma_por(base, mascara, 'equipe')),
+        'porOperador': _serie(_soma_por(base, operador, 'equipe')),
+    }
+
+
+def indicadores_clientes(base):
+    """Clientes ligados por equipe de ligação (ambas as equipes sempre aparecem)"""
+    por_equipe = _soma_por(base, base['ligacao_cliente'], 'equipe')
+    por_equipe = por_equipe.reindex(por_equipe.index.union(EQUIPES_LIGACAO, sort=False), fill_value=0.0)
+    return {'porEquipe': _serie(por_equipe)}
+
+
+def indicadores_obras(base):
+    """Obras (SS/OT únicos) por AR COELBA e energizadas vs não energizadas"""
+    com_ssot = base.dropna(subset=['ssot'])
+    com_ssot = com_ssot.loc[com_ssot['ssot'].astype(str) != '']
+    por_ar = com_ssot.groupby('ar', sort=False)['ssot'].nunique()
+
+    total = int(com_ssot['ssot'].nunique())
+    energizadas = int(com_ssot.loc[com_ssot['energizada'], 'ssot'].nunique())
+    return {
+        'porAR': _serie(por_ar),
+        'energizacao': [
+            {'label': 'Energizadas', 'value': energizadas},
+            {'label': 'Não Energizadas', 'value': total - energizadas},
+        ],
+    }
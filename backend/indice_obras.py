@@ -0,0 +1,206 @@
+"""
+Índices em memória sobre a lista de obras processadas.
+
+Os índices são montados uma vez por versão da planilha (e por dia, já que o
+status depende da data atual). Filtros por status, supervisor, encarregado,
+localidade, critério, período de início e área do mapa passam a combinar
+listas de posições já calculadas, sem percorrer todas as obras.
+"""
+import numpy as np
+
+from grade_geo import GradeGeo
+from registro_obras import codificar
+
+# Campos categóricos indexados: parâmetro da URL -> chave da obra
+CAMPOS_INDEXADOS = {
+    'status': 'status',
+    'supervisor': 'supervisor',
+    'encarregado': 'encarregado',
+    'localidade': 'localidade',
+    'criterio': 'criterio',
+}
+
+
+def normalizar_chave(valor):
+    """Chave de comparação dos filtros (sem diferença de maiúsculas e espaços nas pontas)"""
+    return str(valor).strip().upper()
+
+
+def separar_valores(parametro):
+    """Divide um parâmetro da URL com vários valores separados por vírgula"""
+    return [valor for valor in (parte.strip() for parte in parametro.split(',')) if valor]
+
+
+def posicoes_por_valor(codigos, categorias):
+    """
+    Posições das obras de cada valor normalizado, a partir dos códigos inteiros da coluna
+
+    Args:
+        codigos (ndarray): Código da categoria de cada obra
+        categorias (list): Texto de cada código
+
+    Returns:
+        dict: {valor normalizado: posições ordenadas}; categorias que diferem só em
+              maiúsculas/espaços são agrupadas
+    """
+    ordem = np.argsort(codigos, kind='stable')
+    fins = np.cumsum(np.bincount(codigos, minlength=len(categorias)))
+    grupos = {}
+    for codigo, categoria in enumerate(categorias):
+        inicio = fins[codigo - 1] if codigo else 0
+        grupos.setdefault(normalizar_chave(categoria), []).append(ordem[inicio:fins[codigo]])
+    return {
+        valor: partes[0] if len(partes) == 1 else np.sort(np.concatenate(partes))
+        for valor, partes in grupos.items()
+    }
+
+
+class IndiceObras:
+    """
+    Lista de obras com índices por campo, período de início e coordenadas
+
+    Args:
+        obras (list): Obras (registro_obras.Obra) na ordem da planilha
+        inicio_ordinais (ndarray): Ordinal (datetime.date) de dataInicio por obra, NaN se vazia
+        codigos (dict): {campo: (códigos, categorias)} já calculados (opcional; ColunasObras.montar)
+        versao (str): Identifica a versão das obras (ETag das respostas derivadas do índice)
+
+    Funcionalidade:
+        - Para cada campo categórico, mapa valor -> posições (ordenadas) das obras,
+          montado a partir dos códigos inteiros da coluna
+        - Datas de início ordenadas para busca binária por período
+        - Grade espacial das obras com coordenadas para o filtro por área (bbox)
+          e o agrupamento por zoom do mapa
+    """
+
+    def __init__(self, obras, inicio_ordinais, codigos=None, versao=None):
+        self.obras = obras
+        self.versao = versao
+        self.ids = np.fromiter((obra.id for obra in obras), dtype=np.int64, count=len(obras))
+
+        self.campos = {}
+        for parametro, chave in CAMPOS_INDEXADOS.items():
+            if codigos is not None and chave in codigos:
+                codigos_campo, categorias = codigos[chave]
+            else:
+                codigos_campo, categorias = codificar([getattr(obra, chave) for obra in obras])
+            self.campos[parametro] = posicoes_por_valor(codigos_campo, categorias)
+            if parametro == 'status':
+                self._status = (codigos_campo, categorias)
+
+        inicio_ordinais = np.asarray(inicio_ordinais, dtype=float)
+        com_data = np.flatnonzero(~np.isnan(inicio_ordinais))
+        ordem = np.argsort(inicio_ordinais[com_data], kind='stable')
+        self._posicoes_por_inicio = com_data[ordem]
+        self._inicios_ordenados = inicio_ordinais[com_data][ordem]
+
+        self.com_coordenadas = np.flatnonzero([obra.hasCoordinates for obra in obras])
+        self.geo = GradeGeo(
+            np.array([obras[p].latitude for p in self.com_coordenadas], dtype=float),
+            np.array([obras[p].longitude for p in self.com_coordenadas], dtype=float)
+        )
+        self._posicao_geo = np.full(len(obras), -1, dtype=np.int64)
+        self._posicao_geo[self.com_coordenadas] = np.arange(len(self.com_coordenadas))
+
+    def valores(self, parametro):
+        """Valores distintos (normalizados) de um campo indexado"""
+        return sorted(self.campos[parametro])
+
+    def filtrar(self, filtros=None, inicio=None, fim=None, bbox=None):
+        """
+        Seleciona as obras que atendem a todos os filtros
+
+        Args:
+            filtros (dict): {parâmetro: [valores]} para os campos de CAMPOS_INDEXADOS (OU entre valores)
+            inicio (int): Ordinal mínimo de dataInicio (inclusivo)
+            fim (int): Ordinal máximo de dataInicio (inclusivo)
+            bbox (tuple): (min_lng, min_lat, max_lng, max_lat); apenas obras com coordenadas
+
+        Returns:
+            ndarray: Posições das obras selecionadas, em ordem crescente
+        """
+        selecao = None
+
+        def restringir(posicoes):
+            nonlocal selecao
+            selecao = posicoes if selecao is None else np.intersect1d(selecao, posicoes, assume_unique=True)
+
+        for parametro, valores in (filtros or {}).items():
+            indice = self.campos[parametro]
+            partes = [indice.get(normalizar_chave(valor)) for valor in valores]
+            partes = [parte for parte in partes if parte is not None]
+            restringir(np.unique(np.concatenate(partes)) if partes else np.array([], dtype=np.int64))
+
+        if inicio is not None or fim is not None:
+            esquerda = 0 if inicio is None else np.searchsorted(self._inicios_ordenados, inicio, side='left')
+            direita = len(self._inicios_ordenados) if fim is None else np.searchsorted(self._inicios_ordenados, fim, side='right')
+            restringir(np.sort(self._posicoes_por_inicio[esquerda:direita]))
+
+        if bbox is not None:
+            restringir(self.com_coordenadas[self.geo.consultar(bbox)])
+
+        if selecao is None:
+            return np.arange(len(self.obras), dtype=np.int64)
+        return selecao
+
+    def agrupar(self, posicoes, zoom):
+        """
+        Agrupa obras com coordenadas pela célula do mapa no zoom informado
+
+        Args:
+            posicoes (ndarray): Posições das obras (todas com coordenadas, ex: filtrar com bbox)
+            zoom (int): Zoom do mapa
+
+        Returns:
+            tuple: (grupos com mais de uma obra, posições das obras sozinhas na célula);
+                   cada grupo é {'latitude', 'longitude', 'total', 'status': {status: quantidade}}
+        """
+        indices = self._posicao_geo[posicoes]
+        celulas = self.geo.celulas(indices, zoom)
+        unicas, grupo, totais = np.unique(celulas, return_inverse=True, return_counts=True)
+        latitudes = np.bincount(grupo, self.geo.latitudes[indices], len(unicas)) / totais
+        longitudes = np.bincount(grupo, self.geo.longitudes[indices], len(unicas)) / totais
+
+        codigos, categorias = self._status
+        por_status = np.bincount(
+            grupo * len(categorias) + codigos[posicoes], minlength=len(unicas) * len(categorias)
+        ).reshape(len(unicas), len(categorias))
+
+        grupos = []
+        for numero in np.flatnonzero(totais > 1):
+            grupos.append({
+                'latitude': float(latitudes[numero]),
+                'longitude': float(longitudes[numero]),
+                'total': int(totais[numero]),
+                'status': {
+                    categorias[codigo]: int(por_status[numero, codigo])
+                    for codigo in np.flatnonzero(por_status[numero])
+                },
+            })
+        return grupos, posicoes[totais[grupo] == 1]
+
+    def posicoes_dos_ids(self, ids):
+        """
+        Posições das obras com os IDs informados
+
+        Returns:
+            tuple: (posições encontradas, IDs que não estão na lista de obras)
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        posicoes = np.clip(np.searchsorted(self.ids, ids), 0, max(len(self.ids) - 1, 0))
+        encontrados = (self.ids[posicoes] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        return posicoes[encontrados], ids[~encontrados].tolist()
+
+    def pagina(self, posicoes, cursor=None, limite=None):
+        """
+        Aplica a paginação por cursor (ID da última obra recebida)
+
+        Returns:
+            tuple: (posições da página, próximo cursor ou None)
+        """
+        if cursor is not None:
+            posicoes = posicoes[self.ids[posicoes] > cursor]
+        if limite is None or len(posicoes) <= limite:
+            return posicoes, None
+        posicoes = posicoes[:limite]
+        return posicoes, int(self.ids[posicoes[-1]])
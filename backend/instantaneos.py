@@ -0,0 +1,163 @@
+"""
+Instantâneos colunares (Arrow IPC) das planilhas já processadas.
+
+Depois que uma planilha é processada, o DataFrame resultante é gravado ao
+lado dela em um arquivo oculto no formato Arrow IPC sem compressão
+(ex: uploads/BD/.MainBD.xlsx.mainbd.arrow), junto com a assinatura (mtime +
+tamanho) do arquivo de origem. Processos novos (reinício do servidor ou
+workers do servidor de produção) leem o instantâneo por mapeamento de
+memória em vez de abrir o Excel: as colunas numéricas são usadas direto das
+páginas do arquivo, compartilhadas entre os processos pelo sistema operacional.
+
+Requer o pacote opcional pyarrow; sem ele, as planilhas são carregadas
+normalmente e nenhum instantâneo é gravado.
+"""
+import logging
+import os
+
+from cache_planilhas import assinatura_arquivo
+from metricas import metricas
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow é opcional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato dos instantâneos (alterar invalida todos os arquivos gravados)
+VERSAO_FORMATO = '1'
+
+_CHAVE_ASSINATURA = b'mariua.assinatura'
+_CHAVE_FORMATO = b'mariua.formato'
+
+
+def disponivel():
+    """True se o pyarrow está instalado"""
+    return pa is not None
+
+
+def caminho_instantaneo(caminho, nome):
+    """
+    Caminho do instantâneo de uma planilha
+
+    Args:
+        caminho (str): Caminho da planilha
+        nome (str): Identifica o processamento (ex: 'mainbd'), já que a mesma
+                    planilha pode ter mais de um DataFrame derivado
+    """
+    pasta, arquivo = os.path.split(os.path.abspath(caminho))
+    return os.path.join(pasta, f'.{arquivo}.{nome}.arrow')
+
+
+def _assinatura_texto(assinatura):
+    return f'{assinatura[0]}:{assinatura[1]}'.encode('ascii')
+
+
+def ler(caminho, nome, assinatura):
+    """
+    Lê o instantâneo por mapeamento de memória, se corresponder à assinatura informada
+
+    Returns:
+        DataFrame: Dados do instantâneo, ou None se ausente, desatualizado ou ilegível
+    """
+    destino = caminho_instantaneo(caminho, nome)
+    if pa is None or not os.path.exists(destino):
+        return None
+    try:
+        with pa.memory_map(destino, 'r') as arquivo:
+            leitor = pa.ipc.open_file(arquivo)
+            metadados = leitor.schema.metadata or {}
+            if (metadados.get(_CHAVE_FORMATO) != VERSAO_FORMATO.encode('ascii')
+                    or metadados.get(_CHAVE_ASSINATURA) != _assinatura_texto(assinatura)):
+                return None
+            tabela = leitor.read_all()
+        return tabela.to_pandas(split_blocks=True)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning(f"⚠️ Instantâneo ilegível ({os.path.basename(destino)}): {e}")
+        return None
+
+
+def _tabela_arrow(df):
+    """
+    Tabela Arrow do DataFrame
+
+    Funcionalidade:
+        - Colunas de texto com valores de outros tipos (ex: o 0 gravado em uma coluna de
+          textos ao adicionar uma obra) não têm tipo Arrow: viram texto, com os nulos preservados
+    """
+    convertidas = {}
+    for posicao in range(df.shape[1]):
+        serie = df.iloc[:, posicao]
+        if serie.dtype != object:
+            continue
+        try:
+            pa.array(serie, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            convertidas[posicao] = serie.map(str).where(serie.notna(), None)
+    if convertidas:
+        df = df.copy()
+        for posicao, serie in convertidas.items():
+            df.isetitem(posicao, serie)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def gravar(caminho, nome, df, assinatura):
+    """
+    Grava o instantâneo do DataFrame (arquivo temporário + troca atômica)
+
+    Returns:
+        bool: True se gravou
+    """
+    if pa is None:
+        return False
+    destino = caminho_instantaneo(caminho, nome)
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    try:
+        tabela = _tabela_arrow(df)
+        tabela = tabela.replace_schema_metadata({
+            **(tabela.schema.metadata or {}),
+            _CHAVE_FORMATO: VERSAO_FORMATO.encode('ascii'),
+            _CHAVE_ASSINATURA: _assinatura_texto(assinatura),
+        })
+        with pa.OSFile(temporario, 'wb') as arquivo:
+            with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        os.replace(temporario, destino)
+        return True
+    except (OSError, pa.ArrowException) as e:
+        logger.warning(f"⚠️ Instantâneo de {os.path.basename(caminho)} ({nome}) não gravado: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+
+
+def obter(caminho, nome, carregar):
+    """
+    DataFrame processado de uma planilha, a partir do instantâneo quando válido
+
+    Args:
+        caminho (str): Caminho da planilha de origem
+        nome (str): Identifica o processamento (ex: 'mainbd')
+        carregar (callable): Processa a planilha (sem argumentos) quando não há instantâneo válido
+
+    Funcionalidade:
+        - Instantâneo válido (mesma assinatura da planilha): leitura por mapeamento de memória
+        - Caso contrário processa a planilha e grava o instantâneo, se ela não mudou durante a leitura
+    """
+    if pa is None:
+        return carregar()
+
+    assinatura = assinatura_arquivo(caminho)
+    with metricas.etapa('leitura_instantaneo'):
+        df = ler(caminho, nome, assinatura)
+    if df is not None:
+        metricas.incrementar('cache_total', cache='instantaneo', resultado='acerto')
+        return df
+
+    metricas.incrementar('cache_total', cache='instantaneo', resultado='falha')
+    df = carregar()
+    if assinatura_arquivo(caminho) == assinatura:
+        with metricas.etapa('gravacao_instantaneo'):
+            gravar(caminho, nome, df, assinatura)
+    return df
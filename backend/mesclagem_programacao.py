@@ -0,0 +1,92 @@
+"""
+Aplicação da programação do dia na planilha mensal de obras.
+
+Os itens da programação são ligados às obras pelo código do projeto (junção
+por dicionário, em uma passada), e as alterações de encarregado, supervisor
+e atividade do dia são reunidas em um único lote de edições, aplicado no
+modelo de obras e gravado na planilha de uma só vez.
+"""
+from indice_obras import normalizar_chave
+
+# Campo da programação do dia -> campo da obra atualizado
+CAMPOS_PROGRAMACAO_OBRA = {
+    'encarregado': 'encarregado',
+    'supervisor': 'supervisor',
+    'atividadeProgramada': 'atividadeDia',
+}
+
+# Resultados possíveis de cada item no relatório
+APLICADA = 'aplicada'
+SEM_ALTERACAO = 'sem_alteracao'
+NAO_ENCONTRADA = 'nao_encontrada'
+CONFLITO = 'conflito'
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def mesclar_programacao(programacao, obras):
+    """
+    Liga cada item da programação à sua obra e calcula as alterações
+
+    Args:
+        programacao (list): Itens da programação do dia (dicionários com projeto, encarregado...)
+        obras (list): Obras atuais (registro_obras.Obra)
+
+    Returns:
+        tuple: (edições {obra_id: {campo da obra: valor}}, relatório com um item por linha da programação)
+
+    Funcionalidade:
+        - Obras indexadas por projeto (sem diferença de maiúsculas e espaços)
+        - Valores vazios na programação não apagam os da obra
+        - Conflito: projeto repetido na planilha mensal, ou repetido na programação com valores diferentes
+    """
+    obras_por_projeto = {}
+    for obra in obras:
+        obras_por_projeto.setdefault(normalizar_chave(obra.projeto), []).append(obra)
+
+    novos_por_projeto = {}
+    for item in programacao:
+        novos = {
+            campo_obra: _texto(item.get(campo))
+            for campo, campo_obra in CAMPOS_PROGRAMACAO_OBRA.items() if _texto(item.get(campo))
+        }
+        novos_por_projeto.setdefault(normalizar_chave(item.get('projeto', '')), []).append(novos)
+
+    edicoes = {}
+    relatorio = []
+    for item in programacao:
+        projeto = normalizar_chave(item.get('projeto', ''))
+        linha = {'id': item.get('id'), 'projeto': _texto(item.get('projeto')), 'obraId': None}
+        relatorio.append(linha)
+
+        candidatas = obras_por_projeto.get(projeto, [])
+        if not candidatas:
+            linha.update(resultado=NAO_ENCONTRADA, motivo='Projeto não encontrado na planilha mensal')
+            continue
+        if len(candidatas) > 1:
+            linha.update(resultado=CONFLITO, obrasIds=[obra.id for obra in candidatas],
+                         motivo='Projeto aparece em mais de uma obra na planilha mensal')
+            continue
+
+        variantes = novos_por_projeto[projeto]
+        if any(novos != variantes[0] for novos in variantes[1:]):
+            linha.update(resultado=CONFLITO, obraId=candidatas[0].id,
+                         motivo='Projeto repetido na programação com valores diferentes')
+            continue
+
+        obra = candidatas[0]
+        novos = variantes[0]
+        alteracoes = {
+            campo: {'de': _texto(getattr(obra, campo)), 'para': valor}
+            for campo, valor in novos.items() if _texto(getattr(obra, campo)) != valor
+        }
+        linha.update(obraId=obra.id, versao=obra.versao, alteracoes=alteracoes)
+        if alteracoes:
+            linha['resultado'] = APLICADA
+            edicoes[obra.id] = {campo: mudanca['para'] for campo, mudanca in alteracoes.items()}
+        else:
+            linha['resultado'] = SEM_ALTERACAO
+
+    return edicoes, relatorio
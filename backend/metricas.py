@@ -0,0 +1,200 @@
+"""
+Métricas do backend (latência por rota, etapas, cache e tamanho das respostas).
+
+As métricas ficam em memória no processo e são exportadas no formato texto do
+Prometheus por /api/metrics, sem dependências externas. Com vários workers
+(servidor.py), cada processo exporta as próprias métricas e todas as séries
+(contadores, histogramas e medidores) levam o rótulo "pid" do processo: duas
+coletas atendidas por workers diferentes não se confundem, e a soma entre
+processos fica a cargo da consulta (ex: sum without (pid) (...)).
+
+Tipos:
+    - Contadores (ex: acertos/falhas de cache)
+    - Histogramas (ex: duração das requisições e de cada etapa, bytes enviados)
+    - Medidores calculados na hora da exportação (ex: fila do executor de leitura)
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites dos histogramas de duração (segundos)
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Limites dos histogramas de tamanho (bytes)
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+PREFIXO = 'mariua_'
+
+
+def _rotulos_texto(rotulos):
+    """Rótulos no formato do Prometheus: {nome="valor",...}"""
+    if not rotulos:
+        return ''
+    partes = []
+    for nome, valor in rotulos:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nome}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _numero(valor):
+    if valor == math.inf:
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    """Distribuição de valores por faixas (buckets), soma e contagem"""
+
+    __slots__ = ('limites', 'contagens', 'soma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * len(limites)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for posicao, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[posicao] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """
+    Registro das métricas do processo
+
+    Funcionalidade:
+        - incrementar(): contadores com rótulos
+        - observar(): histogramas com rótulos (duração em segundos ou tamanho em bytes)
+        - etapa(): mede a duração de um trecho de código (histograma mariua_etapa_segundos)
+        - registrar_medidor(): valores lidos apenas na exportação (ex: tamanho de filas)
+        - exportar(): texto no formato do Prometheus
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._descricoes = {}
+        self._contadores = {}
+        self._histogramas = {}
+        self._medidores = {}
+
+    def descrever(self, nome, tipo, ajuda, limites=None):
+        """Declara uma métrica (tipo 'counter', 'histogram' ou 'gauge') com seu texto de ajuda"""
+        self._descricoes[nome] = (tipo, ajuda, limites)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        """Soma valor ao contador com os rótulos informados"""
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        """Registra um valor no histograma com os rótulos informados"""
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                limites = self._descricoes.get(nome, (None, None, None))[2] or LIMITES_SEGUNDOS
+                histograma = self._histogramas[chave] = Histograma(limites)
+            histograma.observar(valor)
+
+    @contextmanager
+    def etapa(self, nome):
+        """
+        Mede a duração de uma etapa (ex: leitura do Excel, serialização)
+
+        Exemplo:
+            with metricas.etapa('leitura_excel'):
+                df = pd.read_excel(...)
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar('etapa_segundos', time.perf_counter() - inicio, etapa=nome)
+
+    def registrar_medidor(self, nome, ajuda, ler):
+        """
+        Registra um medidor calculado na exportação
+
+        Args:
+            nome (str): Nome da métrica (sem o prefixo)
+            ajuda (str): Descrição
+            ler (callable): Retorna um número ou uma lista de (rótulos dict, número)
+        """
+        self.descrever(nome, 'gauge', ajuda)
+        self._medidores[nome] = ler
+
+    def exportar(self):
+        """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {
+                chave: (h.limites, list(h.contagens), h.soma, h.total) for chave, h in self._histogramas.items()
+            }
+
+        linhas = []
+        publicadas = set()
+        pid = os.getpid()
+
+        def com_pid(rotulos):
+            return tuple(sorted({**dict(rotulos), 'pid': pid}.items()))
+
+        def cabecalho(nome, tipo_padrao):
+            if nome in publicadas:
+                return
+            publicadas.add(nome)
+            tipo, ajuda, _ = self._descricoes.get(nome, (tipo_padrao, nome, None))
+            linhas.append(f'# HELP {PREFIXO}{nome} {ajuda}')
+            linhas.append(f'# TYPE {PREFIXO}{nome} {tipo}')
+
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            cabecalho(nome, 'counter')
+            linhas.append(f'{PREFIXO}{nome}{_rotulos_texto(com_pid(rotulos))} {_numero(valor)}')
+
+        for (nome, rotulos), (limites, contagens, soma, total) in sorted(histogramas.items()):
+            cabecalho(nome, 'histogram')
+            rotulos = com_pid(rotulos)
+            acumulado = 0
+            for limite, contagem in zip(limites, contagens):
+                acumulado += contagem
+                linhas.append(f'{PREFIXO}{nome}_bucket{_rotulos_texto(rotulos + (("le", _numero(limite)),))} {acumulado}')
+            linhas.append(f'{PREFIXO}{nome}_bucket{_rotulos_texto(rotulos + (("le", "+Inf"),))} {total}')
+            linhas.append(f'{PREFIXO}{nome}_sum{_rotulos_texto(rotulos)} {_numero(soma)}')
+            linhas.append(f'{PREFIXO}{nome}_count{_rotulos_texto(rotulos)} {total}')
+
+        for nome, ler in sorted(self._medidores.items()):
+            try:
+                valores = ler()
+            except Exception:
+                continue  # Medidor indisponível (ex: recurso ainda não criado)
+            if not isinstance(valores, list):
+                valores = [({}, valores)]
+            cabecalho(nome, 'gauge')
+            for rotulos, valor in valores:
+                if valor is None:
+                    continue
+                rotulos = com_pid(rotulos)
+                linhas.append(f'{PREFIXO}{nome}{_rotulos_texto(rotulos)} {_numero(valor)}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+# Instância única usada por todos os módulos
+metricas = RegistroMetricas()
+
+metricas.descrever('requisicao_segundos', 'histogram', 'Duração das requisições HTTP por rota, método e status')
+metricas.descrever('resposta_bytes', 'histogram', 'Tamanho do corpo das respostas (após compressão) por rota', LIMITES_BYTES)
+metricas.descrever('etapa_segundos', 'histogram', 'Duração de cada etapa interna (leitura do Excel, processamento, serialização...)')
+metricas.descrever('cache_total', 'counter', 'Consultas aos caches por resultado (acerto, falha, versao_anterior)')
+metricas.descrever('gravacao_tentativas_total', 'counter', 'Tentativas de gravação de planilha por resultado')
+metricas.descrever('linhas_processadas_total', 'counter', 'Linhas de planilha processadas por etapa')
+metricas.descrever('admissao_total', 'counter', 'Requisições admitidas ou recusadas (e o motivo) por classe de custo da rota')
@@ -0,0 +1,663 @@
+"""
+Modelo em memória da planilha mensal de obras com gravação em segundo plano.
+
+As edições de /api/obras/adicionar e /api/obras/atualizar são aplicadas no
+modelo e confirmadas imediatamente. As edições pendentes ficam em um diário no
+banco SQLite local, compartilhado pelos workers do servidor de produção: cada
+processo aplica no seu modelo as edições dos outros, e uma thread de gravação
+grava todas as pendências de uma vez na planilha (um load/save por lote, em vez
+de um por requisição), com uma trava entre processos. Cada linha possui uma versão, usada para
+detectar atualizações conflitantes e para a sincronização incremental dos
+clientes (alteracoes): edições pela API e alterações feitas na planilha fora
+do sistema (detectadas pelo hash de cada linha na recarga) recebem uma nova
+versão de um contador único e crescente. O contador, as versões e os hashes
+ficam no banco SQLite local (estado_obras), não na memória do processo.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from cache_planilhas import assinatura_arquivo
+from estado_obras import obter_estado_obras
+from metricas import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows: servidor.py roda em um único processo (sem gunicorn)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Tempo de espera para agrupar edições antes de gravar (segundos)
+INTERVALO_AGRUPAMENTO = 0.5
+
+# Espera antes de tentar gravar novamente após uma falha (segundos)
+INTERVALO_NOVA_TENTATIVA = 5.0
+
+# Edições já gravadas mantidas no diário (processos mais atrasados que isso recarregam a planilha)
+MANTER_EDICOES = 1000
+
+
+class ConflitoVersao(Exception):
+    """A obra foi alterada por outra requisição desde a versão informada pelo cliente"""
+
+    def __init__(self, obra_id, versao_atual):
+        super().__init__(f'Obra ID {obra_id} foi alterada por outro usuário (versão atual: {versao_atual})')
+        self.obra_id = obra_id
+        self.versao_atual = versao_atual
+
+
+class ObraNaoEncontrada(Exception):
+    """A linha correspondente à obra não existe na planilha"""
+
+
+# Textos que o pd.read_excel lê como nulos (na_values padrão do pandas)
+VALORES_NULOS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def _valor_lido(valor):
+    """Valor como o pd.read_excel o leria de volta (textos como '', 'N/A' e 'nan' viram nulos)"""
+    if isinstance(valor, str) and valor in VALORES_NULOS:
+        return None
+    return valor
+
+
+def _texto_celula(valor):
+    """
+    Texto de comparação de uma célula: o mesmo valor lido com outro tipo gera o mesmo texto
+
+    Exemplo:
+        _texto_celula(5) == _texto_celula(5.0) == _texto_celula('5') == '5'; nulos e 'N/A' -> ''
+    """
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, str):
+        return '' if valor in VALORES_NULOS else valor
+    if valor is None or pd.isna(valor):
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def _hash_linhas(df):
+    """Hash do conteúdo de cada linha (células normalizadas por _texto_celula), como inteiros do SQLite"""
+    textos = pd.DataFrame({posicao: df.iloc[:, posicao].map(_texto_celula) for posicao in range(df.shape[1])})
+    return pd.util.hash_pandas_object(textos, index=False).to_numpy().view(np.int64).tolist()
+
+
+@contextmanager
+def trava_planilha(caminho):
+    """
+    Trava exclusiva entre processos para o ciclo leitura/edição/gravação da planilha
+
+    Funcionalidade:
+        - flock em um arquivo oculto ao lado da planilha (ex: uploads/.PROGRAMACAO - NOVEMBRO.xlsx.lock)
+        - Workers do servidor de produção gravam um de cada vez: nenhum sobrescreve
+          a planilha com uma versão que não tem as edições do outro
+        - Sem fcntl (Windows) não há trava: o servidor roda em um único processo
+    """
+    pasta, nome = os.path.split(os.path.abspath(caminho))
+    with open(os.path.join(pasta, f'.{nome}.lock'), 'a+b') as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+
+
+def _indice_coluna(letra):
+    """Converte a letra da coluna do Excel (A..Z) no índice da coluna do DataFrame"""
+    return ord(letra.upper()) - ord('A')
+
+
+def _mesclar(edicoes):
+    """Junta edições do diário (sequência, linha, {letra: valor}) em {linha: {letra: valor}}; as mais novas prevalecem"""
+    mescladas = {}
+    for _, linha, celulas in edicoes:
+        mescladas.setdefault(linha, {}).update(celulas)
+    return mescladas
+
+
+class ModeloObras:
+    """
+    Planilha mensal de obras mantida em memória, com gravação agrupada em segundo plano
+
+    Funcionalidade:
+        - Mantém o DataFrame bruto da planilha (como pd.read_excel) com as edições já aplicadas
+        - Recarrega do disco apenas se o arquivo for alterado fora do sistema
+        - Edições ficam no diário do banco até serem gravadas; cada processo aplica no
+          seu modelo as edições feitas pelos outros
+        - Uma thread de gravação aplica todas as pendências do diário em um único load/save
+        - Em caso de falha (ex: arquivo aberto no Excel) as pendências continuam no diário
+        - Registra a versão de cada obra inserida, alterada ou removida (pela API ou
+          editando a planilha), consultada por alteracoes()
+        - As versões ficam no banco SQLite (banco); o processo mantém uma cópia,
+          atualizada a cada consulta só com as versões novas
+
+    Args:
+        caminho (str): Caminho da planilha mensal
+        salvar (callable): Função de gravação (wb, caminho)
+        carregar (callable): Função que lê a planilha bruta (padrão: pd.read_excel)
+        banco (str): Arquivo SQLite das versões (padrão: banco_local.sqlite3 na pasta da planilha)
+    """
+
+    def __init__(self, caminho, salvar, carregar=None, banco=None):
+        self.caminho = os.path.abspath(caminho)
+        self._salvar = salvar
+        self._carregar = carregar or (lambda caminho: pd.read_excel(caminho, header=0))
+        self._estado = obter_estado_obras(
+            banco or os.path.join(os.path.dirname(self.caminho), 'banco_local.sqlite3')
+        )
+        self._lock = threading.Condition()
+        self._df = None
+        self._assinatura = None
+        self._base = None
+        self.geracao = 0
+        # Cópia local das versões gravadas no banco (até a versão _versao_global)
+        self._versoes = {}
+        self._versao_global = 0
+        self._inseridas = {}
+        self._removidas = {}
+        # Última edição do diário já aplicada em _df
+        self._ultima_edicao = 0
+        self._gravar = False
+        self._em_gravacao = 0
+        self._thread = None
+        self._ultima_gravacao = None
+        self._ultimo_erro = None
+        self._total_gravacoes = 0
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def _precisa_carregar(self):
+        """
+        Sincroniza com o banco e informa se a planilha precisa ser (re)carregada do disco;
+        chamar com o lock (só lê o banco: pode ser chamado dentro de uma transação)
+        """
+        if self._df is None:
+            return True
+        assinatura = assinatura_arquivo(self.caminho)
+        estado = self._sincronizar()
+        if assinatura == self._assinatura:
+            return False
+        if (estado is not None and estado['assinatura'] == assinatura and estado['base'] == self._base
+                and estado['podada'] <= self._ultima_edicao):
+            # Planilha gravada por um worker a partir do diário, cujas edições o modelo já tem
+            self._assinatura = assinatura
+            return False
+        return True
+
+    def _carregar_se_necessario(self):
+        """
+        Carrega (ou recarrega, se alterado externamente) a planilha; chamar com o lock, fora de
+        uma transação do banco (a carga pode importar a planilha no banco_local, no mesmo arquivo SQLite)
+        """
+        if not self._precisa_carregar():
+            return
+
+        assinatura = assinatura_arquivo(self.caminho)
+        logger.info(f"📖 Carregando planilha de obras no modelo em memória: {self.caminho}")
+        # O diário é lido antes da planilha: edições gravadas entre as duas leituras estão no
+        # arquivo, e as registradas depois são aplicadas por _sincronizar, em ordem
+        ultima = self._estado.ultima_edicao(self.caminho)
+        pendentes = self._estado.edicoes(self.caminho, ate=ultima, pendentes=True)
+        df = self._aplicar(self._carregar(self.caminho).astype(object), _mesclar(pendentes))
+
+        with self._estado.transacao():
+            self._base = self._registrar_alteracoes_externas(df, assinatura)
+
+        self._df = df
+        self._assinatura = assinatura
+        self._ultima_edicao = ultima
+        self.geracao += 1
+        self._sincronizar()
+
+        if pendentes:
+            # Edições que nenhum processo gravou (ex: worker encerrado antes da gravação)
+            self._gravar = True
+            self._iniciar_gravador()
+            self._lock.notify()
+
+    def _sincronizar(self):
+        """
+        Traz do banco as versões e as edições registradas depois da cópia local (por este
+        ou outro processo); chamar com o lock
+
+        Returns:
+            dict: Estado gravado da planilha (estado_obras.EstadoObras.estado)
+        """
+        estado = self._estado.estado(self.caminho)
+        if estado is None or estado['versao'] <= self._versao_global:
+            return estado
+        if estado['podada'] > self._ultima_edicao:
+            # Edições que este processo não aplicou já saíram do diário: recarregar da planilha
+            self._assinatura = None
+            return estado
+
+        edicoes = self._estado.edicoes(self.caminho, desde=self._ultima_edicao)
+        if edicoes:
+            self._df = self._aplicar(self._df, _mesclar(edicoes))
+            self._ultima_edicao = edicoes[-1][0]
+            self.geracao += 1
+
+        for obra_id, versao, inserida, removida in self._estado.versoes_desde(self.caminho, self._versao_global):
+            if removida:
+                self._removidas[obra_id] = versao
+                self._versoes.pop(obra_id, None)
+                self._inseridas.pop(obra_id, None)
+                continue
+            self._versoes[obra_id] = versao
+            self._removidas.pop(obra_id, None)
+            if inserida:
+                self._inseridas[obra_id] = inserida
+            else:
+                self._inseridas.pop(obra_id, None)
+        self._versao_global = estado['versao']
+        return estado
+
+    def _registrar_alteracoes_externas(self, df, assinatura):
+        """
+        Compara o hash das linhas carregadas com o gravado no banco e versiona as diferenças;
+        chamar dentro de uma transação
+
+        Returns:
+            int: Base da planilha (muda a cada carga com alterações feitas fora do sistema)
+
+        Funcionalidade:
+            - Primeira carga da planilha: todas as obras na versão 0
+            - Arquivo com a assinatura já comparada (por outro worker, ou antes de reiniciar): nada muda
+        """
+        estado = self._estado.estado(self.caminho)
+        if estado is not None and estado['assinatura'] == assinatura:
+            return estado['base']
+
+        hashes = _hash_linhas(df)
+        if estado is None:
+            self._estado.gravar_versoes(
+                self.caminho, ((posicao + 1, 0, 0, 0, hash_linha) for posicao, hash_linha in enumerate(hashes))
+            )
+            self._estado.gravar_estado(self.caminho, {'versao': 0, 'assinatura': assinatura, 'base': 1, 'podada': 0})
+            return 1
+
+        anteriores = self._estado.hashes(self.caminho)
+        versao = estado['versao']
+        linhas = []
+        alteradas = inseridas = 0
+        for posicao, hash_linha in enumerate(hashes):
+            obra_id = posicao + 1
+            anterior = anteriores.pop(obra_id, None)
+            if anterior is not None and anterior[0] == hash_linha:
+                continue
+            versao += 1
+            if anterior is None:
+                linhas.append((obra_id, versao, versao, 0, hash_linha))
+                inseridas += 1
+            else:
+                linhas.append((obra_id, versao, anterior[1], 0, hash_linha))
+                alteradas += 1
+        # Obras gravadas que não existem mais na planilha
+        for obra_id in sorted(anteriores):
+            versao += 1
+            linhas.append((obra_id, versao, 0, 1, None))
+
+        self._estado.gravar_versoes(self.caminho, linhas)
+        # Nova base: modelos carregados antes desta comparação não podem adotar a planilha sem recarregar
+        estado.update(versao=versao, assinatura=assinatura, base=estado['base'] + 1)
+        self._estado.gravar_estado(self.caminho, estado)
+        if linhas:
+            logger.info(f"🔎 Planilha alterada fora do sistema: {alteradas} linha(s) alterada(s), "
+                        f"{inseridas} inserida(s), {len(anteriores)} removida(s)")
+        return estado['base']
+
+    @staticmethod
+    def _aplicar(df, edicoes):
+        """Retorna uma cópia do DataFrame com as edições {linha_excel: {letra: valor}} aplicadas"""
+        if not edicoes:
+            return df
+        df = df.copy()
+        for linha, celulas in sorted(edicoes.items()):
+            posicao = linha - 2  # linha 1 do Excel é o cabeçalho
+            while posicao >= len(df):
+                df.loc[len(df)] = [None] * len(df.columns)
+            for letra, valor in celulas.items():
+                df.iat[posicao, _indice_coluna(letra)] = _valor_lido(valor)
+        return df
+
+    def dataframe(self):
+        """
+        Retorna o DataFrame bruto da planilha com todas as edições confirmadas
+
+        Returns:
+            DataFrame: Não deve ser modificado (é compartilhado entre requisições)
+        """
+        with self._lock:
+            self._carregar_se_necessario()
+            return self._df
+
+    def estado(self):
+        """
+        Retorna o DataFrame atual junto com a geração do modelo
+
+        Returns:
+            tuple: (geração, DataFrame); a geração muda a cada edição ou recarga da planilha
+        """
+        with self._lock:
+            self._carregar_se_necessario()
+            return self.geracao, self._df
+
+    def versao(self, obra_id):
+        """Versão atual da obra (0 se nunca foi alterada desde a primeira carga da planilha)"""
+        return self._versoes.get(obra_id, 0)
+
+    def versoes(self):
+        """Cópia do mapa {obra_id: versão} das obras alteradas"""
+        with self._lock:
+            return dict(self._versoes)
+
+    def alteracoes(self, desde):
+        """
+        Obras inseridas, alteradas ou removidas depois de uma versão
+
+        Args:
+            desde (int): Última versão recebida pelo cliente
+
+        Returns:
+            dict: {'versao': versão atual, 'inseridas', 'atualizadas', 'removidas': listas de IDs}
+        """
+        with self._lock:
+            self._carregar_se_necessario()
+            inseridas, atualizadas = [], []
+            for obra_id, versao in self._versoes.items():
+                if versao > desde:
+                    (inseridas if self._inseridas.get(obra_id, 0) > desde else atualizadas).append(obra_id)
+            removidas = [obra_id for obra_id, versao in self._removidas.items() if versao > desde]
+            return {
+                'versao': self._versao_global,
+                'inseridas': sorted(inseridas),
+                'atualizadas': sorted(atualizadas),
+                'removidas': sorted(removidas),
+            }
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _transacao_atualizada(self):
+        """
+        Transação do banco com o modelo em dia com a planilha e com os outros processos; chamar com o lock
+
+        Funcionalidade:
+            - A planilha é carregada antes do BEGIN: a carga grava no mesmo arquivo SQLite por
+              outra conexão e esperaria pela trava de escrita desta transação
+            - Dentro da transação apenas compara: se a planilha mudou entre a carga e o BEGIN,
+              encerra a transação sem alterações e carrega de novo
+        """
+        while True:
+            self._carregar_se_necessario()
+            with self._estado.transacao():
+                if not self._precisa_carregar():
+                    yield
+                    return
+
+    def _registrar(self, edicoes):
+        """
+        Aplica as edições no modelo, registra no diário, incrementa as versões e agenda a gravação;
+        chamar com o lock, dentro de _transacao_atualizada
+
+        Args:
+            edicoes (dict): {linha do Excel: {letra: valor}}
+
+        Returns:
+            dict: {obra_id: nova versão}
+        """
+        total_anterior = len(self._df)
+        df = self._aplicar(self._df, edicoes)
+
+        # Hash das linhas editadas: a próxima recarga só versiona alterações externas
+        linhas = sorted(edicoes)
+        hashes = _hash_linhas(df.iloc[[linha - 2 for linha in linhas]])
+        registros = []
+        versoes = {}
+        versao = self._versao_global
+        for linha, hash_linha in zip(linhas, hashes):
+            obra_id = linha - 1
+            versao += 1
+            inserida = versao if linha - 2 >= total_anterior else self._inseridas.get(obra_id, 0)
+            registros.append((obra_id, versao, inserida, 0, hash_linha))
+            versoes[obra_id] = versao
+
+        self._estado.gravar_versoes(self.caminho, registros)
+        ultima_edicao = self._estado.registrar_edicoes(self.caminho, edicoes)
+        estado = self._estado.estado(self.caminho)
+        estado['versao'] = versao
+        self._estado.gravar_estado(self.caminho, estado)
+
+        self._df = df
+        self.geracao += 1
+        self._versao_global = versao
+        self._ultima_edicao = ultima_edicao
+        for obra_id, versao_obra, inserida, _, _ in registros:
+            self._versoes[obra_id] = versao_obra
+            self._removidas.pop(obra_id, None)
+            if inserida:
+                self._inseridas[obra_id] = inserida
+
+        self._gravar = True
+        self._iniciar_gravador()
+        self._lock.notify()
+        return versoes
+
+    def atualizar(self, obra_id, celulas, versao_esperada=None):
+        """
+        Atualiza células de uma obra existente
+
+        Args:
+            obra_id (int): ID da obra (linha do Excel = obra_id + 1)
+            celulas (dict): {letra da coluna: novo valor}
+            versao_esperada (int): Versão que o cliente leu (opcional)
+
+        Returns:
+            int: Nova versão da obra
+
+        Raises:
+            ObraNaoEncontrada: Linha inexistente na planilha
+            ConflitoVersao: A obra mudou desde a versão informada
+        """
+        with self._lock:
+            # Dentro da transação: nenhum outro processo altera versões entre a verificação e a gravação
+            with self._transacao_atualizada():
+                linha = obra_id + 1
+                if obra_id < 1 or linha - 2 >= len(self._df):
+                    raise ObraNaoEncontrada(f'Obra ID {obra_id} não encontrada')
+
+                versao_atual = self.versao(obra_id)
+                if versao_esperada is not None and int(versao_esperada) != versao_atual:
+                    raise ConflitoVersao(obra_id, versao_atual)
+
+                return self._registrar({linha: celulas})[obra_id]
+
+    def atualizar_lote(self, edicoes, versoes_esperadas=None):
+        """
+        Atualiza células de várias obras de uma vez
+
+        Args:
+            edicoes (dict): {obra_id: {letra da coluna: novo valor}}
+            versoes_esperadas (dict): {obra_id: versão lida pelo cliente} (opcional)
+
+        Returns:
+            tuple: ({obra_id: nova versão} das obras atualizadas,
+                    {obra_id: versão atual} das obras que mudaram desde a versão esperada)
+
+        Raises:
+            ObraNaoEncontrada: Alguma linha inexistente na planilha (nenhuma edição é aplicada)
+
+        Funcionalidade:
+            - Uma única cópia do DataFrame para o lote inteiro
+            - As edições entram juntas no diário: a gravação do lote é um único load/save
+            - Obras em conflito de versão ficam de fora; as demais são aplicadas
+        """
+        versoes_esperadas = versoes_esperadas or {}
+        with self._lock:
+            with self._transacao_atualizada():
+                for obra_id in edicoes:
+                    if obra_id < 1 or obra_id - 1 >= len(self._df):
+                        raise ObraNaoEncontrada(f'Obra ID {obra_id} não encontrada')
+
+                conflitos = {
+                    obra_id: self.versao(obra_id) for obra_id in edicoes
+                    if obra_id in versoes_esperadas and int(versoes_esperadas[obra_id]) != self.versao(obra_id)
+                }
+                aplicar = {obra_id + 1: celulas for obra_id, celulas in edicoes.items() if obra_id not in conflitos}
+                return (self._registrar(aplicar) if aplicar else {}), conflitos
+
+    def adicionar(self, celulas):
+        """
+        Adiciona uma nova obra ao final da planilha
+
+        Args:
+            celulas (dict): {letra da coluna: valor}
+
+        Returns:
+            tuple: (obra_id, versão)
+        """
+        with self._lock:
+            # Dentro da transação: dois workers não adicionam na mesma linha
+            with self._transacao_atualizada():
+                linha = len(self._df) + 2
+                return linha - 1, self._registrar({linha: celulas})[linha - 1]
+
+    # ------------------------------------------------------------------
+    # Gravação em segundo plano
+    # ------------------------------------------------------------------
+    def _iniciar_gravador(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop_gravacao, name='gravador-obras', daemon=True)
+            self._thread.start()
+
+    def _loop_gravacao(self):
+        while True:
+            with self._lock:
+                while not self._gravar:
+                    self._lock.wait()
+
+            # Aguardar um pouco para agrupar edições que chegam em sequência
+            time.sleep(INTERVALO_AGRUPAMENTO)
+
+            if not self.descarregar():
+                time.sleep(INTERVALO_NOVA_TENTATIVA)
+
+    def descarregar(self):
+        """
+        Grava na planilha todas as edições pendentes do diário (de todos os processos) em um único load/save
+
+        Returns:
+            bool: True se gravou (ou não havia pendências), False em caso de falha
+        """
+        with self._lock:
+            self._gravar = False
+        if not self._estado.edicoes(self.caminho, pendentes=True):
+            return True
+
+        try:
+            # Sob a trava, nenhum outro processo grava a planilha nem marca edições como gravadas
+            with metricas.etapa('gravacao_obras'), trava_planilha(self.caminho):
+                lote = self._estado.edicoes(self.caminho, pendentes=True)
+                if not lote:
+                    return True
+                edicoes = _mesclar(lote)
+                total_celulas = sum(len(celulas) for celulas in edicoes.values())
+                self._em_gravacao = total_celulas
+                logger.info(f"💾 Gravando {len(edicoes)} linha(s) / {total_celulas} célula(s) na planilha...")
+
+                assinatura_lida = assinatura_arquivo(self.caminho)
+                wb = load_workbook(self.caminho)
+                try:
+                    ws = wb.active
+                    for linha, celulas in sorted(edicoes.items()):
+                        for letra, valor in celulas.items():
+                            ws[f'{letra}{linha}'] = valor
+                    self._salvar(wb, self.caminho)
+                finally:
+                    wb.close()
+                assinatura_gravada = assinatura_arquivo(self.caminho)
+
+                with self._estado.transacao():
+                    self._estado.marcar_gravadas(self.caminho, lote[-1][0])
+                    estado = self._estado.estado(self.caminho)
+                    if estado['assinatura'] == assinatura_lida:
+                        # Os modelos com o diário aplicado adotam o arquivo gravado sem recarregar;
+                        # se a planilha foi alterada fora do sistema, a próxima carga compara as linhas
+                        estado['assinatura'] = assinatura_gravada
+                    estado['podada'] = max(estado['podada'], self._estado.podar(self.caminho, MANTER_EDICOES))
+                    self._estado.gravar_estado(self.caminho, estado)
+        except Exception as e:
+            logger.error(f"❌ Falha ao gravar edições pendentes: {str(e)}")
+            with self._lock:
+                # As edições continuam no diário: tentar novamente
+                self._gravar = True
+                self._em_gravacao = 0
+                self._ultimo_erro = str(e)
+            return False
+
+        with self._lock:
+            self._em_gravacao = 0
+            self._ultima_gravacao = time.time()
+            self._ultimo_erro = None
+            self._total_gravacoes += 1
+        return True
+
+    def status(self):
+        """Resumo do estado da fila de gravação (pendentes: edições de todos os processos)"""
+        pendentes = self._estado.edicoes(self.caminho, pendentes=True)
+        with self._lock:
+            return {
+                'pendentes': sum(len(celulas) for celulas in _mesclar(pendentes).values()),
+                'emGravacao': self._em_gravacao,
+                'ultimaGravacao': self._ultima_gravacao,
+                'ultimoErro': self._ultimo_erro,
+                'totalGravacoes': self._total_gravacoes,
+                'versao': self._versao_global,
+            }
+
+
+_modelos = {}
+_lock_modelos = threading.Lock()
+
+
+def obter_modelo(caminho, salvar, carregar=None, banco=None):
+    """
+    Retorna o modelo único da planilha informada (criado no primeiro acesso)
+
+    Args:
+        caminho (str): Caminho da planilha mensal
+        salvar (callable): Função de gravação (wb, caminho), ex: salvar_planilha_com_retry
+        carregar (callable): Função que lê a planilha bruta (padrão: pd.read_excel)
+        banco (str): Arquivo SQLite das versões das obras (ex: uploads/banco_local.sqlite3)
+    """
+    caminho = os.path.abspath(caminho)
+    with _lock_modelos:
+        modelo = _modelos.get(caminho)
+        if modelo is None:
+            modelo = _modelos[caminho] = ModeloObras(caminho, salvar, carregar, banco)
+        return modelo
+
+
+@atexit.register
+def _descarregar_todos():
+    """Grava as pendências de todos os modelos ao encerrar o processo"""
+    for modelo in list(_modelos.values()):
+        modelo.descarregar()
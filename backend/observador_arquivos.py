@@ -0,0 +1,167 @@
+"""
+Observador das planilhas de uploads/ que pré-processa os arquivos alterados.
+
+Uma thread em segundo plano verifica periodicamente a assinatura (mtime +
+tamanho) dos arquivos de cada alvo registrado. Quando um arquivo novo ou
+alterado fica estável, a função de aquecimento do alvo é chamada fora do
+caminho das requisições: a planilha é lida, processada e colocada nos caches,
+e os endpoints continuam servindo a versão anterior até a nova ficar pronta.
+"""
+import logging
+import os
+import threading
+import time
+
+from cache_planilhas import assinatura_arquivo
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre verificações dos arquivos (segundos)
+INTERVALO_OBSERVADOR = 2.0
+
+
+def arquivos_da_pasta(pasta, extensoes=('.xlsx', '.xls')):
+    """Planilhas de uma pasta (ignora arquivos temporários do Excel, ~$...)"""
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.lower().endswith(extensoes) and not nome.startswith('~$')
+    )
+
+
+class AlvoObservado:
+    """Conjunto de arquivos observados e a função que os processa"""
+
+    def __init__(self, nome, arquivos, aquecer):
+        self.nome = nome
+        self.arquivos = arquivos
+        self.aquecer = aquecer
+        self.vistas = None
+        self.processadas = None
+        self.ultima_atualizacao = None
+        self.duracao = None
+        self.ultimo_erro = None
+        self.total_atualizacoes = 0
+
+    def assinaturas(self):
+        """{caminho: (mtime_ns, tamanho)} dos arquivos existentes do alvo"""
+        resultado = {}
+        for caminho in self.arquivos():
+            try:
+                resultado[caminho] = assinatura_arquivo(caminho)
+            except OSError:
+                pass  # Arquivo removido entre a listagem e o stat
+        return resultado
+
+    def status(self):
+        return {
+            'arquivos': len(self.processadas or {}),
+            'ultimaAtualizacao': self.ultima_atualizacao,
+            'duracao': self.duracao,
+            'ultimoErro': self.ultimo_erro,
+            'totalAtualizacoes': self.total_atualizacoes,
+        }
+
+
+class ObservadorArquivos:
+    """
+    Thread que mantém os caches aquecidos quando as planilhas mudam em disco
+
+    Funcionalidade:
+        - Verificação por polling (apenas os.stat), sem dependências externas
+        - Na primeira verificação todos os alvos são processados
+        - Um arquivo só é processado quando a assinatura se repete em duas verificações
+          seguidas (evita ler uma planilha que ainda está sendo copiada)
+        - Registra horário, duração e erro da última atualização de cada alvo
+        - O evento "pronto" é marcado ao fim da primeira verificação (caches aquecidos)
+    """
+
+    def __init__(self, intervalo=INTERVALO_OBSERVADOR):
+        self.intervalo = intervalo
+        self.pronto = threading.Event()
+        self._alvos = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def registrar(self, nome, arquivos, aquecer):
+        """
+        Registra um alvo a observar
+
+        Args:
+            nome (str): Identificação do alvo (ex: 'mainbd')
+            arquivos (callable): Retorna a lista de caminhos observados
+            aquecer (callable): Processa os arquivos e preenche os caches
+        """
+        with self._lock:
+            self._alvos.append(AlvoObservado(nome, arquivos, aquecer))
+
+    def iniciar(self):
+        """Inicia a thread do observador (uma única vez)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name='observador-arquivos', daemon=True)
+            self._thread.start()
+        logger.info(f"👀 Observador de arquivos iniciado (verificação a cada {self.intervalo:g}s)")
+
+    def parar(self):
+        """Interrompe a thread do observador"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self.verificar()
+            self._parar.wait(self.intervalo)
+
+    def verificar(self):
+        """Verifica todos os alvos uma vez e processa os que mudaram"""
+        with self._lock:
+            alvos = list(self._alvos)
+
+        for alvo in alvos:
+            atuais = alvo.assinaturas()
+            primeira = alvo.vistas is None
+            estavel = atuais == alvo.vistas
+            alvo.vistas = atuais
+            if atuais == alvo.processadas or not (primeira or estavel):
+                continue
+            if not atuais:
+                alvo.processadas = atuais  # Nenhum arquivo do alvo em disco
+                continue
+
+            # Em caso de erro, só tenta de novo quando o arquivo mudar outra vez
+            alvo.processadas = atuais
+            inicio = time.perf_counter()
+            try:
+                alvo.aquecer()
+            except Exception as e:
+                alvo.ultimo_erro = str(e)
+                logger.error(f"❌ Erro ao pré-processar '{alvo.nome}': {str(e)}")
+                continue
+
+            alvo.ultimo_erro = None
+            alvo.ultima_atualizacao = time.time()
+            alvo.duracao = time.perf_counter() - inicio
+            alvo.total_atualizacoes += 1
+            logger.info(f"🔥 '{alvo.nome}' pré-processado em {alvo.duracao:.2f}s")
+
+        self.pronto.set()
+
+    def status(self):
+        """Estado de cada alvo: última atualização, duração do processamento e erro"""
+        with self._lock:
+            alvos = list(self._alvos)
+        return {
+            'ativo': self.ativo(),
+            'pronto': self.pronto.is_set(),
+            'intervalo': self.intervalo,
+            'alvos': {alvo.nome: alvo.status() for alvo in alvos},
+        }
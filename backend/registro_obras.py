@@ -0,0 +1,130 @@
+"""
+Representação compacta das obras mantidas em memória.
+
+Cada obra é um objeto Obra com __slots__ (sem o dicionário de 31 chaves por
+linha), e os campos categóricos (supervisor, encarregado, localidade,
+critério, AR Coelba, status...) apontam para uma única cópia de cada texto.
+Esses campos também ficam disponíveis como códigos inteiros por coluna,
+usados pelos índices de filtro. O dicionário no formato da API só é montado
+na resposta (Obra.para_dict).
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Ordem das chaves de cada obra na resposta da API
+CHAVES_OBRA = [
+    'id', 'encarregado', 'supervisor', 'projeto', 'cliente', 'localidade', 'criterio', 'anotacoes',
+    'postesPrevistos', 'dataInicio', 'prazo', 'obraSemana', 'motivoAtraso', 'atividadeDia',
+    'programacaoLv', 'cavasRealizadas', 'postesImplantados', 'latitude', 'longitude', 'hasCoordinates',
+    'clientesPrevistos', 'projetoKit', 'projetoMedidor', 'arCoelba', 'dataVisitaPrevia',
+    'observacaoVisita', 'analisePreFechamento', 'dataSolicitacaoReserva', 'progresso',
+    'isEnergizada', 'status'
+]
+
+# Campos da resposta: chaves da planilha + versão da obra (controle de edição concorrente)
+CAMPOS_OBRA = CHAVES_OBRA + ['versao']
+
+# Campos com poucos valores distintos: uma cópia de cada texto e códigos inteiros por coluna
+CAMPOS_CATEGORICOS = [
+    'encarregado', 'supervisor', 'localidade', 'criterio', 'atividadeDia', 'programacaoLv',
+    'obraSemana', 'arCoelba', 'status'
+]
+
+
+class Obra:
+    """Uma obra da planilha mensal (mesmos campos da API, sem dicionário por instância)"""
+
+    __slots__ = tuple(CAMPOS_OBRA)
+
+    def __init__(self, *valores):
+        for campo, valor in zip(CAMPOS_OBRA, valores):
+            setattr(self, campo, valor)
+
+    def para_dict(self, campos=None):
+        """
+        Dicionário no formato da API
+
+        Args:
+            campos (list): Campos a incluir (padrão: todos, na ordem de CAMPOS_OBRA)
+        """
+        if campos is None:
+            campos = CAMPOS_OBRA
+        return {campo: getattr(self, campo) for campo in campos if campo in _CAMPOS}
+
+    def __repr__(self):
+        return f'Obra(id={self.id}, projeto={self.projeto!r}, status={self.status!r})'
+
+
+_CAMPOS = frozenset(CAMPOS_OBRA)
+
+
+def codificar(valores):
+    """
+    Converte uma coluna categórica em códigos inteiros e categorias únicas
+
+    Args:
+        valores: Série ou array com os textos
+
+    Returns:
+        tuple: (códigos int32, lista de categorias com textos internados)
+    """
+    codigos, categorias = pd.factorize(np.asarray(valores, dtype=object), use_na_sentinel=False)
+    categorias = [sys.intern(valor) if isinstance(valor, str) else valor for valor in categorias]
+    return codigos.astype(np.int32), categorias
+
+
+def _decodificar(codigos, categorias):
+    """Lista de valores a partir dos códigos, reutilizando o mesmo objeto por categoria"""
+    valores = np.empty(len(categorias), dtype=object)
+    valores[:] = categorias
+    return valores[codigos].tolist()
+
+
+class ColunasObras:
+    """
+    Colunas das obras normalizadas, prontas para montar os registros
+
+    Args:
+        normalizadas (DataFrame): Resultado de normalizar_dataframe_obras (sem o status)
+
+    Funcionalidade:
+        - Calculado uma vez por versão da planilha
+        - Campos categóricos codificados (códigos + categorias); os demais como listas de valores
+        - montar() cria as obras do dia a partir do status calculado, sem reprocessar a planilha
+    """
+
+    def __init__(self, normalizadas):
+        self.total = len(normalizadas)
+        self.codigos = {}
+        self.valores = {}
+        for campo in CHAVES_OBRA:
+            if campo == 'status':
+                continue
+            if campo in CAMPOS_CATEGORICOS:
+                codigos, categorias = codificar(normalizadas[campo])
+                self.codigos[campo] = (codigos, categorias)
+                self.valores[campo] = _decodificar(codigos, categorias)
+            else:
+                self.valores[campo] = normalizadas[campo].tolist()
+
+    def montar(self, status, versao):
+        """
+        Cria as obras com o status do dia
+
+        Args:
+            status (array): Status de cada obra, na mesma ordem das colunas
+            versao (callable): Recebe o ID da obra e retorna a versão atual
+
+        Returns:
+            tuple: (lista de Obra, {campo: (códigos, categorias)} dos campos categóricos)
+        """
+        codigos = dict(self.codigos)
+        codigos['status'] = codificar(status)
+        valores = dict(self.valores)
+        valores['status'] = _decodificar(*codigos['status'])
+        valores['versao'] = [versao(obra_id) for obra_id in valores['id']]
+
+        obras = [Obra(*linha) for linha in zip(*(valores[campo] for campo in CAMPOS_OBRA))]
+        return obras, codigos
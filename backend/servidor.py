@@ -0,0 +1,129 @@
+"""
+Servidor de produção do backend (gunicorn com vários processos e threads).
+
+Uso (na pasta backend):
+    python servidor.py --workers 4 --threads 8 --bind 0.0.0.0:5000
+
+Também configurável por variáveis de ambiente: SERVIDOR_WORKERS,
+SERVIDOR_THREADS, SERVIDOR_BIND e SERVIDOR_TIMEOUT.
+
+Funcionamento:
+    - As planilhas são processadas uma vez no processo principal, antes de
+      criar os workers; cada worker herda os caches já prontos (páginas de
+      memória compartilhadas por copy-on-write) e inicia o próprio observador
+    - /api/saude só responde 200 depois que os caches estão aquecidos
+    - Com mais de um worker, a programação do dia usa o armazenamento SQLite
+      (ESTADO_PROGRAMACAO=sqlite), compartilhado entre os processos
+    - As edições de obras ainda não gravadas, as versões e o contador de
+      /api/obras/changes ficam no banco local (estado_obras), compartilhados
+      pelos workers; a gravação da planilha usa uma trava entre processos
+    - As planilhas do aquecimento são lidas no próprio processo principal:
+      processos auxiliares de leitura criados antes do fork não servem aos workers
+    - O controle de admissão (admissao.py) é de cada worker: vagas pesadas
+      (CONCORRENCIA_PESADA e FILA_PESADA) e limites por cliente valem por
+      processo; no servidor inteiro são até workers x CONCORRENCIA_PESADA
+      leituras de planilha e rotas pesadas ao mesmo tempo
+    - Sem gunicorn (ex: Windows), usa o servidor do werkzeug com threads em um processo
+"""
+import argparse
+import gc
+import logging
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn é opcional (não funciona no Windows)
+    BaseApplication = None
+
+logger = logging.getLogger(__name__)
+
+
+def ler_argumentos():
+    """Lê a configuração do servidor da linha de comando (padrões nas variáveis de ambiente)"""
+    parser = argparse.ArgumentParser(description='Servidor de produção do backend Mariuá')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVIDOR_WORKERS', min(4, os.cpu_count() or 1))),
+                        help='Quantidade de processos (padrão: núcleos da máquina, máximo 4)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVIDOR_THREADS', 4)),
+                        help='Threads por processo (padrão: 4)')
+    parser.add_argument('--bind', default=os.environ.get('SERVIDOR_BIND', '0.0.0.0:5000'),
+                        help='Endereço e porta (padrão: 0.0.0.0:5000)')
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('SERVIDOR_TIMEOUT', 120)),
+                        help='Tempo máximo de uma requisição em segundos (padrão: 120)')
+    return parser.parse_args()
+
+
+if BaseApplication is not None:
+    class ServidorGunicorn(BaseApplication):
+        """Aplicação gunicorn configurada por código, com a aplicação Flask já carregada"""
+
+        def __init__(self, aplicacao, opcoes):
+            self.aplicacao = aplicacao
+            self.opcoes = opcoes
+            super().__init__()
+
+        def load_config(self):
+            for chave, valor in self.opcoes.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            return self.aplicacao
+
+
+def main():
+    argumentos = ler_argumentos()
+
+    # Vários processos não compartilham memória: a programação do dia precisa do SQLite
+    if argumentos.workers > 1:
+        os.environ.setdefault('ESTADO_PROGRAMACAO', 'sqlite')
+
+    # A pasta uploads/ é relativa à pasta do backend
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    from app import criar_app, aquecer_caches, iniciar_observador
+    from executor_planilhas import executor_planilhas
+
+    aplicacao = criar_app()
+
+    logger.info("🔥 Processando as planilhas antes de iniciar os workers...")
+    # Leitura no próprio processo: os workers criam os seus processos auxiliares no primeiro uso
+    processos_leitura = aplicacao.config['PROCESSOS_LEITURA']
+    aplicacao.config['PROCESSOS_LEITURA'] = 0
+    try:
+        aquecer_caches()
+    finally:
+        aplicacao.config['PROCESSOS_LEITURA'] = processos_leitura
+    # Nenhum processo auxiliar do processo principal pode sobreviver ao fork
+    executor_planilhas.encerrar()
+    # Objetos já criados não são mais visitados pelo coletor de lixo: os workers
+    # não precisam copiar essas páginas de memória ao varrê-las
+    gc.freeze()
+
+    if BaseApplication is None:
+        logger.warning("⚠️ gunicorn não instalado: usando o servidor do werkzeug (um processo, com threads)")
+        from werkzeug.serving import run_simple
+        host, porta = argumentos.bind.rsplit(':', 1)
+        iniciar_observador()
+        run_simple(host, int(porta), aplicacao, threaded=True)
+        return
+
+    def post_fork(servidor, worker):
+        # Cada worker verifica as planilhas por conta própria a partir daqui
+        iniciar_observador()
+
+    logger.info(f"🚀 Iniciando gunicorn: {argumentos.workers} worker(s) x {argumentos.threads} thread(s) em {argumentos.bind}")
+    if aplicacao.config['ADMISSAO']:
+        concorrencia = aplicacao.config['CONCORRENCIA_PESADA']
+        logger.info(f"🚦 Vagas pesadas por worker: {concorrencia} (até {concorrencia * argumentos.workers} no servidor)")
+    ServidorGunicorn(aplicacao, {
+        'bind': argumentos.bind,
+        'workers': argumentos.workers,
+        'threads': argumentos.threads,
+        'worker_class': 'gthread',
+        'timeout': argumentos.timeout,
+        'preload_app': True,
+        'post_fork': post_fork,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+Configuração dos testes do backend.
+
+Uso (na pasta backend):
+    python -m pytest -q tests
+
+Os módulos do backend (app, modelo_obras...) e os geradores de planilhas
+sintéticas (benchmarks.geradores) são importados a partir da pasta backend/.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,216 @@
+"""
+Processamento vetorizado da planilha mensal comparado com a implementação original.
+
+A referência abaixo é o processar_planilha original (linha a linha com
+iterrows), sem as mensagens de depuração: para a mesma planilha, a versão
+vetorizada (processar_dataframe_obras) deve produzir exatamente as mesmas
+obras, com os mesmos valores e tipos.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import CHAVES_OBRA, processar_dataframe_obras
+from benchmarks.geradores import gerar_planilha_mensal
+
+LINHAS = 2000
+
+
+def processar_planilha_referencia(df):
+    """processar_planilha original, recebendo o DataFrame já lido"""
+    obras = []
+
+    for index, row in df.iterrows():
+        try:
+            encarregado = str(row.iloc[0]) if pd.notna(row.iloc[0]) else 'N/A'
+            supervisor = str(row.iloc[1]) if pd.notna(row.iloc[1]) else 'N/A'
+            projeto = str(row.iloc[2]) if pd.notna(row.iloc[2]) else f"B-{str(index+1).zfill(4)}"
+            cliente = str(row.iloc[3]) if pd.notna(row.iloc[3]) else 'N/A'
+            localidade = str(row.iloc[4]) if pd.notna(row.iloc[4]) else 'N/A'
+            criterio = str(row.iloc[5]) if pd.notna(row.iloc[5]) else ''
+            anotacoes = str(row.iloc[6]) if pd.notna(row.iloc[6]) else ''
+            postes_previstos = float(row.iloc[7]) if pd.notna(row.iloc[7]) else 0
+            data_inicio = str(row.iloc[8]) if pd.notna(row.iloc[8]) else ''
+            prazo = str(row.iloc[9]) if pd.notna(row.iloc[9]) else ''
+            obra_semana = str(row.iloc[10]) if pd.notna(row.iloc[10]) else ''
+            motivo_atraso = str(row.iloc[11]) if pd.notna(row.iloc[11]) else ''
+            atividade_dia = str(row.iloc[12]) if pd.notna(row.iloc[12]) else 'IMPLANTAÇÃO'
+            programacao_lv = str(row.iloc[13]) if pd.notna(row.iloc[13]) else ''
+            cavas_realizadas = float(row.iloc[14]) if pd.notna(row.iloc[14]) else 0
+            postes_implantados = float(row.iloc[15]) if pd.notna(row.iloc[15]) else 0
+            latitude_raw = row.iloc[16] if pd.notna(row.iloc[16]) else None
+            latitude = None
+            if latitude_raw is not None:
+                try:
+                    latitude = float(str(latitude_raw).replace(',', '.').strip())
+                except:
+                    latitude = None
+            longitude_raw = row.iloc[17] if pd.notna(row.iloc[17]) else None
+            longitude = None
+            if longitude_raw is not None:
+                try:
+                    longitude = float(str(longitude_raw).replace(',', '.').strip())
+                except:
+                    longitude = None
+            clientes_previstos = float(row.iloc[18]) if pd.notna(row.iloc[18]) else 0
+            projeto_kit = str(row.iloc[19]) if pd.notna(row.iloc[19]) else ''
+            projeto_medidor = str(row.iloc[20]) if pd.notna(row.iloc[20]) else ''
+            ar_coelba = str(row.iloc[21]) if pd.notna(row.iloc[21]) else 'N/A'
+            data_visita_previa = str(row.iloc[22]) if pd.notna(row.iloc[22]) else ''
+            observacao_visita = str(row.iloc[23]) if pd.notna(row.iloc[23]) else ''
+            analise_pre_fechamento = str(row.iloc[24]) if pd.notna(row.iloc[24]) else ''
+            data_solicitacao_reserva = str(row.iloc[25]) if pd.notna(row.iloc[25]) else ''
+
+            progresso = 0
+            if postes_previstos > 0:
+                progresso = min(round((postes_implantados / postes_previstos) * 100), 100)
+
+            is_energizada = 'ENERGIZADA' in anotacoes.upper()
+
+            hoje = datetime.now().date()
+
+            dt_inicio = None
+            if data_inicio and data_inicio != 'nan' and str(data_inicio).strip():
+                try:
+                    data_str = str(data_inicio).strip()
+                    if '/' in data_str:
+                        dt_inicio = datetime.strptime(data_str, '%d/%m/%Y').date()
+                    elif '-' in data_str:
+                        dt_inicio = datetime.strptime(data_str.split()[0], '%Y-%m-%d').date()
+                except:
+                    dt_inicio = None
+
+            dt_termino = None
+            if prazo and prazo != 'nan' and str(prazo).strip():
+                try:
+                    data_str = str(prazo).strip()
+                    if '/' in data_str:
+                        dt_termino = datetime.strptime(data_str, '%d/%m/%Y').date()
+                    elif '-' in data_str:
+                        dt_termino = datetime.strptime(data_str.split()[0], '%Y-%m-%d').date()
+                except:
+                    dt_termino = None
+
+            if is_energizada or (dt_termino and dt_termino < hoje):
+                status = 'Energizada'
+            elif progresso >= 100:
+                status = 'Concluída'
+            elif dt_inicio and dt_inicio > hoje:
+                status = 'Programada'
+            elif dt_inicio and dt_inicio <= hoje:
+                if dt_termino:
+                    status = 'Em Andamento' if dt_termino >= hoje else 'Energizada'
+                else:
+                    status = 'Em Andamento'
+            else:
+                status = 'Em Andamento' if progresso > 0 else 'Programada'
+
+            has_valid_coordinates = (
+                latitude is not None and
+                longitude is not None and
+                -90 <= latitude <= 90 and
+                -180 <= longitude <= 180
+            )
+
+            obra = {
+                'id': index + 1,
+                'encarregado': encarregado,
+                'supervisor': supervisor,
+                'projeto': projeto,
+                'cliente': cliente,
+                'localidade': localidade,
+                'criterio': criterio,
+                'anotacoes': anotacoes,
+                'postesPrevistos': int(postes_previstos),
+                'dataInicio': data_inicio,
+                'prazo': prazo,
+                'obraSemana': obra_semana,
+                'motivoAtraso': motivo_atraso,
+                'atividadeDia': atividade_dia,
+                'programacaoLv': programacao_lv,
+                'cavasRealizadas': int(cavas_realizadas),
+                'postesImplantados': int(postes_implantados),
+                'latitude': latitude,
+                'longitude': longitude,
+                'hasCoordinates': has_valid_coordinates,
+                'clientesPrevistos': int(clientes_previstos),
+                'projetoKit': projeto_kit,
+                'projetoMedidor': projeto_medidor,
+                'arCoelba': ar_coelba,
+                'dataVisitaPrevia': data_visita_previa,
+                'observacaoVisita': observacao_visita,
+                'analisePreFechamento': analise_pre_fechamento,
+                'dataSolicitacaoReserva': data_solicitacao_reserva,
+                'progresso': progresso,
+                'isEnergizada': is_energizada,
+                'status': status
+            }
+
+            if projeto and projeto != 'nan':
+                obras.append(obra)
+        except Exception:
+            continue
+
+    return obras
+
+
+@pytest.fixture(scope='module')
+def planilha(tmp_path_factory):
+    """Planilha mensal sintética lida como pd.read_excel (gerada uma vez para o módulo)"""
+    caminho = tmp_path_factory.mktemp('uploads') / 'PROGRAMACAO - NOVEMBRO.xlsx'
+    gerar_planilha_mensal(str(caminho), LINHAS)
+    df = pd.read_excel(caminho, header=0)
+
+    # Datas em torno de hoje (as da planilha sintética já passaram): todos os status aparecem
+    posicoes = np.arange(len(df))
+    inicio = pd.Timestamp.now().normalize() + pd.to_timedelta(posicoes % 61 - 30, unit='D')
+    termino = inicio + pd.to_timedelta(posicoes * 7 % 45, unit='D')
+    df.iloc[:, 8] = inicio.strftime('%d/%m/%Y')
+    df.iloc[:, 9] = termino.strftime('%d/%m/%Y')
+    return df
+
+
+def comparar(df):
+    """Processa com as duas implementações e compara obra a obra, inclusive os tipos"""
+    esperadas = processar_planilha_referencia(df)
+    obtidas = processar_dataframe_obras(df)
+
+    assert [obra['id'] for obra in obtidas] == [obra['id'] for obra in esperadas]
+    for esperada, obtida in zip(esperadas, obtidas):
+        assert list(obtida) == CHAVES_OBRA
+        assert obtida == esperada
+        assert {chave: type(valor) for chave, valor in obtida.items()} == \
+               {chave: type(valor) for chave, valor in esperada.items()}
+    return obtidas
+
+
+def test_planilha_sintetica_igual_a_referencia(planilha):
+    obras = comparar(planilha)
+    assert len(obras) == LINHAS
+    # A planilha sintética cobre os status e as obras sem coordenadas
+    assert {obra['status'] for obra in obras} == {'Energizada', 'Concluída', 'Programada', 'Em Andamento'}
+    assert any(not obra['hasCoordinates'] for obra in obras)
+
+
+def test_celulas_irregulares_iguais_a_referencia(planilha):
+    df = planilha.head(20).astype(object)
+    df.iat[0, 7] = 'DEZ'            # postes previstos não numérico: linha descartada
+    df.iat[1, 14] = float('inf')    # cavas infinitas: linha descartada
+    df.iat[2, 2] = None             # projeto vazio: código B-0003
+    df.iat[3, 16] = 'sem GPS'       # latitude inválida
+    df.iat[4, 17] = '-200,5'        # longitude fora do intervalo
+    df.iat[5, 8] = '2025-11-03 00:00:00'
+    df.iat[6, 9] = '31/02/2025'     # data inexistente
+    df.iat[7, 8] = '05/11/25'       # ano com 2 dígitos (fora do intervalo do pandas)
+    df.iat[8, 9] = '   '
+    df.iat[9, 6] = 'obra energizada'
+    df.iat[10, 7] = 0
+    df.iat[11, 15] = 40             # mais postes implantados que previstos: progresso limitado a 100
+    df.iat[12, 2] = 'nan'           # texto "nan" no projeto: obra ignorada
+
+    obras = comparar(df)
+    ids = [obra['id'] for obra in obras]
+    assert 1 not in ids and 2 not in ids and 13 not in ids
+    assert obras[0]['projeto'] == 'B-0003'
@@ -0,0 +1,161 @@
+"""
+Envio de respostas grandes: streaming (NDJSON ou array JSON em partes) e compressão.
+
+Os registros são serializados em blocos direto do DataFrame (ou de um cursor
+do SQLite), sem montar a resposta inteira em memória. A compressão gzip/brotli
+é negociada pelo cabeçalho Accept-Encoding; brotli é opcional e só é usado
+se o pacote estiver instalado.
+"""
+import json
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+# Linhas serializadas por bloco no streaming
+LINHAS_POR_BLOCO = 2000
+
+# Respostas menores que isso não compensam ser comprimidas (bytes)
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+MIMETYPE_NDJSON = 'application/x-ndjson'
+
+
+def codificacoes_suportadas():
+    """Codificações disponíveis, em ordem de preferência"""
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+
+def negociar_codificacao(accept_encoding):
+    """
+    Escolhe a codificação de compressão a partir do cabeçalho Accept-Encoding
+
+    Args:
+        accept_encoding (str): Valor do cabeçalho (ex: "gzip, deflate, br")
+
+    Returns:
+        str: 'br', 'gzip' ou None (sem compressão)
+    """
+    aceitas = {}
+    for parte in (accept_encoding or '').split(','):
+        nome, _, parametros = parte.strip().partition(';')
+        peso = 1.0
+        if parametros.strip().startswith('q='):
+            try:
+                peso = float(parametros.strip()[2:])
+            except ValueError:
+                peso = 0.0
+        if nome:
+            aceitas[nome.strip().lower()] = peso
+
+    for codificacao in codificacoes_suportadas():
+        if aceitas.get(codificacao, aceitas.get('*', 0)) > 0:
+            return codificacao
+    return None
+
+
+def comprimir(dados, codificacao):
+    """Comprime bytes com a codificação informada"""
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=5)
+    if codificacao == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return compressor.compress(dados) + compressor.flush()
+    return dados
+
+
+def comprimir_stream(partes, codificacao):
+    """
+    Comprime um gerador de bytes bloco a bloco
+
+    Args:
+        partes (iterable): Blocos de bytes
+        codificacao (str): 'br', 'gzip' ou None
+    """
+    if codificacao is None:
+        yield from partes
+        return
+
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for parte in partes:
+            saida = compressor.process(parte)
+            if saida:
+                yield saida
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for parte in partes:
+        saida = compressor.compress(parte)
+        if saida:
+            yield saida
+    yield compressor.flush()
+
+
+def blocos_dataframe(df, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Divide um DataFrame em blocos de linhas (sem copiar os dados)"""
+    for inicio in range(0, len(df), linhas_por_bloco):
+        yield df.iloc[inicio:inicio + linhas_por_bloco]
+
+
+def ndjson_dataframes(blocos):
+    """
+    Serializa blocos de DataFrame como NDJSON (um registro JSON por linha)
+
+    Args:
+        blocos (iterable): DataFrames (ex: blocos_dataframe ou pd.read_sql_query com chunksize)
+    """
+    for bloco in blocos:
+        if len(bloco):
+            yield bloco.to_json(orient='records', lines=True, date_format='iso').rstrip('\n').encode('utf-8') + b'\n'
+
+
+def array_json_dataframes(blocos):
+    """Serializa blocos de DataFrame como um único array JSON, enviado em partes"""
+    yield b'['
+    primeiro = True
+    for bloco in blocos:
+        if not len(bloco):
+            continue
+        conteudo = bloco.to_json(orient='records', date_format='iso')[1:-1].encode('utf-8')
+        yield conteudo if primeiro else b',' + conteudo
+        primeiro = False
+    yield b']'
+
+
+def ndjson_registros(registros):
+    """Serializa dicionários como NDJSON, em blocos de LINHAS_POR_BLOCO registros"""
+    bloco = []
+    for registro in registros:
+        bloco.append(json.dumps(registro, ensure_ascii=False))
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield ('\n'.join(bloco) + '\n').encode('utf-8')
+            bloco = []
+    if bloco:
+        yield ('\n'.join(bloco) + '\n').encode('utf-8')
+
+
+def array_json_registros(registros, prefixo=b'[', sufixo=b']'):
+    """
+    Serializa dicionários como array JSON, em blocos de LINHAS_POR_BLOCO registros
+
+    Args:
+        registros (iterable): Dicionários a serializar
+        prefixo (bytes): Conteúdo antes dos registros (permite embutir o array em um objeto)
+        sufixo (bytes): Conteúdo após os registros
+    """
+    yield prefixo
+    primeiro = True
+    bloco = []
+    for registro in registros:
+        bloco.append(json.dumps(registro, ensure_ascii=False))
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield (('' if primeiro else ',') + ','.join(bloco)).encode('utf-8')
+            primeiro = False
+            bloco = []
+    if bloco:
+        yield (('' if primeiro else ',') + ','.join(bloco)).encode('utf-8')
+    yield sufixo